@@ -0,0 +1,80 @@
+# scripts/benchmark_ann_index.py
+"""
+Benchmark de l'index approximatif IVF : rappel@k et latence par rapport à la
+recherche exacte de l'index en mémoire, pour plusieurs valeurs de nprobe.
+
+Utilisation:
+    python scripts/benchmark_ann_index.py
+    python scripts/benchmark_ann_index.py --pages 100000 --nprobe 4 8 16 32
+    python scripts/benchmark_ann_index.py --embeddings data/embeddings.npy
+"""
+import os
+import sys
+import time
+import argparse
+import logging
+import numpy as np
+
+# Ajouter le répertoire parent au chemin d'importation
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.search.vector_index import InMemoryVectorIndex
+from src.search.ann_index import IVFIndex
+from scripts.benchmark_embedding_quantization import generate_corpus, generate_queries
+
+# Réduire le bruit des logs de construction des index
+logging.getLogger("src").setLevel(logging.WARNING)
+
+
+def run_benchmark(corpus: np.ndarray, queries: np.ndarray, top_k: int, n_lists: int, nprobes):
+    page_ids = np.arange(len(corpus))
+
+    exact_index = InMemoryVectorIndex(refresh_interval=0)
+    exact_index.load(page_ids, corpus)
+
+    truth = []
+    start_time = time.perf_counter()
+    for query in queries:
+        truth.append({result["page_id"] for result in exact_index.search(query, top_k, threshold=-1.0)})
+    exact_latency = (time.perf_counter() - start_time) / len(queries) * 1000
+
+    start_time = time.perf_counter()
+    ann_index = IVFIndex(n_lists=n_lists)
+    ann_index.build(page_ids, corpus)
+    build_time = time.perf_counter() - start_time
+
+    print(f"\nCorpus: {corpus.shape[0]} pages x {corpus.shape[1]} dimensions, {len(queries)} requêtes, top_k={top_k}")
+    print(f"Index IVF: {len(ann_index.centroids)} listes, construit en {build_time:.2f} s")
+    print(f"{'Méthode':<12} {'nprobe':>7} {'Rappel@k':>9} {'Latence (ms)':>13}")
+    print("-" * 45)
+    print(f"{'exacte':<12} {'-':>7} {1.0:>9.3f} {exact_latency:>13.3f}")
+
+    for nprobe in nprobes:
+        hits = 0
+        start_time = time.perf_counter()
+        for query, expected in zip(queries, truth):
+            results = ann_index.search(query, top_k, threshold=-1.0, nprobe=nprobe)
+            hits += len(expected.intersection(result["page_id"] for result in results))
+        latency = (time.perf_counter() - start_time) / len(queries) * 1000
+        print(f"{'IVF':<12} {nprobe:>7} {hits / (len(queries) * top_k):>9.3f} {latency:>13.3f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de l'index approximatif IVF")
+    parser.add_argument("--pages", type=int, default=50000, help="Nombre de pages synthétiques")
+    parser.add_argument("--dimension", type=int, default=1536, help="Dimension des embeddings synthétiques")
+    parser.add_argument("--queries", type=int, default=200, help="Nombre de requêtes")
+    parser.add_argument("--top-k", type=int, default=10, help="Nombre de résultats par requête")
+    parser.add_argument("--nlists", type=int, default=0, help="Nombre de listes (0 = racine du nombre de pages)")
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 4, 8, 16, 32], help="Valeurs de nprobe à tester")
+    parser.add_argument("--embeddings", type=str, default=None, help="Fichier .npy d'embeddings réels (remplace le corpus synthétique)")
+    args = parser.parse_args()
+
+    if args.embeddings:
+        corpus = np.load(args.embeddings).astype(np.float32)
+        corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+    else:
+        corpus = generate_corpus(args.pages, args.dimension)
+
+    queries = generate_queries(corpus, args.queries)
+    run_benchmark(corpus, queries, args.top_k, args.nlists or None, args.nprobe)
@@ -0,0 +1,103 @@
+# scripts/benchmark_embedding_quantization.py
+"""
+Benchmark rappel / latence / mémoire des modes de stockage réduits et quantifiés
+par rapport à la référence float32 en dimension 1536.
+
+Utilisation:
+    python scripts/benchmark_embedding_quantization.py
+    python scripts/benchmark_embedding_quantization.py --pages 50000 --queries 300
+    python scripts/benchmark_embedding_quantization.py --embeddings data/embeddings.npy
+"""
+import os
+import sys
+import time
+import argparse
+import logging
+import numpy as np
+
+# Ajouter le répertoire parent au chemin d'importation
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.embeddings.embedding_quantization import QuantizedEmbeddingMatrix
+
+# Réduire le bruit des logs de construction des matrices
+logging.getLogger("src").setLevel(logging.WARNING)
+
+
+def generate_corpus(pages: int, dimension: int, seed: int = 0) -> np.ndarray:
+    """
+    Génère un corpus synthétique dont l'énergie décroît avec l'indice de la
+    composante, comme pour des embeddings entraînés de type Matryoshka.
+    """
+    rng = np.random.default_rng(seed)
+    decay = 1.0 / np.sqrt(1.0 + np.arange(dimension) / 32.0)
+    centers = rng.standard_normal((max(1, pages // 50), dimension)).astype(np.float32) * decay
+    assignments = rng.integers(0, len(centers), size=pages)
+    corpus = centers[assignments] + 0.5 * rng.standard_normal((pages, dimension)).astype(np.float32) * decay
+    return corpus / np.linalg.norm(corpus, axis=1, keepdims=True)
+
+
+def generate_queries(corpus: np.ndarray, count: int, seed: int = 1) -> np.ndarray:
+    """
+    Génère des requêtes proches de pages tirées au hasard dans le corpus.
+    """
+    rng = np.random.default_rng(seed)
+    picks = corpus[rng.integers(0, len(corpus), size=count)]
+    queries = picks + 0.05 * rng.standard_normal(picks.shape).astype(np.float32)
+    return queries / np.linalg.norm(queries, axis=1, keepdims=True)
+
+
+def exact_top_k(corpus: np.ndarray, query: np.ndarray, top_k: int) -> np.ndarray:
+    scores = corpus @ query
+    candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    return candidates[np.argsort(-scores[candidates])]
+
+
+def run_benchmark(corpus: np.ndarray, queries: np.ndarray, top_k: int, rescore_factor: int):
+    # Référence: recherche exacte en float32, dimension complète
+    truth = []
+    start_time = time.perf_counter()
+    for query in queries:
+        truth.append(set(exact_top_k(corpus, query, top_k).tolist()))
+    baseline_latency = (time.perf_counter() - start_time) / len(queries) * 1000
+
+    rows = [("float32", corpus.shape[1], "-", 1.0, baseline_latency, corpus.nbytes)]
+
+    for dimension in (256, 512):
+        for precision in ("float32", "float16", "int8"):
+            for rescore in (False, True):
+                matrix = QuantizedEmbeddingMatrix(corpus, dimension, precision, keep_full=rescore)
+                hits = 0
+                start_time = time.perf_counter()
+                for query, expected in zip(queries, truth):
+                    indices, _ = matrix.search(query, top_k, rescore_factor)
+                    hits += len(expected.intersection(indices.tolist()))
+                latency = (time.perf_counter() - start_time) / len(queries) * 1000
+                memory = sum(matrix.memory_usage().values())
+                rows.append((precision, dimension, "oui" if rescore else "non", hits / (len(queries) * top_k), latency, memory))
+
+    print(f"\nCorpus: {corpus.shape[0]} pages x {corpus.shape[1]} dimensions, {len(queries)} requêtes, top_k={top_k}")
+    print(f"{'Précision':<10} {'Dim':>5} {'Rescoring':>10} {'Rappel@k':>9} {'Latence (ms)':>13} {'Mémoire (Mo)':>13}")
+    print("-" * 65)
+    for precision, dimension, rescore, recall, latency, memory in rows:
+        print(f"{precision:<10} {dimension:>5} {rescore:>10} {recall:>9.3f} {latency:>13.3f} {memory / 1024 / 1024:>13.2f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark des embeddings réduits et quantifiés")
+    parser.add_argument("--pages", type=int, default=20000, help="Nombre de pages synthétiques")
+    parser.add_argument("--dimension", type=int, default=1536, help="Dimension des embeddings synthétiques")
+    parser.add_argument("--queries", type=int, default=200, help="Nombre de requêtes")
+    parser.add_argument("--top-k", type=int, default=10, help="Nombre de résultats par requête")
+    parser.add_argument("--rescore-factor", type=int, default=4, help="Candidats rescorés en multiple de top_k")
+    parser.add_argument("--embeddings", type=str, default=None, help="Fichier .npy d'embeddings réels (remplace le corpus synthétique)")
+    args = parser.parse_args()
+
+    if args.embeddings:
+        corpus = np.load(args.embeddings).astype(np.float32)
+        corpus /= np.linalg.norm(corpus, axis=1, keepdims=True)
+    else:
+        corpus = generate_corpus(args.pages, args.dimension)
+
+    queries = generate_queries(corpus, args.queries)
+    run_benchmark(corpus, queries, args.top_k, args.rescore_factor)
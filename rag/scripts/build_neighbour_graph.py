@@ -0,0 +1,39 @@
+# scripts/build_neighbour_graph.py
+"""
+Construit le graphe de voisinage des pages (voisines physiques et sémantiques)
+utilisé par le moteur RAG pour étendre le contexte sans requête de plage.
+
+Utilisation:
+    python scripts/build_neighbour_graph.py --output data/embeddings/neighbour_graph.npz --k 5
+
+Le chemin doit correspondre à NEIGHBOUR_GRAPH_PATH. À relancer après chaque
+ingestion de cours : les workers rechargent le fichier lorsqu'il change, et les
+pages absentes du graphe utilisent en attendant les fenêtres de contexte classiques.
+"""
+import os
+import sys
+import argparse
+import logging
+from dotenv import load_dotenv
+
+# Ajouter le répertoire parent au chemin d'importation
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.search.neighbour_graph import build_neighbour_graph, DEFAULT_SEMANTIC_NEIGHBOURS
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Charger les variables d'environnement
+load_dotenv()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Construction du graphe de voisinage des pages")
+    parser.add_argument("--output", type=str, default=os.getenv("NEIGHBOUR_GRAPH_PATH", "data/embeddings/neighbour_graph.npz"), help="Chemin du graphe")
+    parser.add_argument("--k", type=int, default=DEFAULT_SEMANTIC_NEIGHBOURS, help="Nombre de voisins sémantiques par page")
+    args = parser.parse_args()
+
+    graph = build_neighbour_graph(args.k)
+    graph.save(args.output)
+    logger.info(f"Graphe construit: {len(graph)} pages, {args.k} voisins sémantiques par page, dans {args.output}")
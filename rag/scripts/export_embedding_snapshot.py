@@ -0,0 +1,36 @@
+# scripts/export_embedding_snapshot.py
+"""
+Exporte la table page_embeddings vers un snapshot binaire projeté en mémoire
+par l'index vectoriel (VECTOR_SEARCH_BACKEND=memory).
+
+Utilisation:
+    python scripts/export_embedding_snapshot.py --output data/embeddings/page_embeddings.snap
+
+Le chemin doit ensuite être indiqué dans EMBEDDING_SNAPSHOT_PATH. À relancer après
+chaque ingestion de cours pour que tous les workers voient les nouvelles pages.
+"""
+import os
+import sys
+import argparse
+import logging
+from dotenv import load_dotenv
+
+# Ajouter le répertoire parent au chemin d'importation
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.embeddings.embedding_snapshot import export_snapshot, get_snapshot_path
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Charger les variables d'environnement
+load_dotenv()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export des embeddings vers un snapshot binaire")
+    parser.add_argument("--output", type=str, default=get_snapshot_path() or "data/embeddings/page_embeddings.snap", help="Chemin du snapshot")
+    args = parser.parse_args()
+
+    header = export_snapshot(args.output)
+    logger.info(f"Export terminé: {header['count']} embeddings de dimension {header['dimension']} dans {args.output}")
@@ -11,6 +11,32 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def iter_sse_content(lines):
+    """
+    Extrait les fragments de texte d'un flux SSE de complétion (format OpenAI).
+    
+    Les lignes de commentaire (": OPENROUTER PROCESSING") et les événements sans
+    contenu sont ignorés ; le flux se termine sur "data: [DONE]". Une erreur
+    signalée au milieu du flux lève une RuntimeError.
+    """
+    for line in lines:
+        if not line or not line.startswith("data:"):
+            continue
+        
+        payload = line[len("data:"):].strip()
+        if payload == "[DONE]":
+            return
+        
+        chunk = json.loads(payload)
+        if "error" in chunk:
+            error = chunk["error"]
+            raise RuntimeError(error.get("message", str(error)) if isinstance(error, dict) else str(error))
+        
+        for choice in chunk.get("choices", []):
+            content = (choice.get("delta") or {}).get("content")
+            if content:
+                yield content
+
 class OpenRouterClient:
     def __init__(self):
         self.api_key = os.getenv("OPENROUTER_API_KEY")
@@ -72,6 +98,29 @@ class OpenRouterClient:
         response = requests.post(url, headers=headers, json=data)
         response.raise_for_status()
         return response.json()
+    
+    def stream_response(self, messages, model=None, temperature=0.7, max_tokens=1000):
+        """Génère une réponse en streaming (SSE) et retourne les fragments de texte au fil de l'eau"""
+        url = f"{self.base_url}/chat/completions"
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "Accept": "text/event-stream"
+        }
+        
+        data = {
+            "model": model or self.default_model,
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True
+        }
+        
+        with requests.post(url, headers=headers, json=data, stream=True) as response:
+            response.raise_for_status()
+            # Le flux est en UTF-8 même si l'en-tête ne précise pas d'encodage
+            response.encoding = "utf-8"
+            yield from iter_sse_content(response.iter_lines(decode_unicode=True))
 
 # Fonction pour obtenir une instance du client OpenRouter
 def get_openrouter_client():
@@ -8,6 +8,9 @@ from typing import Dict, List, Any, Optional
 from processing.pdf_extractor import PDFExtractor
 from storage.supabase_client import get_supabase_client
 from embeddings.embedding_generator import get_embedding_generator
+# Import via le paquet src : le cache doit être la même instance que celle
+# utilisée par ContentRetriever (importé sous src.*), sinon l'invalidation est sans effet
+from src.search.course_cache import get_course_cache
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/documents")
@@ -74,6 +77,7 @@ async def process_document(
             if result.data and len(result.data) > 0:
                 course_id = result.data[0]["id"]
                 logger.info(f"Nouveau cours créé avec l'ID: {course_id}")
+                get_course_cache().invalidate()
             else:
                 raise HTTPException(status_code=500, detail="Impossible de créer le cours")
         elif not course_id:
@@ -128,13 +132,7 @@ async def list_courses():
     Liste tous les cours disponibles.
     """
     try:
-        supabase = get_supabase_client()
-        result = supabase.table("courses").select("*").order("created_at", desc=True).execute()
-        
-        if result.data:
-            return result.data
-        else:
-            return []
+        return get_course_cache().list_courses()
             
     except Exception as e:
         logger.error(f"Erreur lors de la récupération des cours: {str(e)}")
@@ -10,15 +10,35 @@ from search.search_service import get_search_service
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/embeddings")
 
+# Nombre maximum de requêtes par appel à /embeddings/search/batch
+MAX_BATCH_QUERIES = 200
+
 class SearchRequest(BaseModel):
     query: str
     top_k: int = 5
     threshold: float = 0.5
+    course_ids: Optional[List[int]] = None
+    year: Optional[str] = None
+    debug: bool = False
 
 class SearchResponse(BaseModel):
     results: List[Dict[str, Any]]
     count: int
     query: str
+    timings: Optional[Dict[str, float]] = None
+
+class BatchSearchRequest(BaseModel):
+    queries: List[str]
+    top_k: int = 5
+    threshold: float = 0.5
+    course_ids: Optional[List[int]] = None
+    year: Optional[str] = None
+    debug: bool = False
+
+class BatchSearchResponse(BaseModel):
+    results: List[SearchResponse]
+    count: int
+    timings: Optional[Dict[str, float]] = None
 
 @router.post("/search", response_model=SearchResponse)
 async def search_embeddings(request: SearchRequest):
@@ -31,23 +51,68 @@ async def search_embeddings(request: SearchRequest):
         # Obtenir le service de recherche
         search_service = get_search_service()
         
-        # Effectuer la recherche
+        # Effectuer la recherche (avec la durée de chaque étape en mode debug)
+        timings = {} if request.debug else None
         results = search_service.search(
             query=request.query,
             top_k=request.top_k,
-            threshold=request.threshold
+            threshold=request.threshold,
+            timings=timings,
+            course_ids=request.course_ids,
+            year=request.year
         )
         
         return {
             "results": results,
             "count": len(results),
-            "query": request.query
+            "query": request.query,
+            "timings": timings
         }
         
     except Exception as e:
         logger.error(f"Erreur lors de la recherche d'embeddings: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erreur lors de la recherche d'embeddings: {str(e)}")
 
+@router.post("/search/batch", response_model=BatchSearchResponse)
+async def search_embeddings_batch(request: BatchSearchRequest):
+    """
+    Recherche les pages les plus pertinentes pour plusieurs requêtes en un seul appel.
+    """
+    if len(request.queries) > MAX_BATCH_QUERIES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Trop de requêtes dans le lot ({len(request.queries)}, maximum {MAX_BATCH_QUERIES})"
+        )
+    
+    try:
+        logger.info(f"Recherche d'embeddings par lot: {len(request.queries)} requêtes")
+        
+        search_service = get_search_service()
+        
+        # Durées cumulées de chaque étape du lot en mode debug
+        timings = {} if request.debug else None
+        batch_results = search_service.search_many(
+            queries=request.queries,
+            top_k=request.top_k,
+            threshold=request.threshold,
+            timings=timings,
+            course_ids=request.course_ids,
+            year=request.year
+        )
+        
+        return {
+            "results": [
+                {"results": results, "count": len(results), "query": query}
+                for query, results in zip(request.queries, batch_results)
+            ],
+            "count": len(batch_results),
+            "timings": timings
+        }
+        
+    except Exception as e:
+        logger.error(f"Erreur lors de la recherche d'embeddings par lot: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erreur lors de la recherche d'embeddings par lot: {str(e)}")
+
 @router.get("/stats", response_model=Dict[str, Any])
 async def get_embedding_stats():
     """
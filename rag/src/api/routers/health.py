@@ -2,7 +2,11 @@
 import logging
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from typing import Dict
+from typing import Dict, Any
+# Import via le paquet src : mêmes instances que celles utilisées par ContentRetriever
+from src.search.page_cache import get_page_cache
+from src.search.course_cache import get_course_cache
+from src.search.result_cache import get_result_cache
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/health")
@@ -22,4 +26,15 @@ async def health_check():
         "status": "healthy",
         "version": "1.0.0",
         "api_name": "Max RAG Multimodal API"
-    }
\ No newline at end of file
+    }
+
+@router.get("/cache", response_model=Dict[str, Any])
+async def cache_stats():
+    """
+    Statistiques des caches de contenu (pages, cours et résultats de recherche).
+    """
+    return {
+        "pages": get_page_cache().stats(),
+        "courses": {"entries": len(get_course_cache())},
+        "search_results": get_result_cache().stats()
+    }
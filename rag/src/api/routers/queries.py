@@ -1,7 +1,9 @@
 # src/api/routers/queries.py
+import json
 import logging
 import time
 from fastapi import APIRouter, HTTPException, Query, Body
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 from typing import Dict, List, Any, Optional
 from response_generation.response_generator import get_response_generator
@@ -14,6 +16,9 @@ class QueryRequest(BaseModel):
     query_type: str = Field("question", description="Type de requête (question, json, concept, cours, probleme)")
     model: Optional[str] = Field(None, description="Modèle LLM à utiliser (optionnel)")
     temperature: float = Field(0.3, description="Température pour la génération (0.0-1.0)")
+    course_ids: Optional[List[int]] = Field(None, description="Limiter la recherche à ces cours (optionnel)")
+    year: Optional[str] = Field(None, description="Limiter la recherche aux cours d'une année: ING1, ING2, ING3 (optionnel)")
+    debug: bool = Field(False, description="Inclure la durée de chaque étape dans la réponse")
 
 class QueryResponse(BaseModel):
     response: Any
@@ -22,6 +27,7 @@ class QueryResponse(BaseModel):
     query_type: str
     status: str
     search_results: Optional[List[Dict[str, Any]]] = None
+    timings: Optional[Dict[str, float]] = None
 
 @router.post("/ask", response_model=QueryResponse)
 async def ask_question(request: QueryRequest):
@@ -40,7 +46,10 @@ async def ask_question(request: QueryRequest):
             query=request.query,
             query_type=request.query_type,
             model=request.model,
-            temperature=request.temperature
+            temperature=request.temperature,
+            debug=request.debug,
+            course_ids=request.course_ids,
+            year=request.year
         )
         
         # Calculer le temps de traitement total
@@ -53,6 +62,46 @@ async def ask_question(request: QueryRequest):
         logger.error(f"Erreur lors du traitement de la requête: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Erreur lors du traitement de la requête: {str(e)}")
 
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    """
+    Formate un événement server-sent events.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@router.post("/ask/stream")
+async def ask_question_stream(request: QueryRequest):
+    """
+    Répond à une question en streaming (server-sent events).
+    
+    Événements émis : "sources" (pages utilisées), "token" (fragment de la réponse),
+    puis "done" (réponse complète et durées) ou "error".
+    """
+    logger.info(f"Requête reçue en streaming: {request.query} (type: {request.query_type})")
+    
+    try:
+        # Obtenir le générateur de réponses avant d'ouvrir le flux : une erreur de configuration reste une erreur HTTP
+        response_generator = get_response_generator()
+    except Exception as e:
+        logger.error(f"Erreur lors du traitement de la requête: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Erreur lors du traitement de la requête: {str(e)}")
+    
+    events = response_generator.stream_response(
+        query=request.query,
+        query_type=request.query_type,
+        model=request.model,
+        temperature=request.temperature,
+        debug=request.debug,
+        course_ids=request.course_ids,
+        year=request.year
+    )
+    
+    # Générateur synchrone : Starlette l'itère dans son pool de threads, sans bloquer la boucle d'événements
+    return StreamingResponse(
+        (format_sse(event["event"], event["data"]) for event in events),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/models", response_model=List[Dict[str, Any]])
 async def list_models():
     """
@@ -4,6 +4,8 @@ import logging
 from typing import List, Dict, Any, Optional
 from src.embeddings.multimodal_embeddings import get_multimodal_embeddings_client
 from src.embeddings.embedding_storage import get_embedding_storage
+from src.search.vector_index import get_search_backend, ANN_BACKEND
+from src.search.ann_index import get_ann_index
 from src.utils.image_utils import optimize_image_for_embeddings
 
 # Configuration du logging
@@ -37,8 +39,6 @@ class EmbeddingGenerator:
             List[int]: Liste des IDs des pages pour lesquelles les embeddings ont été générés avec succès.
         """
         try:
-            successful_ids = []
-            
             # Optimiser les images pour la génération d'embeddings
             optimized_image_paths = []
             page_ids = []
@@ -66,6 +66,7 @@ class EmbeddingGenerator:
             
             # Générer les embeddings par lots de 10 images maximum
             batch_size = 10
+            generated = []
             for i in range(0, len(optimized_image_paths), batch_size):
                 batch_paths = optimized_image_paths[i:i + batch_size]
                 batch_ids = page_ids[i:i + batch_size]
@@ -74,15 +75,18 @@ class EmbeddingGenerator:
                 
                 # Générer les embeddings
                 embeddings = self.embeddings_client.encode_documents(batch_paths)
-                
-                # Stocker les embeddings
-                for j, (page_id, embedding) in enumerate(zip(batch_ids, embeddings)):
-                    success = self.storage.store_page_embedding(page_id, embedding)
-                    if success:
-                        successful_ids.append(page_id)
-                        logger.info(f"Embedding stocké avec succès pour la page {page_id} ({j+1}/{len(batch_ids)})")
-                    else:
-                        logger.warning(f"Échec du stockage de l'embedding pour la page {page_id}")
+                generated.extend(zip(batch_ids, embeddings))
+            
+            # Stocker tous les embeddings en quelques requêtes groupées
+            successful_ids, failures = self.storage.store_page_embeddings_bulk(generated)
+            for page_id in failures:
+                logger.warning(f"Échec du stockage de l'embedding pour la page {page_id}")
+            
+            # Persister l'index IVF après les insertions incrémentales faites par le stockage
+            if get_search_backend() == ANN_BACKEND:
+                ann_index = get_ann_index()
+                if ann_index.dirty:
+                    ann_index.save()
             
             return successful_ids
             
@@ -0,0 +1,229 @@
+# src/embeddings/embedding_quantization.py
+"""
+Réduction de dimension et quantification des embeddings.
+
+La copie réduite et quantifiée sert de première passe à l'index vectoriel en
+mémoire (VECTOR_INDEX_FIRST_PASS_DIM) : les candidats sont ensuite rescorés
+avec les embeddings float32. scripts/benchmark_embedding_quantization.py mesure
+le rappel, la latence et la mémoire par rapport à la référence float32/1536.
+"""
+import logging
+from typing import List, Dict, Any, Optional, Tuple, Union
+import numpy as np
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Précisions supportées pour la copie réduite des embeddings
+SUPPORTED_PRECISIONS = ("float32", "float16", "int8")
+
+# Nombre de lignes converties à la fois lors du calcul des scores quantifiés
+SCORING_BLOCK_SIZE = 8192
+
+
+def reduce_dimension(embeddings: Union[List[float], List[List[float]], np.ndarray], dimension: int) -> np.ndarray:
+    """
+    Réduit la dimension d'un ou plusieurs embeddings (troncature de type Matryoshka).
+
+    Les premières composantes sont conservées puis le vecteur est renormalisé,
+    afin que le produit scalaire reste une similarité cosinus.
+
+    Args:
+        embeddings: Embedding unique (1D) ou matrice d'embeddings (2D).
+        dimension (int): Dimension cible.
+
+    Returns:
+        np.ndarray: Embedding(s) réduit(s) et normalisé(s) en float32.
+    """
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    if dimension <= 0 or dimension > matrix.shape[-1]:
+        raise ValueError(f"Dimension réduite invalide: {dimension} (dimension d'origine: {matrix.shape[-1]})")
+
+    reduced = np.ascontiguousarray(matrix[..., :dimension])
+    norms = np.linalg.norm(reduced, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return reduced / norms
+
+
+def quantize_int8(embeddings: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Quantifie une matrice d'embeddings en int8 avec une échelle symétrique par ligne.
+
+    Args:
+        embeddings (np.ndarray): Matrice d'embeddings (n, d).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Codes int8 (n, d) et échelles float32 (n,).
+    """
+    matrix = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def dequantize_int8(codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+    """
+    Reconstruit une approximation float32 d'embeddings quantifiés en int8.
+
+    Args:
+        codes (np.ndarray): Codes int8 (n, d).
+        scales (np.ndarray): Échelles par ligne (n,).
+
+    Returns:
+        np.ndarray: Embeddings approximés en float32.
+    """
+    return codes.astype(np.float32) * scales[:, None]
+
+
+class QuantizedEmbeddingMatrix:
+    """
+    Copie compacte d'une matrice d'embeddings pour la recherche en deux passes.
+
+    La première passe utilise une version réduite (troncature Matryoshka) stockée
+    en float32, float16 ou int8. Les meilleurs candidats sont ensuite rescorés
+    avec les embeddings complets en pleine précision lorsqu'ils sont conservés.
+    """
+
+    def __init__(self, embeddings: np.ndarray, reduced_dimension: int = 256, precision: str = "int8", keep_full: bool = True):
+        """
+        Construit la copie réduite et quantifiée.
+
+        Args:
+            embeddings (np.ndarray): Embeddings complets (n, d).
+            reduced_dimension (int): Dimension de la première passe.
+            precision (str): Précision de la copie réduite (float32, float16 ou int8).
+            keep_full (bool): Si True, conserve les embeddings complets pour le rescoring.
+        """
+        if precision not in SUPPORTED_PRECISIONS:
+            raise ValueError(f"Précision non supportée: {precision} (valeurs possibles: {', '.join(SUPPORTED_PRECISIONS)})")
+
+        full = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+        self.dimension = full.shape[1]
+        self.reduced_dimension = min(reduced_dimension, self.dimension)
+        self.precision = precision
+        self.scales = None
+
+        reduced = reduce_dimension(full, self.reduced_dimension)
+        if precision == "int8":
+            self.reduced, self.scales = quantize_int8(reduced)
+        else:
+            self.reduced = np.ascontiguousarray(reduced.astype(precision))
+
+        self.full = np.ascontiguousarray(full) if keep_full else None
+        logger.info(
+            f"Matrice quantifiée construite: {len(self)} embeddings, dimension {self.reduced_dimension} en {precision}"
+            f"{' avec rescoring pleine précision' if keep_full else ''}"
+        )
+
+    def __len__(self) -> int:
+        return self.reduced.shape[0]
+
+    def with_rows(self, positions: List[int], embeddings: np.ndarray) -> "QuantizedEmbeddingMatrix":
+        """
+        Retourne une copie dont les lignes `positions` sont remplacées (ajoutées en fin
+        de matrice pour les positions à partir de len(self)), sans requantifier les autres.
+
+        Args:
+            positions (List[int]): Position de chaque nouvel embedding.
+            embeddings (np.ndarray): Embeddings complets correspondants (m, d).
+
+        Returns:
+            QuantizedEmbeddingMatrix: Nouvelle matrice (l'instance courante n'est pas modifiée).
+        """
+        rows = QuantizedEmbeddingMatrix(embeddings, self.reduced_dimension, self.precision, keep_full=self.full is not None)
+        positions = np.asarray(positions, dtype=np.int64)
+        size = max(len(self), int(positions.max()) + 1) if len(positions) else len(self)
+
+        def grown(current: Optional[np.ndarray], values: Optional[np.ndarray]) -> Optional[np.ndarray]:
+            if current is None:
+                return None
+            result = np.zeros((size,) + current.shape[1:], dtype=current.dtype)
+            result[:len(current)] = current
+            result[positions] = values
+            return result
+
+        updated = QuantizedEmbeddingMatrix.__new__(QuantizedEmbeddingMatrix)
+        updated.dimension = self.dimension
+        updated.reduced_dimension = self.reduced_dimension
+        updated.precision = self.precision
+        updated.reduced = grown(self.reduced, rows.reduced)
+        updated.scales = grown(self.scales, rows.scales)
+        updated.full = grown(self.full, rows.full)
+        return updated
+
+    def first_pass_scores(self, query_embedding: Union[List[float], np.ndarray]) -> np.ndarray:
+        """
+        Calcule les scores approximatifs de la première passe.
+
+        Args:
+            query_embedding: Embedding complet de la requête.
+
+        Returns:
+            np.ndarray: Scores approximatifs pour chaque ligne.
+        """
+        query = reduce_dimension(query_embedding, self.reduced_dimension)
+        if self.precision == "float32":
+            return self.reduced @ query
+
+        # Conversion par blocs pour borner la mémoire temporaire
+        scores = np.empty(len(self), dtype=np.float32)
+        for start in range(0, len(self), SCORING_BLOCK_SIZE):
+            block = self.reduced[start:start + SCORING_BLOCK_SIZE].astype(np.float32)
+            scores[start:start + SCORING_BLOCK_SIZE] = block @ query
+        if self.scales is not None:
+            scores *= self.scales
+        return scores
+
+    def search(self, query_embedding: Union[List[float], np.ndarray], top_k: int = 5, rescore_factor: int = 4) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Recherche les embeddings les plus proches d'une requête.
+
+        Args:
+            query_embedding: Embedding complet de la requête.
+            top_k (int): Nombre de résultats à retourner.
+            rescore_factor (int): Nombre de candidats rescorés, en multiple de top_k.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Indices des lignes et scores, par score décroissant.
+        """
+        if len(self) == 0 or top_k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        scores = self.first_pass_scores(query_embedding)
+
+        candidate_count = min(len(self), top_k * max(1, rescore_factor) if self.full is not None else top_k)
+        candidates = _top_indices(scores, candidate_count)
+
+        if self.full is not None:
+            query = np.asarray(query_embedding, dtype=np.float32)
+            query = query / (np.linalg.norm(query) or 1.0)
+            candidate_scores = self.full[candidates] @ query
+        else:
+            candidate_scores = scores[candidates]
+
+        order = np.argsort(-candidate_scores)[:top_k]
+        return candidates[order], candidate_scores[order]
+
+    def memory_usage(self) -> Dict[str, int]:
+        """
+        Retourne l'empreinte mémoire des différentes copies en octets.
+
+        Returns:
+            Dict[str, int]: Taille de la copie réduite, des échelles et de la copie complète.
+        """
+        return {
+            "reduced": int(self.reduced.nbytes),
+            "scales": int(self.scales.nbytes) if self.scales is not None else 0,
+            "full": int(self.full.nbytes) if self.full is not None else 0
+        }
+
+
+def _top_indices(scores: np.ndarray, count: int) -> np.ndarray:
+    """
+    Retourne les indices des `count` meilleurs scores, sans ordre garanti.
+    """
+    if count >= len(scores):
+        return np.arange(len(scores))
+    return np.argpartition(-scores, count - 1)[:count]
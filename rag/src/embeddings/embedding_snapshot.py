@@ -0,0 +1,203 @@
+# src/embeddings/embedding_snapshot.py
+import os
+import time
+import struct
+import logging
+from typing import Dict, Any, Optional, Tuple
+import numpy as np
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Format binaire du snapshot :
+#   - en-tête de 64 octets (magic, version, dimension, nombre de lignes, type, date, drapeaux)
+#   - tableau des IDs de pages (int64)
+#   - tableau des IDs de cours des pages (int64, version 2 et drapeau FLAG_COURSE_IDS)
+#   - matrice des embeddings normalisés (float32), alignée sur 64 octets
+# Seul float32 est écrit : l'index vectoriel calcule ses produits directement sur le
+# memmap, partagé entre workers ; une matrice float16 imposerait une copie float32 par
+# worker. Le code float16 reste reconnu à la lecture des anciens fichiers.
+SNAPSHOT_MAGIC = b"MAXEMBED"
+SNAPSHOT_VERSION = 2
+HEADER_FORMAT = "<8sIIQIdI"
+HEADER_SIZE = 64
+ALIGNMENT = 64
+
+DTYPE_CODES = {"float32": 0, "float16": 1}
+SNAPSHOT_DTYPE = "float32"
+FLAG_NORMALIZED = 1
+FLAG_COURSE_IDS = 2
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_snapshot(
+    path: str,
+    page_ids: np.ndarray,
+    embeddings: np.ndarray,
+    course_ids: Optional[np.ndarray] = None
+) -> Dict[str, Any]:
+    """
+    Écrit un snapshot binaire des embeddings (écriture atomique).
+
+    Les lignes sont normalisées avant l'écriture pour que le fichier puisse être
+    utilisé directement par l'index vectoriel, sans copie.
+
+    Args:
+        path (str): Chemin du fichier snapshot.
+        page_ids (np.ndarray): IDs des pages (n,).
+        embeddings (np.ndarray): Embeddings correspondants (n, d).
+        course_ids (Optional[np.ndarray]): Cours de chaque page (n,), pour les recherches filtrées.
+
+    Returns:
+        Dict[str, Any]: En-tête du snapshot écrit.
+    """
+    dtype = SNAPSHOT_DTYPE
+    ids = np.ascontiguousarray(page_ids, dtype=np.int64)
+    matrix = np.atleast_2d(np.asarray(embeddings, dtype=np.float32))
+    if len(ids) == 0:
+        matrix = matrix.reshape(0, matrix.shape[-1] if matrix.size else 0)
+    if len(ids) != matrix.shape[0]:
+        raise ValueError(f"Nombre d'IDs ({len(ids)}) différent du nombre d'embeddings ({matrix.shape[0]})")
+    if course_ids is not None:
+        course_ids = np.ascontiguousarray(course_ids, dtype=np.int64)
+        if len(course_ids) != len(ids):
+            raise ValueError(f"Nombre de cours ({len(course_ids)}) différent du nombre d'IDs ({len(ids)})")
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    matrix = np.ascontiguousarray((matrix / norms).astype(dtype))
+
+    header = {
+        "version": SNAPSHOT_VERSION,
+        "dimension": int(matrix.shape[1]),
+        "count": int(len(ids)),
+        "dtype": dtype,
+        "created_at": time.time(),
+        "normalized": True,
+        "has_course_ids": course_ids is not None
+    }
+    flags = FLAG_NORMALIZED | (FLAG_COURSE_IDS if course_ids is not None else 0)
+    packed = struct.pack(
+        HEADER_FORMAT, SNAPSHOT_MAGIC, header["version"], header["dimension"], header["count"],
+        DTYPE_CODES[dtype], header["created_at"], flags
+    ).ljust(HEADER_SIZE, b"\0")
+
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.tmp"
+
+    with open(temp_path, "wb") as snapshot_file:
+        snapshot_file.write(packed)
+        snapshot_file.write(ids.tobytes())
+        if course_ids is not None:
+            snapshot_file.write(course_ids.tobytes())
+        snapshot_file.write(b"\0" * (_aligned(snapshot_file.tell()) - snapshot_file.tell()))
+        snapshot_file.write(matrix.tobytes())
+
+    # Remplacement atomique : les processus qui lisent l'ancien fichier ne sont pas affectés
+    os.replace(temp_path, path)
+    logger.info(f"Snapshot écrit: {path} ({header['count']} embeddings, dimension {header['dimension']}, {dtype})")
+    return header
+
+
+def read_snapshot_header(path: str) -> Dict[str, Any]:
+    """
+    Lit et valide l'en-tête d'un snapshot.
+
+    Args:
+        path (str): Chemin du fichier snapshot.
+
+    Returns:
+        Dict[str, Any]: En-tête du snapshot.
+    """
+    with open(path, "rb") as snapshot_file:
+        raw = snapshot_file.read(HEADER_SIZE)
+
+    if len(raw) < HEADER_SIZE:
+        raise ValueError(f"Snapshot tronqué: {path}")
+
+    magic, version, dimension, count, dtype_code, created_at, flags = struct.unpack_from(HEADER_FORMAT, raw)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError(f"Fichier snapshot invalide: {path}")
+    if version > SNAPSHOT_VERSION:
+        raise ValueError(f"Version de snapshot non supportée: {version} (maximum: {SNAPSHOT_VERSION})")
+
+    dtype = next((name for name, code in DTYPE_CODES.items() if code == dtype_code), None)
+    if dtype is None:
+        raise ValueError(f"Type de snapshot inconnu: {dtype_code}")
+
+    return {
+        "version": version,
+        "dimension": dimension,
+        "count": count,
+        "dtype": dtype,
+        "created_at": created_at,
+        "normalized": bool(flags & FLAG_NORMALIZED),
+        "has_course_ids": version >= 2 and bool(flags & FLAG_COURSE_IDS)
+    }
+
+
+def read_snapshot(path: str) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+    """
+    Ouvre un snapshot en lecture seule via np.memmap.
+
+    Les pages du fichier sont partagées par le cache du système entre tous les
+    workers qui ouvrent le même snapshot.
+
+    Args:
+        path (str): Chemin du fichier snapshot.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, Dict[str, Any]]: IDs des pages, matrice des
+            embeddings (memmap en lecture seule) et en-tête. L'en-tête contient les
+            cours des pages sous "course_ids" (None pour un snapshot sans cours).
+    """
+    header = read_snapshot_header(path)
+    count, dimension = header["count"], header["dimension"]
+    header["course_ids"] = np.empty(0, dtype=np.int64) if header["has_course_ids"] else None
+
+    if count == 0:
+        return np.empty(0, dtype=np.int64), np.empty((0, dimension), dtype=header["dtype"]), header
+
+    ids = np.memmap(path, dtype=np.int64, mode="r", offset=HEADER_SIZE, shape=(count,))
+    arrays_size = count * 8
+    if header["has_course_ids"]:
+        course_ids = np.memmap(path, dtype=np.int64, mode="r", offset=HEADER_SIZE + count * 8, shape=(count,))
+        header["course_ids"] = np.asarray(course_ids)
+        arrays_size += count * 8
+    matrix_offset = _aligned(HEADER_SIZE + arrays_size)
+    matrix = np.memmap(path, dtype=header["dtype"], mode="r", offset=matrix_offset, shape=(count, dimension))
+
+    logger.info(f"Snapshot ouvert: {path} ({count} embeddings, dimension {dimension}, {header['dtype']})")
+    return np.asarray(ids), matrix, header
+
+
+def export_snapshot(path: str) -> Dict[str, Any]:
+    """
+    Exporte la table page_embeddings vers un snapshot binaire.
+
+    Args:
+        path (str): Chemin du fichier snapshot.
+
+    Returns:
+        Dict[str, Any]: En-tête du snapshot écrit.
+    """
+    # Import local pour éviter un import circulaire avec le stockage des embeddings
+    from src.embeddings.embedding_storage import get_embedding_storage
+
+    storage = get_embedding_storage()
+    page_ids, embeddings = storage.get_all_embeddings()
+    page_courses = storage.get_page_course_ids()
+    course_ids = np.asarray([page_courses.get(int(page_id), -1) for page_id in page_ids], dtype=np.int64)
+    return write_snapshot(path, page_ids, embeddings, course_ids)
+
+
+def get_snapshot_path() -> Optional[str]:
+    """
+    Retourne le chemin du snapshot configuré (EMBEDDING_SNAPSHOT_PATH) ou None.
+    """
+    return os.getenv("EMBEDDING_SNAPSHOT_PATH") or None
@@ -1,13 +1,43 @@
 # src/embeddings/embedding_storage.py
+import json
 import logging
 from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
 from src.storage.supabase_client import get_supabase_client
+from src.search.vector_index import get_active_index
+from src.search.result_cache import get_result_cache
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Nombre de lignes envoyées par requête lors des écritures groupées
+BULK_CHUNK_SIZE = 200
+
+# Nombre d'IDs par filtre `in` lors des lectures groupées (limite la taille des URLs)
+FETCH_CHUNK_SIZE = 100
+
+# Dimension des embeddings générés par l'API multimodale
+EMBEDDING_DIMENSION = 1536
+
+
+def parse_embedding(value: Any) -> np.ndarray:
+    """
+    Convertit un embedding renvoyé par PostgREST en vecteur NumPy.
+    
+    pgvector est sérialisé sous forme de chaîne "[0.1,0.2,...]" par PostgREST,
+    mais une liste Python est également acceptée.
+    
+    Args:
+        value (Any): Valeur de la colonne embedding.
+        
+    Returns:
+        np.ndarray: Embedding en float32.
+    """
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
 class EmbeddingStorage:
     """
     Classe pour gérer le stockage et la récupération des embeddings dans Supabase.
@@ -33,18 +63,15 @@ class EmbeddingStorage:
         """
         try:
             # Préparer les données à insérer
-            data = {
-                "page_id": page_id,
-                # Assurez-vous que l'embedding est envoyé sous forme de liste Python
-                "embedding": embedding
-            }
+            data = self._build_row(page_id, embedding)
             
-            # Insérer l'embedding dans la table page_embeddings
-            result = self.supabase.table("page_embeddings").insert(data).execute()
+            # Upsert sur page_id : réingérer une page remplace son embedding au lieu d'échouer
+            result = self.supabase.table("page_embeddings").upsert(data, on_conflict="page_id").execute()
             
             if result.data and len(result.data) > 0:
                 embedding_id = result.data[0]['id']
                 logger.info(f"Embedding stocké avec succès pour la page {page_id} avec l'ID {embedding_id}")
+                self._sync_vector_index([page_id], [data["embedding"]])
                 return True
             else:
                 logger.warning(f"Impossible de récupérer l'ID pour l'embedding de la page {page_id}")
@@ -54,6 +81,109 @@ class EmbeddingStorage:
             logger.error(f"Erreur lors du stockage de l'embedding pour la page {page_id}: {str(e)}")
             return False
     
+    def store_page_embeddings_bulk(self, pairs: List[Tuple[int, List[float]]]) -> Tuple[List[int], Dict[int, str]]:
+        """
+        Stocke les embeddings de plusieurs pages par lots (upsert sur page_id).
+        
+        Nécessite une contrainte d'unicité sur page_embeddings.page_id : une page
+        déjà indexée voit son embedding remplacé au lieu d'être dupliquée.
+        
+        Args:
+            pairs (List[Tuple[int, List[float]]]): Couples (ID de la page, embedding).
+            
+        Returns:
+            Tuple[List[int], Dict[int, str]]: IDs des pages stockées avec succès et
+                erreurs par page pour les lignes en échec.
+        """
+        stored_ids = []
+        failures = {}
+        
+        # Dédupliquer les pages en conservant le dernier embedding fourni
+        rows_by_page = {}
+        for page_id, embedding in pairs:
+            try:
+                rows_by_page[page_id] = self._build_row(page_id, embedding)
+            except Exception as e:
+                failures[page_id] = str(e)
+        rows = list(rows_by_page.values())
+        
+        for i in range(0, len(rows), BULK_CHUNK_SIZE):
+            chunk = rows[i:i + BULK_CHUNK_SIZE]
+            try:
+                self._upsert_rows(chunk)
+                stored_ids.extend(row["page_id"] for row in chunk)
+            except Exception as e:
+                # Rejouer le lot ligne par ligne pour isoler les lignes fautives
+                logger.warning(f"Échec du lot de {len(chunk)} embeddings, nouvel essai ligne par ligne: {str(e)}")
+                for row in chunk:
+                    try:
+                        self._upsert_rows([row])
+                        stored_ids.append(row["page_id"])
+                    except Exception as row_error:
+                        failures[row["page_id"]] = str(row_error)
+        
+        logger.info(f"{len(stored_ids)} embeddings stockés par lots, {len(failures)} échecs")
+        self._sync_vector_index(stored_ids, [rows_by_page[page_id]["embedding"] for page_id in stored_ids])
+        for page_id, error in failures.items():
+            logger.error(f"Erreur lors du stockage de l'embedding pour la page {page_id}: {error}")
+        
+        return stored_ids, failures
+    
+    def _build_row(self, page_id: int, embedding: List[float]) -> Dict[str, Any]:
+        """
+        Prépare la ligne page_embeddings d'une page.
+        
+        Args:
+            page_id (int): ID de la page.
+            embedding (List[float]): Embedding de la page.
+            
+        Returns:
+            Dict[str, Any]: Ligne à écrire dans la table page_embeddings.
+        """
+        return {
+            "page_id": page_id,
+            # Assurez-vous que l'embedding est envoyé sous forme de liste Python
+            "embedding": [float(value) for value in embedding]
+        }
+    
+    def _upsert_rows(self, rows: List[Dict[str, Any]]) -> None:
+        """
+        Écrit un lot de lignes dans page_embeddings en une seule requête.
+        
+        Args:
+            rows (List[Dict[str, Any]]): Lignes à écrire.
+        """
+        self.supabase.table("page_embeddings").upsert(
+            rows,
+            on_conflict="page_id",
+            returning="minimal"
+        ).execute()
+    
+    def _sync_vector_index(self, page_ids: List[int], embeddings: List[List[float]]) -> None:
+        """
+        Répercute les embeddings écrits dans l'index en processus actif et périme les
+        résultats de recherche en cache (nouvelle version du corpus).
+        
+        L'index est chargé (ou construit) avant l'insertion si ce worker n'a pas encore
+        fait de recherche : sinon les pages ingérées n'y entreraient jamais.
+        
+        Args:
+            page_ids (List[int]): IDs des pages écrites.
+            embeddings (List[List[float]]): Embeddings correspondants.
+        """
+        if page_ids:
+            get_result_cache().bump_version()
+        
+        vector_index = get_active_index()
+        if not page_ids or vector_index is None:
+            return
+        try:
+            vector_index.ensure_fresh()
+            course_ids = self.get_page_course_ids(page_ids)
+            vector_index.add(page_ids, embeddings, [course_ids.get(page_id, -1) for page_id in page_ids])
+        except Exception as e:
+            logger.error(f"Erreur lors de la mise à jour de l'index vectoriel: {str(e)}")
+    
     def get_page_embedding(self, page_id: int) -> Optional[List[float]]:
         """
         Récupère l'embedding d'une page depuis Supabase.
@@ -80,6 +210,127 @@ class EmbeddingStorage:
             logger.error(f"Erreur lors de la récupération de l'embedding pour la page {page_id}: {str(e)}")
             return None
     
+    def get_page_embeddings(self, page_ids: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Récupère les embeddings de plusieurs pages avec des filtres `in` par lots.
+        
+        Args:
+            page_ids (List[int]): IDs des pages.
+            
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Matrice float32 (len(page_ids), d) alignée sur
+                page_ids et masque booléen des pages trouvées. Les lignes des pages
+                sans embedding sont nulles.
+        """
+        unique_ids = list(dict.fromkeys(page_ids))
+        embeddings_by_page = {}
+        
+        for i in range(0, len(unique_ids), FETCH_CHUNK_SIZE):
+            chunk = unique_ids[i:i + FETCH_CHUNK_SIZE]
+            try:
+                result = self.supabase.table("page_embeddings").select(
+                    "page_id, embedding"
+                ).in_("page_id", chunk).execute()
+                
+                for row in result.data or []:
+                    if row.get("embedding") is not None:
+                        embeddings_by_page[row["page_id"]] = parse_embedding(row["embedding"])
+                        
+            except Exception as e:
+                logger.error(f"Erreur lors de la récupération groupée de {len(chunk)} embeddings: {str(e)}")
+        
+        if embeddings_by_page:
+            dimension = len(next(iter(embeddings_by_page.values())))
+        else:
+            dimension = EMBEDDING_DIMENSION
+        
+        matrix = np.zeros((len(page_ids), dimension), dtype=np.float32)
+        found = np.zeros(len(page_ids), dtype=bool)
+        for row_index, page_id in enumerate(page_ids):
+            embedding = embeddings_by_page.get(page_id)
+            if embedding is not None:
+                matrix[row_index] = embedding
+                found[row_index] = True
+        
+        missing = len(page_ids) - int(found.sum())
+        if missing:
+            logger.warning(f"Aucun embedding trouvé pour {missing} pages sur {len(page_ids)}")
+        logger.info(f"{int(found.sum())} embeddings récupérés en {(len(unique_ids) + FETCH_CHUNK_SIZE - 1) // FETCH_CHUNK_SIZE} requêtes")
+        
+        return matrix, found
+    
+    def get_all_embeddings(self, page_size: int = 500) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Récupère tous les embeddings de la table page_embeddings, par pages de résultats.
+        
+        Args:
+            page_size (int): Nombre de lignes récupérées par requête.
+            
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: IDs des pages (n,) et matrice float32 (n, d).
+        """
+        page_ids = []
+        embeddings = []
+        offset = 0
+        
+        while True:
+            result = self.supabase.table("page_embeddings").select(
+                "page_id, embedding"
+            ).order("page_id").range(offset, offset + page_size - 1).execute()
+            
+            rows = result.data or []
+            for row in rows:
+                if row.get("embedding") is not None:
+                    page_ids.append(row["page_id"])
+                    embeddings.append(parse_embedding(row["embedding"]))
+            
+            if len(rows) < page_size:
+                break
+            offset += page_size
+        
+        logger.info(f"{len(page_ids)} embeddings chargés depuis page_embeddings")
+        
+        if not embeddings:
+            return np.empty(0, dtype=np.int64), np.empty((0, EMBEDDING_DIMENSION), dtype=np.float32)
+        return np.asarray(page_ids, dtype=np.int64), np.vstack(embeddings)
+    
+    def get_page_course_ids(self, page_ids: Optional[List[int]] = None, page_size: int = 500) -> Dict[int, int]:
+        """
+        Récupère le cours de chaque page, utilisé pour filtrer les recherches par cours.
+        
+        Args:
+            page_ids (Optional[List[int]]): IDs des pages, ou None pour toutes les pages.
+            page_size (int): Nombre de lignes récupérées par requête (toutes les pages).
+            
+        Returns:
+            Dict[int, int]: course_id indexé par ID de page.
+        """
+        course_ids: Dict[int, int] = {}
+        
+        if page_ids is not None:
+            unique_ids = list(dict.fromkeys(int(page_id) for page_id in page_ids))
+            for i in range(0, len(unique_ids), FETCH_CHUNK_SIZE):
+                result = self.supabase.table("pages").select(
+                    "id, course_id"
+                ).in_("id", unique_ids[i:i + FETCH_CHUNK_SIZE]).execute()
+                course_ids.update({row["id"]: row["course_id"] for row in result.data or []})
+            return course_ids
+        
+        offset = 0
+        while True:
+            result = self.supabase.table("pages").select(
+                "id, course_id"
+            ).order("id").range(offset, offset + page_size - 1).execute()
+            
+            rows = result.data or []
+            course_ids.update({row["id"]: row["course_id"] for row in rows})
+            
+            if len(rows) < page_size:
+                break
+            offset += page_size
+        
+        return course_ids
+    
     def find_similar_pages(self, query_embedding: List[float], top_k: int = 5) -> List[Dict[str, Any]]:
         """
         Recherche les pages les plus similaires à une requête donnée.
@@ -92,6 +343,14 @@ class EmbeddingStorage:
             List[Dict[str, Any]]: Liste des pages similaires avec leurs scores.
         """
         try:
+            # Recherche dans l'index en processus si un tel backend est configuré
+            vector_index = get_active_index()
+            if vector_index is not None:
+                vector_index.ensure_fresh()
+                results = vector_index.search(query_embedding, top_k, 0.5)
+                logger.info(f"Recherche de similarité en mémoire réussie, {len(results)} résultats trouvés")
+                return results
+            
             # Exécuter la requête RPC pour calculer la similarité
             rpc_response = self.supabase.rpc(
                 "match_page_embeddings",
@@ -4,6 +4,10 @@ import fitz  # PyMuPDF
 from PIL import Image
 import io
 import logging
+from src.search.page_cache import get_page_cache
+from src.search.lexical_index import get_lexical_index
+from src.search.result_cache import get_result_cache
+from src.search.chunk_index import get_chunk_index
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
@@ -111,6 +115,7 @@ class PDFExtractor:
         """
         try:
             page_ids = []
+            page_texts = []
             
             for page_info in pages_info:
                 # Insertion dans la table 'pages'
@@ -120,10 +125,19 @@ class PDFExtractor:
                 if result.data and len(result.data) > 0:
                     page_id = result.data[0]['id']
                     page_ids.append(page_id)
+                    page_texts.append(page_info.get('content_text') or "")
                     logger.info(f"Page {page_info['page_number']} enregistrée avec l'ID {page_id}")
                 else:
                     logger.warning(f"Impossible de récupérer l'ID pour la page {page_info['page_number']}")
             
+            # Les numéros de pages du cours pointent désormais vers les nouvelles lignes
+            for course_id in {page_info.get('course_id') for page_info in pages_info}:
+                get_page_cache().invalidate_course(course_id)
+            get_lexical_index().invalidate()
+            # Découpage des nouvelles pages en passages, hors du chemin de la requête d'ingestion
+            get_chunk_index().add_pages_in_background(page_ids, page_texts)
+            get_result_cache().bump_version()
+            
             return page_ids
             
         except Exception as e:
@@ -0,0 +1,67 @@
+# src/processing/text_chunker.py
+import re
+from typing import List
+
+# Taille maximale d'un passage, en caractères (environ 140 tokens)
+CHUNK_MAX_CHARS = 500
+
+# Un paragraphe plus court que cette taille est regroupé avec le suivant
+CHUNK_MIN_CHARS = 40
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+# Fin de phrase (ponctuation suivie d'espaces) ou de ligne (puces d'une diapositive)
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?;:])\s+|\n+")
+
+
+def _split_long(unit: str, max_chars: int) -> List[str]:
+    # Phrase sans ponctuation plus longue qu'un passage : coupure sur les espaces
+    pieces = []
+    while len(unit) > max_chars:
+        cut = unit.rfind(" ", 0, max_chars)
+        if cut <= 0:
+            cut = max_chars
+        pieces.append(unit[:cut].strip())
+        unit = unit[cut:].strip()
+    if unit:
+        pieces.append(unit)
+    return pieces
+
+
+def split_into_chunks(text: str, max_chars: int = CHUNK_MAX_CHARS, min_chars: int = CHUNK_MIN_CHARS) -> List[str]:
+    """
+    Découpe le texte d'une page en passages, dans l'ordre de lecture.
+
+    Les paragraphes (séparés par une ligne vide) sont conservés lorsqu'ils tiennent
+    dans un passage ; les plus longs sont découpés sur les fins de phrases et de
+    lignes (puces d'une diapositive), les plus courts (titres) sont regroupés avec
+    le paragraphe suivant.
+
+    Args:
+        text (str): Texte de la page.
+        max_chars (int): Taille maximale d'un passage, en caractères.
+        min_chars (int): Taille en dessous de laquelle un passage est complété par le suivant.
+
+    Returns:
+        List[str]: Passages de la page (vide si le texte est vide).
+    """
+    chunks: List[str] = []
+    current = ""
+
+    for paragraph in PARAGRAPH_BREAK.split(text or ""):
+        units = [unit.strip() for unit in SENTENCE_BOUNDARY.split(paragraph) if unit and unit.strip()]
+        for unit in units:
+            for piece in _split_long(unit, max_chars):
+                if current and len(current) + 1 + len(piece) > max_chars:
+                    chunks.append(current)
+                    current = ""
+                current = f"{current} {piece}" if current else piece
+
+        # Fin de paragraphe : nouveau passage, sauf si le passage courant est un simple titre
+        if len(current) >= min_chars:
+            chunks.append(current)
+            current = ""
+
+    if current:
+        chunks.append(current)
+    return chunks
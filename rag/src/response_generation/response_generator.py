@@ -7,7 +7,7 @@ pédagogiques à partir de la recherche RAG et en utilisant différents LLMs via
 import logging
 import time
 import json
-from typing import Dict, List, Any, Optional, Tuple, Union
+from typing import Dict, List, Any, Optional, Tuple, Union, Iterator
 import sys
 import os
 
@@ -45,7 +45,10 @@ class ResponseGenerator:
         model: Optional[str] = None, 
         temperature: Optional[float] = None,
         max_tokens: Optional[int] = None,
-        metadata: Optional[Dict[str, Any]] = None
+        metadata: Optional[Dict[str, Any]] = None,
+        debug: bool = False,
+        course_ids: Optional[List[int]] = None,
+        year: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Génère une réponse éducative à partir d'une requête.
@@ -57,6 +60,9 @@ class ResponseGenerator:
             temperature: La température pour la génération (par défaut: 0.3)
             max_tokens: Le nombre maximum de tokens à générer
             metadata: Métadonnées supplémentaires pour le prompt
+            debug: Si True, ajoute la durée de chaque étape dans "timings"
+            course_ids: Limite la recherche à ces cours
+            year: Limite la recherche aux cours de cette année (ING1, ING2, ING3)
             
         Returns:
             Dictionnaire contenant la réponse et des métadonnées
@@ -69,31 +75,14 @@ class ResponseGenerator:
         temperature = temperature if temperature is not None else self.default_temperature
         max_tokens = max_tokens or self.default_max_tokens
         
-        # Étape 1: Récupérer les informations pertinentes via le RAG
-        rag_result = self.rag_engine.retrieve(query)
-        
-        # Extraire le contexte
-        context = rag_result.get("context", "")
-        
-        # Extraire ou créer les métadonnées
-        if metadata is None:
-            metadata = {}
-        
-        # Ajouter les métadonnées du RAG si disponibles
-        if "metadata" in rag_result:
-            metadata.update(rag_result["metadata"])
-        
-        # Étape 2: Construire le prompt approprié
-        prompt = self.prompt_builder.build_prompt(query_type, context, query, metadata)
-        
-        # Étape 3: Préparer les messages pour OpenRouter au format attendu
-        messages = [
-            {"role": "system", "content": "Vous êtes un assistant expert en électronique, spécialisé dans l'éducation pour les étudiants en école d'ingénieur."},
-            {"role": "user", "content": prompt}
-        ]
+        # Étapes 1 à 3: contexte RAG, prompt et messages
+        messages, rag_result, timings = self._prepare_messages(
+            query, query_type, model, max_tokens, metadata, debug, course_ids, year
+        )
         
         # Étape 4: Appeler le LLM via OpenRouter
         try:
+            llm_start = time.time()
             response = self.openrouter_client.generate_response(
                 messages=messages,
                 model=model,
@@ -119,6 +108,10 @@ class ResponseGenerator:
                 "status": "success"
             }
             
+            if timings is not None:
+                timings["llm"] = time.time() - llm_start
+                result["timings"] = timings
+            
             # Ajouter des métadonnées supplémentaires si disponibles
             if "search_results" in rag_result:
                 # Limiter le nombre de résultats à inclure
@@ -138,6 +131,159 @@ class ResponseGenerator:
                 "error": str(e)
             }
     
+    def stream_response(
+        self,
+        query: str,
+        query_type: str = "question",
+        model: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        metadata: Optional[Dict[str, Any]] = None,
+        debug: bool = False,
+        course_ids: Optional[List[int]] = None,
+        year: Optional[str] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Génère une réponse éducative en streaming.
+        
+        Les pages du contexte sont envoyées avant le premier token, puis chaque
+        fragment du modèle dès sa réception ; l'événement final contient la réponse
+        complète traitée selon le type de requête, le délai du premier token et la
+        durée totale.
+        
+        Args:
+            Identiques à generate_response
+            
+        Yields:
+            Événements {"event": "sources" | "token" | "done" | "error", "data": {...}}
+        """
+        start_time = time.time()
+        logger.info(f"Génération de réponse en streaming pour la requête: {query}")
+        
+        # Utiliser les valeurs par défaut si non spécifiées
+        model = model or self.default_model
+        temperature = temperature if temperature is not None else self.default_temperature
+        max_tokens = max_tokens or self.default_max_tokens
+        
+        fragments = []
+        time_to_first_token = None
+        try:
+            messages, rag_result, timings = self._prepare_messages(
+                query, query_type, model, max_tokens, metadata, debug, course_ids, year
+            )
+            
+            # Les sources sont connues avant la génération : le client peut les afficher tout de suite
+            rag_metadata = rag_result.get("metadata", {})
+            yield {
+                "event": "sources",
+                "data": {
+                    "model_used": model,
+                    "query_type": query_type,
+                    "pages": rag_metadata.get("pages", []),
+                    "courses": rag_metadata.get("courses", {})
+                }
+            }
+            
+            llm_start = time.time()
+            for content in self.openrouter_client.stream_response(
+                messages=messages,
+                model=model,
+                temperature=temperature,
+                max_tokens=max_tokens
+            ):
+                if time_to_first_token is None:
+                    time_to_first_token = time.time() - start_time
+                    logger.info(f"Premier token reçu en {time_to_first_token:.2f} secondes avec le modèle {model}")
+                fragments.append(content)
+                yield {"event": "token", "data": {"content": content}}
+            
+        except Exception as e:
+            logger.error(f"Erreur lors de la génération de la réponse en streaming: {str(e)}")
+            yield {
+                "event": "error",
+                "data": {
+                    "error": str(e),
+                    "processing_time": time.time() - start_time,
+                    "model_used": model,
+                    "query_type": query_type,
+                    "status": "error"
+                }
+            }
+            return
+        
+        processing_time = time.time() - start_time
+        result = {
+            "response": self._process_response_by_type("".join(fragments), query_type),
+            "processing_time": processing_time,
+            "time_to_first_token": time_to_first_token,
+            "model_used": model,
+            "query_type": query_type,
+            "status": "success"
+        }
+        
+        if timings is not None:
+            timings["llm_first_token"] = (time_to_first_token or processing_time) - (llm_start - start_time)
+            timings["llm"] = time.time() - llm_start
+            result["timings"] = timings
+        
+        first_token = f"{time_to_first_token:.2f}" if time_to_first_token is not None else "-"
+        logger.info(
+            f"Réponse générée en streaming en {processing_time:.2f} secondes "
+            f"(premier token: {first_token} s) avec le modèle {model}"
+        )
+        yield {"event": "done", "data": result}
+    
+    def _prepare_messages(
+        self,
+        query: str,
+        query_type: str,
+        model: str,
+        max_tokens: int,
+        metadata: Optional[Dict[str, Any]],
+        debug: bool,
+        course_ids: Optional[List[int]],
+        year: Optional[str]
+    ) -> Tuple[List[Dict[str, str]], Dict[str, Any], Optional[Dict[str, float]]]:
+        """
+        Construit les messages envoyés au LLM à partir du contexte RAG.
+        
+        Returns:
+            Messages pour OpenRouter, résultat du RAG et durées des étapes (si debug)
+        """
+        # Étape 1: Récupérer les informations pertinentes via le RAG, dans le budget de tokens du modèle
+        rag_result = self.rag_engine.build_context_for_llm(
+            query,
+            top_k=5,
+            model=model,
+            max_tokens=max_tokens,
+            debug=debug,
+            course_ids=course_ids,
+            year=year
+        )
+        timings = rag_result.pop("timings", None)
+        
+        # Extraire le contexte
+        context = rag_result.get("context", "")
+        
+        # Extraire ou créer les métadonnées
+        if metadata is None:
+            metadata = {}
+        
+        # Ajouter les métadonnées du RAG si disponibles
+        if "metadata" in rag_result:
+            metadata.update(rag_result["metadata"])
+        
+        # Étape 2: Construire le prompt approprié
+        prompt = self.prompt_builder.build_prompt(query_type, context, query, metadata)
+        
+        # Étape 3: Préparer les messages pour OpenRouter au format attendu
+        messages = [
+            {"role": "system", "content": "Vous êtes un assistant expert en électronique, spécialisé dans l'éducation pour les étudiants en école d'ingénieur."},
+            {"role": "user", "content": prompt}
+        ]
+        
+        return messages, rag_result, timings
+    
     def _extract_response_text(self, response: Dict[str, Any]) -> str:
         """
         Extrait le texte de la réponse du modèle.
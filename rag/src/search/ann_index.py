@@ -0,0 +1,484 @@
+# src/search/ann_index.py
+import os
+import logging
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Optional, Tuple, Union
+import numpy as np
+from src.search.vector_index import normalize_rows, top_k_indices, course_rows
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou entre processus
+    fcntl = None
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Nombre de lignes traitées à la fois lors de l'affectation aux centroïdes
+ASSIGNMENT_BLOCK_SIZE = 4096
+
+# Version du format de fichier de l'index (2 : cours de chaque page)
+ANN_INDEX_VERSION = 2
+
+
+def spherical_kmeans(embeddings: np.ndarray, n_clusters: int, n_iter: int = 15, seed: int = 0) -> np.ndarray:
+    """
+    K-means sphérique (similarité cosinus) pour la quantification grossière.
+
+    Args:
+        embeddings (np.ndarray): Embeddings normalisés (n, d).
+        n_clusters (int): Nombre de centroïdes.
+        n_iter (int): Nombre d'itérations.
+        seed (int): Graine aléatoire.
+
+    Returns:
+        np.ndarray: Centroïdes normalisés (n_clusters, d).
+    """
+    rng = np.random.default_rng(seed)
+    n_clusters = max(1, min(n_clusters, len(embeddings)))
+    centroids = embeddings[rng.choice(len(embeddings), n_clusters, replace=False)].copy()
+
+    for _ in range(n_iter):
+        assignments = assign_to_centroids(embeddings, centroids)
+
+        # Sommes par cluster via un tri et reduceat (bien plus rapide que np.add.at)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=n_clusters)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        sums = np.zeros_like(centroids)
+        non_empty = counts > 0
+        sums[non_empty] = np.add.reduceat(embeddings[order], starts[non_empty], axis=0)
+
+        # Réinitialiser les listes vides sur des points tirés au hasard
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            sums[empty] = embeddings[rng.choice(len(embeddings), len(empty), replace=False)]
+
+        centroids = normalize_rows(sums)
+
+    return centroids
+
+
+def assign_to_centroids(embeddings: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """
+    Affecte chaque embedding au centroïde le plus proche, par blocs.
+
+    Args:
+        embeddings (np.ndarray): Embeddings normalisés (n, d).
+        centroids (np.ndarray): Centroïdes normalisés (k, d).
+
+    Returns:
+        np.ndarray: Indice du centroïde de chaque embedding (n,).
+    """
+    assignments = np.empty(len(embeddings), dtype=np.int64)
+    for start in range(0, len(embeddings), ASSIGNMENT_BLOCK_SIZE):
+        block = embeddings[start:start + ASSIGNMENT_BLOCK_SIZE]
+        assignments[start:start + ASSIGNMENT_BLOCK_SIZE] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+
+@contextmanager
+def _file_lock(path: str):
+    """
+    Verrou exclusif entre processus sur le fichier de l'index (fichier "<path>.lock").
+    """
+    if fcntl is None:
+        yield
+        return
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(f"{path}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _file_version(path: str) -> Optional[int]:
+    # Date de modification en nanosecondes, None si le fichier n'existe pas
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+class IVFIndex:
+    """
+    Index approximatif IVF (inverted file) en NumPy pur pour les grands corpus.
+
+    Les embeddings sont répartis en listes par k-means sphérique. Une recherche
+    ne parcourt que les `nprobe` listes dont les centroïdes sont les plus proches
+    de la requête, au lieu de l'ensemble du corpus.
+
+    Le fichier est partagé par les workers : chacun le recharge lorsqu'un autre l'a
+    réenregistré, et les insertions locales pas encore enregistrées sont
+    réappliquées après chaque rechargement puis fusionnées à l'enregistrement.
+    """
+
+    def __init__(self, n_lists: Optional[int] = None, nprobe: int = 8, path: Optional[str] = None):
+        """
+        Initialise un index vide.
+
+        Args:
+            n_lists (Optional[int]): Nombre de listes (par défaut ~ racine du nombre de pages).
+            nprobe (int): Nombre de listes parcourues par recherche (compromis rappel/latence).
+            path (Optional[str]): Fichier de persistance de l'index.
+        """
+        self.n_lists = n_lists
+        self.nprobe = nprobe
+        self.path = path
+        self.centroids: Optional[np.ndarray] = None
+        self.list_ids: List[np.ndarray] = []
+        self.list_vectors: List[np.ndarray] = []
+        self.list_courses: List[np.ndarray] = []
+        self._list_of: Dict[int, int] = {}
+        self.dirty = False
+        # Version du fichier lue ou écrite en dernier, et insertions locales non enregistrées
+        self._file_version: Optional[int] = None
+        self._pending: Dict[int, Tuple[np.ndarray, int]] = {}
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._list_of)
+
+    def __contains__(self, page_id: int) -> bool:
+        return int(page_id) in self._list_of
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.centroids is not None
+
+    def build(self, page_ids: np.ndarray, embeddings: np.ndarray, n_iter: int = 15, course_ids: Optional[np.ndarray] = None) -> None:
+        """
+        Entraîne les centroïdes et construit les listes inversées.
+
+        Args:
+            page_ids (np.ndarray): IDs des pages (n,).
+            embeddings (np.ndarray): Embeddings correspondants (n, d).
+            n_iter (int): Nombre d'itérations du k-means.
+            course_ids (Optional[np.ndarray]): Cours de chaque page (n,), -1 si inconnu.
+        """
+        ids = np.asarray(page_ids, dtype=np.int64)
+        courses = np.full(len(ids), -1, dtype=np.int64) if course_ids is None else np.asarray(course_ids, dtype=np.int64)
+        vectors = normalize_rows(embeddings)
+        n_lists = self.n_lists or max(1, int(np.sqrt(len(ids))))
+
+        centroids = spherical_kmeans(vectors, n_lists, n_iter)
+        assignments = assign_to_centroids(vectors, centroids)
+
+        with self._lock:
+            self.centroids = centroids
+            self.list_ids = [ids[assignments == i] for i in range(len(centroids))]
+            self.list_vectors = [np.ascontiguousarray(vectors[assignments == i]) for i in range(len(centroids))]
+            self.list_courses = [courses[assignments == i] for i in range(len(centroids))]
+            self._list_of = {int(page_id): int(list_index) for page_id, list_index in zip(ids, assignments)}
+            self.dirty = True
+
+        logger.info(f"Index IVF construit: {len(ids)} embeddings répartis en {len(centroids)} listes")
+
+    def add(self, page_ids: List[int], embeddings: Union[List[List[float]], np.ndarray], course_ids: Optional[List[int]] = None) -> None:
+        """
+        Insère ou remplace des embeddings sans réentraîner les centroïdes.
+
+        Args:
+            page_ids (List[int]): IDs des pages.
+            embeddings: Embeddings correspondants.
+            course_ids (Optional[List[int]]): Cours de chaque page, -1 si inconnu.
+        """
+        if not len(page_ids):
+            return
+
+        vectors = normalize_rows(embeddings)
+        courses = np.full(len(page_ids), -1, dtype=np.int64) if course_ids is None else np.asarray(course_ids, dtype=np.int64)
+
+        with self._lock:
+            for page_id, vector, course_id in zip(page_ids, vectors, courses):
+                self._pending[int(page_id)] = (vector, int(course_id))
+            self._insert(np.asarray(page_ids, dtype=np.int64), vectors, courses)
+
+        logger.info(f"{len(page_ids)} embeddings insérés dans l'index IVF ({len(self)} au total)")
+
+    def _insert(self, page_ids: np.ndarray, vectors: np.ndarray, courses: np.ndarray) -> None:
+        # Appelé sous self._lock, avec des vecteurs déjà normalisés
+        if self.centroids is None:
+            self.build(page_ids, vectors, course_ids=courses)
+            return
+
+        self._remove([int(page_id) for page_id in page_ids])
+        assignments = assign_to_centroids(vectors, self.centroids)
+        for list_index in np.unique(assignments):
+            mask = assignments == list_index
+            new_ids = page_ids[mask]
+            self.list_ids[list_index] = np.concatenate([self.list_ids[list_index], new_ids])
+            self.list_vectors[list_index] = np.vstack([self.list_vectors[list_index], vectors[mask]])
+            self.list_courses[list_index] = np.concatenate([self.list_courses[list_index], courses[mask]])
+            for page_id in new_ids:
+                self._list_of[int(page_id)] = int(list_index)
+        self.dirty = True
+
+    def _remove(self, page_ids: List[int]) -> None:
+        lists_to_clean: Dict[int, List[int]] = {}
+        for page_id in page_ids:
+            list_index = self._list_of.pop(page_id, None)
+            if list_index is not None:
+                lists_to_clean.setdefault(list_index, []).append(page_id)
+
+        for list_index, removed in lists_to_clean.items():
+            keep = ~np.isin(self.list_ids[list_index], removed)
+            self.list_ids[list_index] = self.list_ids[list_index][keep]
+            self.list_vectors[list_index] = self.list_vectors[list_index][keep]
+            self.list_courses[list_index] = self.list_courses[list_index][keep]
+
+    def get_vectors(self, page_ids: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Retourne les embeddings normalisés de pages de l'index.
+
+        Args:
+            page_ids (List[int]): IDs des pages.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Matrice (n, d), lignes nulles pour les pages
+                absentes, et masque des pages trouvées (n,).
+        """
+        dimension = self.centroids.shape[1] if self.centroids is not None else 0
+        vectors = np.zeros((len(page_ids), dimension), dtype=np.float32)
+        found = np.zeros(len(page_ids), dtype=bool)
+
+        with self._lock:
+            for position, page_id in enumerate(page_ids):
+                list_index = self._list_of.get(int(page_id))
+                if list_index is None:
+                    continue
+                row = np.flatnonzero(self.list_ids[list_index] == int(page_id))
+                if len(row):
+                    vectors[position] = self.list_vectors[list_index][row[0]]
+                    found[position] = True
+
+        return vectors, found
+
+    def search(
+        self,
+        query_embedding: Union[List[float], np.ndarray],
+        top_k: int = 5,
+        threshold: float = 0.5,
+        nprobe: Optional[int] = None,
+        course_ids: Optional[List[int]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Recherche approximative des pages les plus similaires.
+
+        Avec un filtre de cours, les listes sont parcourues par proximité de leur
+        centroïde en ignorant celles sans page des cours demandés, jusqu'à avoir
+        parcouru `nprobe` listes utiles et réuni au moins top_k candidats : le
+        top-k reste complet et le rappel ne s'effondre pas pour un petit cours.
+
+        Args:
+            query_embedding: Embedding de la requête.
+            top_k (int): Nombre maximum de résultats à retourner.
+            threshold (float): Seuil de similarité minimum (de 0 à 1).
+            nprobe (Optional[int]): Nombre de listes parcourues (par défaut celui de l'index).
+            course_ids (Optional[List[int]]): Cours autorisés (None pour tout le corpus).
+
+        Returns:
+            List[Dict[str, Any]]: Résultats (page_id, similarity) par similarité décroissante.
+        """
+        # Références lues ensemble sous verrou : une insertion ou un rechargement concurrent
+        # ne désaligne pas centroïdes, IDs et vecteurs
+        with self._lock:
+            centroids = self.centroids
+            all_lists = list(zip(self.list_ids, self.list_vectors, self.list_courses))
+        if centroids is None or top_k <= 0:
+            return []
+
+        query = normalize_rows(query_embedding)[0]
+        probe_count = min(nprobe or self.nprobe, len(centroids))
+
+        candidate_ids = []
+        candidate_scores = []
+        if course_ids is None:
+            probed, _ = top_k_indices(centroids @ query, probe_count)
+            for list_index in probed:
+                ids, vectors, _ = all_lists[list_index]
+                if len(ids):
+                    candidate_ids.append(ids)
+                    candidate_scores.append(vectors @ query)
+        else:
+            candidate_count = 0
+            for list_index in np.argsort(-(centroids @ query), kind="stable"):
+                ids, vectors, courses = all_lists[list_index]
+                rows = course_rows(courses, course_ids)
+                if not len(rows):
+                    continue
+                candidate_ids.append(ids[rows])
+                candidate_scores.append(vectors[rows] @ query)
+                candidate_count += len(rows)
+                if len(candidate_ids) >= probe_count and candidate_count >= top_k:
+                    break
+
+        if not candidate_ids:
+            return []
+
+        ids = np.concatenate(candidate_ids)
+        indices, similarities = top_k_indices(np.concatenate(candidate_scores), top_k)
+
+        return [
+            {"page_id": int(ids[index]), "similarity": float(similarity)}
+            for index, similarity in zip(indices, similarities)
+            if similarity > threshold
+        ]
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Enregistre l'index sur disque (format .npz).
+
+        Args:
+            path (Optional[str]): Chemin du fichier (par défaut celui de l'index).
+        """
+        path = path or self.path
+        if not path or self.centroids is None:
+            return
+
+        with _file_lock(path), self._lock:
+            # Un autre worker a enregistré le fichier depuis notre lecture : repartir de
+            # sa version (nos insertions sont réappliquées) au lieu de l'écraser
+            if path == self.path and _file_version(path) not in (None, self._file_version):
+                self._read(path)
+
+            sizes = np.asarray([len(ids) for ids in self.list_ids], dtype=np.int64)
+            dimension = self.centroids.shape[1]
+            ids = np.concatenate(self.list_ids) if len(self) else np.empty(0, dtype=np.int64)
+            courses = np.concatenate(self.list_courses) if len(self) else np.empty(0, dtype=np.int64)
+            vectors = np.vstack(self.list_vectors) if len(self) else np.empty((0, dimension), dtype=np.float32)
+
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            temp_path = f"{path}.tmp.npz"
+            np.savez(
+                temp_path,
+                version=np.asarray(ANN_INDEX_VERSION),
+                nprobe=np.asarray(self.nprobe),
+                centroids=self.centroids,
+                list_sizes=sizes,
+                ids=ids,
+                course_ids=courses,
+                vectors=vectors
+            )
+            os.replace(temp_path, path)
+            if path == self.path:
+                self._file_version = _file_version(path)
+                self._pending.clear()
+            self.dirty = False
+
+        logger.info(f"Index IVF enregistré: {path} ({len(self)} embeddings)")
+
+    def load(self, path: Optional[str] = None) -> None:
+        """
+        Charge un index enregistré par save().
+
+        Les insertions locales pas encore enregistrées sont réappliquées au contenu du fichier.
+
+        Args:
+            path (Optional[str]): Chemin du fichier (par défaut celui de l'index).
+        """
+        with self._lock:
+            self._read(path or self.path)
+
+    def _read(self, path: str) -> None:
+        # Appelé sous self._lock
+        version_before = _file_version(path)
+        with np.load(path) as data:
+            version = int(data["version"])
+            if version > ANN_INDEX_VERSION:
+                raise ValueError(f"Version d'index IVF non supportée: {version}")
+
+            offsets = np.concatenate([[0], np.cumsum(data["list_sizes"])])
+            ids, vectors = data["ids"], data["vectors"]
+            if "course_ids" in data:
+                courses = data["course_ids"]
+            else:
+                # Index de version 1 : les cours des pages sont lus dans la table pages
+                from src.embeddings.embedding_storage import get_embedding_storage
+                page_courses = get_embedding_storage().get_page_course_ids()
+                courses = np.asarray([page_courses.get(int(page_id), -1) for page_id in ids], dtype=np.int64)
+
+            self.centroids = data["centroids"]
+            self.list_ids = [ids[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+            self.list_vectors = [np.ascontiguousarray(vectors[offsets[i]:offsets[i + 1]]) for i in range(len(offsets) - 1)]
+            self.list_courses = [courses[offsets[i]:offsets[i + 1]] for i in range(len(offsets) - 1)]
+            self._list_of = {
+                int(page_id): list_index
+                for list_index, list_ids in enumerate(self.list_ids)
+                for page_id in list_ids
+            }
+
+        if path == self.path:
+            self._file_version = version_before
+        self.dirty = False
+        if self._pending:
+            pending_ids = list(self._pending)
+            self._insert(
+                np.asarray(pending_ids, dtype=np.int64),
+                np.vstack([self._pending[page_id][0] for page_id in pending_ids]),
+                np.asarray([self._pending[page_id][1] for page_id in pending_ids], dtype=np.int64)
+            )
+
+        logger.info(f"Index IVF chargé: {path} ({len(self)} embeddings, {len(self.centroids)} listes)")
+
+    def ensure_fresh(self) -> None:
+        """
+        Charge l'index depuis le disque, ou le construit depuis page_embeddings
+        puis l'enregistre s'il n'existe pas encore. Recharge le fichier lorsqu'un
+        autre worker l'a réenregistré depuis la dernière lecture.
+        """
+        if self.is_loaded:
+            if self.path and _file_version(self.path) not in (None, self._file_version):
+                with self._lock:
+                    if _file_version(self.path) not in (None, self._file_version):
+                        try:
+                            self.load()
+                        except Exception as e:
+                            # Ne pas retenter à chaque recherche : attendre le prochain enregistrement
+                            self._file_version = _file_version(self.path)
+                            logger.error(f"Erreur lors du rechargement de l'index IVF: {str(e)}")
+            return
+
+        with self._lock:
+            if self.is_loaded:
+                return
+            if self.path and os.path.exists(self.path):
+                self.load()
+                return
+
+            # Import local pour éviter un import circulaire avec le stockage des embeddings
+            from src.embeddings.embedding_storage import get_embedding_storage
+
+            storage = get_embedding_storage()
+            page_ids, embeddings = storage.get_all_embeddings()
+            if len(page_ids):
+                page_courses = storage.get_page_course_ids()
+                self.build(page_ids, embeddings, course_ids=[page_courses.get(int(page_id), -1) for page_id in page_ids])
+                self.save()
+
+
+# Instance partagée par tous les services du processus
+_ann_index: Optional[IVFIndex] = None
+_ann_index_lock = threading.Lock()
+
+
+def get_ann_index() -> IVFIndex:
+    """
+    Retourne l'index IVF partagé par le processus (ANN_INDEX_PATH, ANN_NLISTS, ANN_NPROBE).
+    """
+    global _ann_index
+    if _ann_index is None:
+        with _ann_index_lock:
+            if _ann_index is None:
+                n_lists = int(os.getenv("ANN_NLISTS", "0")) or None
+                _ann_index = IVFIndex(
+                    n_lists=n_lists,
+                    nprobe=int(os.getenv("ANN_NPROBE", "8")),
+                    path=os.getenv("ANN_INDEX_PATH", "data/embeddings/page_embeddings_ivf.npz")
+                )
+    return _ann_index
@@ -0,0 +1,222 @@
+# src/search/chunk_index.py
+import logging
+import threading
+from typing import List, Dict, Optional, Tuple
+import numpy as np
+from src.processing.text_chunker import split_into_chunks
+from src.search.lexical_index import bm25_postings, bm25_scores
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Nombre maximum de passages conservés par page dans le contexte du LLM
+DEFAULT_PASSAGES_PER_PAGE = 3
+
+
+class ChunkIndex:
+    """
+    Index lexical BM25 des passages des pages (paragraphes de content_text).
+
+    La recherche par embeddings reste au niveau de la page (image de la
+    diapositive) ; cet index sert à ne garder, dans le contexte du LLM, que les
+    paragraphes d'une page retenue qui répondent à la question. Il est construit
+    une fois depuis la table pages au premier accès, puis tenu à jour par
+    add_pages à chaque ingestion : pas de reconstruction périodique.
+    """
+
+    def __init__(self):
+        # Page de chaque passage, textes des passages et listes (indices de passages,
+        # poids BM25) par terme, remplacés ensemble
+        self._state: Tuple[np.ndarray, List[str], Dict[str, Tuple[np.ndarray, np.ndarray]]] = (
+            np.empty(0, dtype=np.int64), [], {}
+        )
+        self.is_loaded = False
+        self._swap_lock = threading.Lock()
+        # Chargement initial unique
+        self._load_lock = threading.Lock()
+        # Ajouts successifs sérialisés : chacun repart de l'état laissé par le précédent
+        self._add_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._snapshot()[0])
+
+    def build(self, page_ids: List[int], texts: List[str]) -> None:
+        """
+        Découpe les pages en passages et construit l'index.
+
+        Args:
+            page_ids (List[int]): IDs des pages.
+            texts (List[str]): Textes correspondants.
+        """
+        chunk_pages = []
+        chunk_texts = []
+        for page_id, text in zip(page_ids, texts):
+            for chunk in split_into_chunks(text):
+                chunk_pages.append(page_id)
+                chunk_texts.append(chunk)
+        self._replace(chunk_pages, chunk_texts)
+        logger.info(f"Index des passages construit: {len(page_ids)} pages, {len(chunk_texts)} passages")
+
+    def load(self, page_size: int = 500) -> int:
+        """
+        Construit l'index depuis la table pages, par pages de résultats.
+
+        Returns:
+            int: Nombre de pages indexées.
+        """
+        # Import local : le client n'est nécessaire que pour le chargement initial
+        from src.storage.supabase_client import get_supabase_client
+
+        supabase = get_supabase_client()
+        page_ids = []
+        texts = []
+        offset = 0
+
+        while True:
+            result = supabase.table("pages").select(
+                "id, content_text"
+            ).order("id").range(offset, offset + page_size - 1).execute()
+
+            rows = result.data or []
+            for row in rows:
+                page_ids.append(row["id"])
+                texts.append(row.get("content_text") or "")
+
+            if len(rows) < page_size:
+                break
+            offset += page_size
+
+        self.build(page_ids, texts)
+        return len(page_ids)
+
+    def ensure_loaded(self) -> None:
+        """
+        Charge l'index au premier accès ; les pages ingérées ensuite arrivent par add_pages.
+        """
+        if not self.is_loaded:
+            with self._load_lock:
+                if not self.is_loaded:
+                    self.load()
+
+    def _replace(self, chunk_pages: List[int], chunk_texts: List[str]) -> None:
+        state = (np.asarray(chunk_pages, dtype=np.int64), chunk_texts, bm25_postings(chunk_texts))
+        with self._swap_lock:
+            self._state = state
+        self.is_loaded = True
+
+    def _snapshot(self) -> Tuple[np.ndarray, List[str], Dict[str, Tuple[np.ndarray, np.ndarray]]]:
+        with self._swap_lock:
+            return self._state
+
+    def add_pages(self, page_ids: List[int], texts: List[str]) -> None:
+        """
+        Ajoute (ou remplace) des pages ingérées sans relire la table pages.
+
+        Seules les nouvelles pages sont découpées ; les poids BM25 sont recalculés
+        pour tous les passages. Sans effet si l'index n'est pas encore chargé : il
+        sera construit au premier accès.
+
+        Args:
+            page_ids (List[int]): IDs des pages ingérées.
+            texts (List[str]): Textes correspondants.
+        """
+        if not self.is_loaded:
+            return
+
+        with self._add_lock:
+            chunk_pages, chunk_texts, _ = self._snapshot()
+            replaced = np.isin(chunk_pages, np.asarray(page_ids, dtype=np.int64))
+            pages = [int(page_id) for page_id in chunk_pages[~replaced]]
+            kept = [text for text, drop in zip(chunk_texts, replaced) if not drop]
+
+            for page_id, text in zip(page_ids, texts):
+                for chunk in split_into_chunks(text):
+                    pages.append(page_id)
+                    kept.append(chunk)
+            self._replace(pages, kept)
+        logger.info(f"{len(page_ids)} pages ajoutées à l'index des passages ({len(kept)} passages)")
+
+    def add_pages_in_background(self, page_ids: List[int], texts: List[str]) -> threading.Thread:
+        """
+        Lance add_pages dans un thread pour ne pas retarder la requête d'ingestion.
+
+        Le recalcul des poids BM25 porte sur tous les passages du corpus : son coût
+        croît avec la taille de l'index, pas avec celle du document ingéré. Jusqu'à la
+        fin de l'ajout, les nouvelles pages gardent leur texte complet dans le contexte.
+
+        Args:
+            page_ids (List[int]): IDs des pages ingérées.
+            texts (List[str]): Textes correspondants.
+
+        Returns:
+            threading.Thread: Thread de l'ajout (déjà démarré).
+        """
+        def run() -> None:
+            try:
+                self.add_pages(page_ids, texts)
+            except Exception as e:
+                logger.error(f"Erreur lors de l'ajout de pages à l'index des passages: {str(e)}")
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        return thread
+
+    def select_passages(
+        self,
+        query: str,
+        page_ids: List[int],
+        max_passages: int = DEFAULT_PASSAGES_PER_PAGE
+    ) -> Dict[int, Tuple[List[str], int]]:
+        """
+        Sélectionne les passages de chaque page les plus pertinents pour la requête.
+
+        Les passages retenus sont rendus dans l'ordre de lecture de la page. Une page
+        dont aucun passage ne contient de terme de la requête (résultat trouvé par
+        l'image seule) n'est pas retournée : elle garde son texte complet.
+
+        Args:
+            query (str): Requête textuelle.
+            page_ids (List[int]): IDs des pages.
+            max_passages (int): Nombre maximum de passages par page.
+
+        Returns:
+            Dict[int, Tuple[List[str], int]]: Par page, passages retenus et nombre total
+                de passages de la page.
+        """
+        chunk_pages, chunk_texts, postings = self._snapshot()
+        scores = bm25_scores(postings, len(chunk_pages), query)
+        if scores is None or not page_ids or max_passages <= 0:
+            return {}
+
+        wanted = np.asarray(page_ids, dtype=np.int64)
+        rows = np.flatnonzero(np.isin(chunk_pages, wanted) & (scores > 0))
+        if not len(rows):
+            return {}
+        totals = dict(zip(*np.unique(chunk_pages[np.isin(chunk_pages, chunk_pages[rows])], return_counts=True)))
+
+        selected: Dict[int, Tuple[List[str], int]] = {}
+        for page_id in np.unique(chunk_pages[rows]):
+            page_rows = rows[chunk_pages[rows] == page_id]
+            best = page_rows[np.argsort(-scores[page_rows], kind="stable")[:max_passages]]
+            # Les passages d'une page sont contigus : l'ordre des lignes est l'ordre de lecture
+            selected[int(page_id)] = ([chunk_texts[row] for row in np.sort(best)], int(totals[page_id]))
+
+        return selected
+
+
+# Instance partagée par tous les moteurs du processus
+_chunk_index: Optional[ChunkIndex] = None
+_chunk_index_lock = threading.Lock()
+
+
+def get_chunk_index() -> ChunkIndex:
+    """
+    Retourne l'index des passages partagé par le processus.
+    """
+    global _chunk_index
+    if _chunk_index is None:
+        with _chunk_index_lock:
+            if _chunk_index is None:
+                _chunk_index = ChunkIndex()
+    return _chunk_index
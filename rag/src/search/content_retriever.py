@@ -3,12 +3,18 @@ import os
 import logging
 from typing import List, Dict, Any, Optional, Tuple
 from src.storage.supabase_client import get_supabase_client
+from src.embeddings.embedding_storage import FETCH_CHUNK_SIZE
+from src.search.course_cache import get_course_cache
+from src.search.page_cache import get_page_cache
 from PIL import Image
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Colonnes de la table pages nécessaires pour construire le contenu d'une page
+PAGE_COLUMNS = ("id", "page_number", "image_path", "content_text", "course_id")
+
 class ContentRetriever:
     """
     Service pour récupérer le contenu original des pages et des cours.
@@ -19,6 +25,13 @@ class ContentRetriever:
         Initialise le récupérateur de contenu.
         """
         self.supabase = get_supabase_client()
+        
+        # Métadonnées de cours partagées par le processus
+        self.course_cache = get_course_cache()
+        
+        # Lignes de pages récemment lues, partagées par le processus
+        self.page_cache = get_page_cache()
+        
         logger.info("Récupérateur de contenu initialisé")
     
     def get_page_content(self, page_id: int) -> Optional[Dict[str, Any]]:
@@ -31,42 +44,95 @@ class ContentRetriever:
         Returns:
             Optional[Dict[str, Any]]: Contenu complet de la page ou None si non trouvée.
         """
-        try:
-            # Récupérer les informations de la page
-            page_result = self.supabase.from_("pages").select(
-                "id, page_number, image_path, content_text, course_id"
-            ).eq("id", page_id).execute()
+        return self.get_pages_content([page_id]).get(page_id)
+    
+    def get_pages_content(self, page_ids: List[int], known_pages: Optional[Dict[int, Dict[str, Any]]] = None) -> Dict[int, Dict[str, Any]]:
+        """
+        Récupère le contenu complet de plusieurs pages en un nombre constant de requêtes.
+        
+        Args:
+            page_ids (List[int]): IDs des pages.
+            known_pages (Optional[Dict[int, Dict[str, Any]]]): Lignes de pages déjà récupérées
+                (par exemple par la recherche), réutilisées sans nouvelle requête.
             
-            if not page_result.data or len(page_result.data) == 0:
-                logger.warning(f"Page non trouvée avec l'ID: {page_id}")
-                return None
+        Returns:
+            Dict[int, Dict[str, Any]]: Contenu des pages trouvées, indexé par ID.
+        """
+        try:
+            pages = self._get_page_rows(page_ids, known_pages)
             
-            page_info = page_result.data[0]
+            # Récupérer les cours manquants en une seule requête
+            courses = self.get_courses_info([page.get('course_id') for page in pages.values() if page.get('course_id')])
             
-            # Récupérer les informations du cours
-            course_id = page_info.get('course_id')
-            if course_id:
-                course_info = self.get_course_info(course_id)
+            contents = {}
+            for page_id, page in pages.items():
+                page_info = {column: page.get(column) for column in PAGE_COLUMNS}
+                
+                course_info = courses.get(page_info.get('course_id'))
                 if course_info:
                     page_info['course'] = course_info
+                
+                # Vérifier si l'image existe
+                image_path = page_info.get('image_path')
+                page_info['image_exists'] = bool(image_path and os.path.exists(image_path))
+                if not page_info['image_exists']:
+                    logger.warning(f"L'image de la page {page_id} n'existe pas: {image_path}")
+                
+                contents[page_id] = page_info
             
-            # Vérifier si l'image existe
-            image_path = page_info.get('image_path')
-            if image_path and os.path.exists(image_path):
-                page_info['image_exists'] = True
-            else:
-                page_info['image_exists'] = False
-                logger.warning(f"L'image de la page {page_id} n'existe pas: {image_path}")
-            
-            return page_info
+            return contents
             
         except Exception as e:
-            logger.error(f"Erreur lors de la récupération du contenu de la page {page_id}: {str(e)}")
-            return None
+            logger.error(f"Erreur lors de la récupération du contenu des pages {page_ids}: {str(e)}")
+            return {}
+    
+    def _get_page_rows(self, page_ids: List[int], known_pages: Optional[Dict[int, Dict[str, Any]]] = None) -> Dict[int, Dict[str, Any]]:
+        """
+        Récupère les lignes de pages, en ne requêtant que celles qui ne sont pas déjà connues.
+        
+        Args:
+            page_ids (List[int]): IDs des pages.
+            known_pages (Optional[Dict[int, Dict[str, Any]]]): Lignes de pages déjà récupérées.
+            
+        Returns:
+            Dict[int, Dict[str, Any]]: Lignes des pages trouvées, indexées par ID.
+        """
+        known_pages = known_pages or {}
+        pages = {}
+        unknown_ids = []
+        
+        for page_id in dict.fromkeys(page_ids):
+            known = known_pages.get(page_id)
+            if known and all(column in known for column in PAGE_COLUMNS):
+                pages[page_id] = known
+            else:
+                unknown_ids.append(page_id)
+        
+        # Les lignes fournies par la recherche sont fraîches : elles alimentent le cache
+        self.page_cache.put([{column: page.get(column) for column in PAGE_COLUMNS} for page in pages.values()])
+        
+        cached_pages, missing_ids = self.page_cache.get_many(unknown_ids)
+        pages.update(cached_pages)
+        
+        # Pages absentes du cache, par filtres `in` de FETCH_CHUNK_SIZE IDs
+        for i in range(0, len(missing_ids), FETCH_CHUNK_SIZE):
+            pages_result = self.supabase.from_("pages").select(
+                ", ".join(PAGE_COLUMNS)
+            ).in_("id", missing_ids[i:i + FETCH_CHUNK_SIZE]).execute()
+            
+            for page in pages_result.data or []:
+                pages[page['id']] = page
+            self.page_cache.put(pages_result.data or [])
+        
+        for page_id in missing_ids:
+            if page_id not in pages:
+                logger.warning(f"Page non trouvée avec l'ID: {page_id}")
+        
+        return pages
     
     def get_course_info(self, course_id: int) -> Optional[Dict[str, Any]]:
         """
-        Récupère les informations d'un cours.
+        Récupère les informations d'un cours depuis le cache des cours.
         
         Args:
             course_id (int): ID du cours.
@@ -74,21 +140,35 @@ class ContentRetriever:
         Returns:
             Optional[Dict[str, Any]]: Informations du cours ou None si non trouvé.
         """
-        try:
-            # Récupérer les informations du cours
-            course_result = self.supabase.from_("courses").select(
-                "id, name, pdf_url, photo_url, year"
-            ).eq("id", course_id).execute()
+        course_info = self.course_cache.get(course_id)
+        if not course_info:
+            logger.warning(f"Cours non trouvé avec l'ID: {course_id}")
+        return course_info
+    
+    def get_courses_info(self, course_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Récupère les informations de plusieurs cours depuis le cache des cours.
+        
+        Args:
+            course_ids (List[int]): IDs des cours.
             
-            if course_result.data and len(course_result.data) > 0:
-                return course_result.data[0]
-            else:
-                logger.warning(f"Cours non trouvé avec l'ID: {course_id}")
-                return None
-                
-        except Exception as e:
-            logger.error(f"Erreur lors de la récupération des informations du cours {course_id}: {str(e)}")
-            return None
+        Returns:
+            Dict[int, Dict[str, Any]]: Informations des cours trouvés, indexées par ID.
+        """
+        return self.course_cache.get_many(course_ids)
+    
+    def prefetch_courses(self) -> int:
+        """
+        Charge le cache des cours s'il est vide ou expiré.
+        
+        Conçu pour être exécuté en parallèle de la recherche : les appels suivants
+        à get_course_info n'interrogent plus la table courses.
+        
+        Returns:
+            int: Nombre de cours en cache.
+        """
+        self.course_cache.ensure_fresh()
+        return len(self.course_cache)
     
     def get_course_pages(self, course_id: int) -> List[Dict[str, Any]]:
         """
@@ -128,43 +208,157 @@ class ContentRetriever:
         Returns:
             List[Dict[str, Any]]: Liste des pages de contexte.
         """
+        context_pages = self.get_context_windows([page_id], context_size).get(page_id, [])
+        if context_pages:
+            logger.info(f"Récupération de {len(context_pages)} pages de contexte pour la page {page_id}")
+        else:
+            logger.warning(f"Aucune page de contexte trouvée pour la page {page_id}")
+        return context_pages
+
+    def get_context_windows(
+        self,
+        page_ids: List[int],
+        context_size: int = 1,
+        known_pages: Optional[Dict[int, Dict[str, Any]]] = None
+    ) -> Dict[int, List[Dict[str, Any]]]:
+        """
+        Récupère les pages environnantes de plusieurs pages avec en général une requête par cours.
+        
+        Args:
+            page_ids (List[int]): IDs des pages centrales.
+            context_size (int): Nombre de pages à récupérer avant et après chaque page.
+            known_pages (Optional[Dict[int, Dict[str, Any]]]): Lignes de pages déjà récupérées
+                (course_id et page_number), réutilisées sans nouvelle requête.
+            
+        Returns:
+            Dict[int, List[Dict[str, Any]]]: Pages de contexte triées par numéro, indexées
+                par ID de page centrale.
+        """
         try:
-            # Récupérer d'abord la page pour obtenir course_id et page_number
-            page_result = self.supabase.from_("pages").select(
-                "id, page_number, course_id"
-            ).eq("id", page_id).execute()
+            centers = self._get_page_rows(page_ids, known_pages)
             
-            if not page_result.data or len(page_result.data) == 0:
-                logger.warning(f"Page non trouvée avec l'ID: {page_id}")
-                return []
+            # Regrouper par cours les numéros de pages de toutes les fenêtres
+            numbers_by_course: Dict[int, set] = {}
+            for page_id, page in centers.items():
+                course_id = page.get('course_id')
+                page_number = page.get('page_number')
+                if not course_id or not page_number:
+                    logger.warning(f"Informations incomplètes pour la page {page_id}")
+                    continue
+                numbers_by_course.setdefault(course_id, set()).update(
+                    range(max(1, page_number - context_size), page_number + context_size + 1)
+                )
             
-            page_info = page_result.data[0]
-            course_id = page_info.get('course_id')
-            page_number = page_info.get('page_number')
+            # Pages en cache, puis une requête par cours (par tranche de FETCH_CHUNK_SIZE numéros) pour les pages manquantes
+            pages_by_course: Dict[int, Dict[int, Dict[str, Any]]] = {}
+            query_count = 0
+            for course_id, page_numbers in numbers_by_course.items():
+                course_pages, missing_numbers = self.page_cache.get_positions(course_id, sorted(page_numbers))
+                
+                for i in range(0, len(missing_numbers), FETCH_CHUNK_SIZE):
+                    context_result = self.supabase.from_("pages").select(
+                        ", ".join(PAGE_COLUMNS)
+                    ).eq("course_id", course_id).in_(
+                        "page_number", missing_numbers[i:i + FETCH_CHUNK_SIZE]
+                    ).order("page_number").execute()
+                    query_count += 1
+                    
+                    self.page_cache.put(context_result.data or [])
+                    course_pages.update({page['page_number']: page for page in context_result.data or []})
+                
+                pages_by_course[course_id] = course_pages
             
-            if not course_id or not page_number:
-                logger.warning(f"Informations incomplètes pour la page {page_id}")
-                return []
+            windows = {}
+            for page_id, page in centers.items():
+                course_pages = pages_by_course.get(page.get('course_id'))
+                if not course_pages:
+                    continue
+                page_number = page['page_number']
+                window = [
+                    course_pages[number]
+                    for number in range(max(1, page_number - context_size), page_number + context_size + 1)
+                    if number in course_pages
+                ]
+                if window:
+                    windows[page_id] = window
             
-            # Calculer les plages de pages à récupérer
-            min_page = max(1, page_number - context_size)
-            max_page = page_number + context_size
+            logger.info(f"Récupération des fenêtres de contexte de {len(windows)} pages en {query_count} requêtes")
+            return windows
             
-            # Récupérer les pages de contexte
-            context_result = self.supabase.from_("pages").select(
-                "id, page_number, image_path, content_text"
-            ).eq("course_id", course_id).gte("page_number", min_page).lte("page_number", max_page).order("page_number").execute()
+        except Exception as e:
+            logger.error(f"Erreur lors de la récupération des pages de contexte pour les pages {page_ids}: {str(e)}")
+            return {}
+    
+    def get_graph_context(
+        self,
+        page_ids: List[int],
+        neighbour_graph,
+        context_size: int = 1,
+        semantic_neighbours: int = 0,
+        min_similarity: float = 0.0,
+        known_pages: Optional[Dict[int, Dict[str, Any]]] = None
+    ) -> Tuple[Dict[int, List[Dict[str, Any]]], Dict[int, List[Dict[str, Any]]]]:
+        """
+        Récupère les fenêtres de contexte et les pages apparentées à partir du graphe de voisinage.
+        
+        Les IDs des voisines sont lus dans le graphe précalculé : toutes les pages
+        (voisines physiques et sémantiques) sont servies par le cache des pages ou
+        une seule requête. Les pages absentes du graphe (ingérées depuis sa
+        construction) retombent sur get_context_windows.
+        
+        Args:
+            page_ids (List[int]): IDs des pages centrales.
+            neighbour_graph (NeighbourGraph): Graphe de voisinage chargé.
+            context_size (int): Nombre de pages à récupérer avant et après chaque page.
+            semantic_neighbours (int): Nombre de pages apparentées par page (0 pour aucune).
+            min_similarity (float): Similarité minimum d'une page apparentée.
+            known_pages (Optional[Dict[int, Dict[str, Any]]]): Lignes de pages déjà récupérées.
+            
+        Returns:
+            Tuple[Dict[int, List[Dict[str, Any]]], Dict[int, List[Dict[str, Any]]]]: Fenêtres
+                de contexte triées par numéro et pages apparentées (avec "course" et
+                "neighbour_similarity"), indexées par ID de page centrale.
+        """
+        try:
+            in_graph = [page_id for page_id in dict.fromkeys(page_ids) if page_id in neighbour_graph]
+            window_ids = {page_id: neighbour_graph.physical_neighbours(page_id, context_size) for page_id in in_graph}
+            related_ids = {
+                page_id: neighbour_graph.semantic_neighbours(page_id, semantic_neighbours, min_similarity)
+                for page_id in in_graph
+            } if semantic_neighbours > 0 else {}
+            
+            wanted = [neighbour for ids in window_ids.values() for neighbour in ids]
+            wanted += [neighbour for neighbours in related_ids.values() for neighbour, _ in neighbours]
+            rows = self._get_page_rows(wanted, known_pages)
+            
+            windows = {
+                page_id: [rows[neighbour] for neighbour in ids if neighbour in rows]
+                for page_id, ids in window_ids.items()
+            }
+            
+            courses = self.get_courses_info([
+                rows[neighbour].get('course_id')
+                for neighbours in related_ids.values() for neighbour, _ in neighbours
+                if neighbour in rows and rows[neighbour].get('course_id')
+            ])
+            related = {
+                page_id: [
+                    {**rows[neighbour], "course": courses.get(rows[neighbour].get('course_id')), "neighbour_similarity": similarity}
+                    for neighbour, similarity in neighbours
+                    if neighbour in rows
+                ]
+                for page_id, neighbours in related_ids.items()
+            }
+            
+            missing = [page_id for page_id in page_ids if page_id not in neighbour_graph]
+            if missing:
+                windows.update(self.get_context_windows(missing, context_size, known_pages))
+            
+            return {page_id: window for page_id, window in windows.items() if window}, related
             
-            if context_result.data:
-                logger.info(f"Récupération de {len(context_result.data)} pages de contexte pour la page {page_id}")
-                return context_result.data
-            else:
-                logger.warning(f"Aucune page de contexte trouvée pour la page {page_id}")
-                return []
-                
         except Exception as e:
-            logger.error(f"Erreur lors de la récupération des pages de contexte pour la page {page_id}: {str(e)}")
-            return []
+            logger.error(f"Erreur lors de la récupération du voisinage des pages {page_ids}: {str(e)}")
+            return self.get_context_windows(page_ids, context_size, known_pages), {}
 
 # Fonction pour obtenir une instance du récupérateur de contenu
 def get_content_retriever() -> ContentRetriever:
@@ -0,0 +1,189 @@
+# src/search/context_packer.py
+import os
+import math
+import logging
+from typing import List, Dict, Any, Optional, Callable
+from src.processing.text_chunker import SENTENCE_BOUNDARY
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Taille de la fenêtre de contexte des modèles (en tokens), par nom sans préfixe de fournisseur
+MODEL_CONTEXT_WINDOWS = {
+    "gpt-3.5-turbo": 4096,
+    "gpt-3.5-turbo-16k": 16385,
+    "gpt-4": 8192,
+    "gpt-4-turbo": 128000,
+    "gpt-4o": 128000,
+    "gpt-4o-mini": 128000,
+    "claude-3-haiku": 200000,
+    "claude-3-sonnet": 200000,
+    "claude-3-opus": 200000,
+    "mistral-7b-instruct": 32768,
+    "mixtral-8x7b-instruct": 32768
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Budget maximal alloué aux pages du cours, même pour les modèles à très grande
+# fenêtre : au-delà, le coût et la latence augmentent sans gain de pertinence
+MODEL_CONTEXT_BUDGETS = {
+    "gpt-3.5-turbo": 2000,
+    "gpt-3.5-turbo-16k": 6000,
+    "gpt-4": 4000
+}
+DEFAULT_CONTEXT_BUDGET = 8000
+
+# Tokens réservés au message système, au template du prompt et à la question
+PROMPT_OVERHEAD_TOKENS = 800
+
+# Estimation du nombre de caractères par token pour un texte en français
+CHARS_PER_TOKEN = 3.5
+
+# En dessous de ce nombre de tokens restants, une page n'est plus tronquée mais écartée
+MIN_TRIMMED_TOKENS = 60
+
+# Marque ajoutée à la fin d'un texte tronqué (comptée dans la limite de tokens)
+TRIM_SUFFIX = " [...]"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estime le nombre de tokens d'un texte (sans dépendance à un tokenizer).
+    """
+    return math.ceil(len(text or "") / CHARS_PER_TOKEN)
+
+
+def _model_key(model: Optional[str]) -> str:
+    # "openai/gpt-4o" -> "gpt-4o"
+    return (model or "").split("/")[-1].lower()
+
+
+def get_context_budget(model: Optional[str] = None, max_tokens: int = 1500) -> int:
+    """
+    Calcule le budget de tokens alloué aux pages du cours pour un modèle.
+
+    Le budget est celui du modèle (CONTEXT_TOKEN_BUDGET le remplace s'il est défini),
+    borné par la fenêtre du modèle moins la réponse attendue et le prompt.
+
+    Args:
+        model (Optional[str]): Nom du modèle (avec ou sans préfixe de fournisseur).
+        max_tokens (int): Nombre maximum de tokens de la réponse.
+
+    Returns:
+        int: Budget de tokens pour le contexte.
+    """
+    key = _model_key(model)
+    window = MODEL_CONTEXT_WINDOWS.get(key, DEFAULT_CONTEXT_WINDOW)
+    budget = int(os.getenv("CONTEXT_TOKEN_BUDGET", "0")) or MODEL_CONTEXT_BUDGETS.get(key, DEFAULT_CONTEXT_BUDGET)
+    return max(0, min(budget, window - max_tokens - PROMPT_OVERHEAD_TOKENS))
+
+
+def trim_to_tokens(text: str, max_tokens: int, estimator: Callable[[str], int] = estimate_tokens) -> str:
+    """
+    Tronque un texte à un nombre de tokens en conservant des phrases entières.
+
+    Le texte est coupé après la dernière phrase qui tient, sans toucher aux
+    espaces ni aux sauts de ligne qui précèdent. Si la première phrase dépasse
+    déjà la limite, elle est coupée sur un espace.
+    Les tokens du suffixe " [...]" sont réservés : le texte tronqué, suffixe
+    compris, ne dépasse jamais `max_tokens`.
+
+    Args:
+        text (str): Texte à tronquer.
+        max_tokens (int): Nombre maximum de tokens.
+        estimator (Callable[[str], int]): Fonction d'estimation du nombre de tokens.
+
+    Returns:
+        str: Texte tronqué, terminé par " [...]" s'il a été raccourci (vide si même
+            le suffixe ne tient pas).
+    """
+    if estimator(text) <= max_tokens:
+        return text
+
+    # Couper à la fin d'une phrase du texte d'origine : sauts de ligne et paragraphes conservés
+    kept = ""
+    for boundary in SENTENCE_BOUNDARY.finditer(text):
+        candidate = text[:boundary.start()].rstrip()
+        if not candidate:
+            continue
+        if estimator(candidate + TRIM_SUFFIX) > max_tokens:
+            break
+        kept = candidate
+
+    if kept:
+        return kept + TRIM_SUFFIX
+
+    # Première phrase trop longue : couper au dernier espace avant la limite, suffixe compris
+    cut = text[:max(0, int(max_tokens * CHARS_PER_TOKEN) - len(TRIM_SUFFIX))].rsplit(" ", 1)[0]
+    while cut and estimator(cut + TRIM_SUFFIX) > max_tokens:
+        # Estimateur plus strict que CHARS_PER_TOKEN : raccourcir encore
+        cut = cut[:int(len(cut) * 0.9)].rsplit(" ", 1)[0]
+    return cut + TRIM_SUFFIX if cut else ""
+
+
+def pack_pages(
+    pages: List[Dict[str, Any]],
+    budget: int,
+    format_block: Callable[[Dict[str, Any], str], str],
+    estimator: Callable[[str], int] = estimate_tokens
+) -> Dict[str, Any]:
+    """
+    Remplit un budget de tokens avec les pages, par score décroissant.
+
+    Une page qui ne tient pas entière est réduite à ses premières phrases s'il
+    reste au moins MIN_TRIMMED_TOKENS tokens, sinon elle est écartée ; les pages
+    suivantes, plus courtes, peuvent encore être ajoutées.
+
+    Args:
+        pages (List[Dict[str, Any]]): Pages avec "content_text" et "similarity".
+        budget (int): Budget de tokens.
+        format_block (Callable): Construit le bloc d'une page à partir de la page et de son texte.
+        estimator (Callable[[str], int]): Fonction d'estimation du nombre de tokens.
+
+    Returns:
+        Dict[str, Any]: Blocs retenus ("blocks"), pages retenues ("included", avec
+            "truncated"), pages écartées ("dropped") et tokens utilisés ("used_tokens").
+    """
+    blocks = []
+    included = []
+    dropped = []
+    used_tokens = 0
+
+    for page in sorted(pages, key=lambda page: page.get("similarity", 0), reverse=True):
+        text = page.get("content_text") or ""
+        block = format_block(page, text)
+        block_tokens = estimator(block)
+        remaining = budget - used_tokens
+        truncated = False
+
+        if block_tokens > remaining:
+            header_tokens = estimator(format_block(page, ""))
+            if remaining - header_tokens < MIN_TRIMMED_TOKENS:
+                dropped.append(page)
+                continue
+            trimmed = trim_to_tokens(text, remaining - header_tokens, estimator)
+            block = format_block(page, trimmed)
+            block_tokens = estimator(block)
+            # Estimation du bloc entier supérieure à celle de l'en-tête plus le texte : ne jamais dépasser le budget
+            if not trimmed or block_tokens > remaining:
+                dropped.append(page)
+                continue
+            truncated = True
+
+        blocks.append(block)
+        included.append({**page, "truncated": truncated})
+        used_tokens += block_tokens
+
+    if dropped or any(page["truncated"] for page in included):
+        logger.info(
+            f"Contexte limité à {budget} tokens: {len(included)} pages retenues "
+            f"({sum(page['truncated'] for page in included)} tronquées), {len(dropped)} écartées"
+        )
+
+    return {
+        "blocks": blocks,
+        "included": included,
+        "dropped": dropped,
+        "used_tokens": used_tokens
+    }
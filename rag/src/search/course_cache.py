@@ -0,0 +1,169 @@
+# src/search/course_cache.py
+import os
+import time
+import logging
+import threading
+from typing import List, Dict, Any, Optional
+from src.storage.supabase_client import get_supabase_client
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class CourseCache:
+    """
+    Cache des métadonnées de cours partagé par le processus.
+
+    La table courses ne contient que quelques dizaines de lignes et ne change
+    qu'à l'upload d'un PDF : elle est chargée en une requête, invalidée par la
+    route /documents/process et rechargée au plus tard après `ttl` secondes.
+    """
+
+    def __init__(self, ttl: float = 600.0):
+        """
+        Initialise un cache vide.
+
+        Args:
+            ttl (float): Durée de validité en secondes avant un rechargement complet
+                (filet de sécurité pour les insertions faites par d'autres processus).
+        """
+        self.ttl = ttl
+        self._courses: Dict[int, Dict[str, Any]] = {}
+        self.loaded_at: Optional[float] = None
+        # Vrai dès qu'un chargement a réussi : les données peuvent alors être servies périmées
+        self.has_loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_fresh(self) -> bool:
+        return self.loaded_at is not None and (not self.ttl or time.time() - self.loaded_at < self.ttl)
+
+    def load(self) -> int:
+        """
+        Charge toute la table courses en une requête.
+
+        Returns:
+            int: Nombre de cours chargés.
+        """
+        courses_result = get_supabase_client().table("courses").select("*").execute()
+        courses = {course["id"]: course for course in courses_result.data or []}
+
+        # Remplacement du dictionnaire complet : les lecteurs concurrents gardent l'ancien
+        self._courses = courses
+        self.loaded_at = time.time()
+        self.has_loaded = True
+
+        logger.info(f"Cache des cours chargé avec {len(courses)} cours")
+        return len(courses)
+
+    def ensure_fresh(self) -> None:
+        """
+        Charge le cache s'il est vide, invalidé ou expiré.
+
+        Si le rechargement échoue après un chargement réussi, les données précédentes
+        restent servies ; si aucun chargement n'a jamais réussi, l'erreur est propagée
+        plutôt que de présenter une liste de cours vide comme valide.
+        """
+        if self.is_fresh:
+            return
+
+        with self._lock:
+            if self.is_fresh:
+                return
+            try:
+                self.load()
+            except Exception as e:
+                if not self.has_loaded:
+                    logger.error(f"Erreur lors du chargement du cache des cours: {str(e)}")
+                    raise
+                logger.warning(f"Erreur lors du rechargement du cache des cours, données précédentes conservées: {str(e)}")
+
+    def invalidate(self) -> None:
+        """
+        Force un rechargement au prochain accès (après l'insertion d'un cours).
+        """
+        self.loaded_at = None
+        logger.info("Cache des cours invalidé")
+
+    def get(self, course_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Retourne les informations d'un cours.
+
+        Args:
+            course_id (int): ID du cours.
+
+        Returns:
+            Optional[Dict[str, Any]]: Informations du cours ou None si non trouvé.
+        """
+        return self.get_many([course_id]).get(course_id)
+
+    def get_many(self, course_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Retourne les informations de plusieurs cours.
+
+        Les cours absents du cache (insérés depuis le dernier chargement) sont
+        récupérés en une seule requête puis ajoutés au cache. Si la table n'a encore
+        jamais pu être chargée, tous les cours demandés sont lus de cette façon.
+
+        Args:
+            course_ids (List[int]): IDs des cours.
+
+        Returns:
+            Dict[int, Dict[str, Any]]: Copies des informations des cours trouvés, indexées par ID.
+        """
+        try:
+            self.ensure_fresh()
+        except Exception:
+            # Erreur déjà journalisée : les cours demandés sont lus ci-dessous
+            pass
+        courses = self._courses
+
+        missing_ids = [course_id for course_id in dict.fromkeys(course_ids) if course_id not in courses]
+        if missing_ids:
+            try:
+                courses_result = get_supabase_client().table("courses").select("*").in_("id", missing_ids).execute()
+                if courses_result.data:
+                    courses = dict(courses)
+                    courses.update({course["id"]: course for course in courses_result.data})
+                    self._courses = courses
+            except Exception as e:
+                logger.error(f"Erreur lors de la récupération des cours {missing_ids}: {str(e)}")
+
+        # Copies : l'appelant peut modifier les cours sans altérer le cache
+        return {course_id: dict(courses[course_id]) for course_id in course_ids if course_id in courses}
+
+    def list_courses(self, year: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Liste les cours du plus récent au plus ancien.
+
+        Args:
+            year (Optional[str]): Année des cours (ING1, ING2, ING3) ou None pour tous.
+
+        Returns:
+            List[Dict[str, Any]]: Copies des cours, triées par date de création décroissante
+                (exception si la table courses n'a jamais pu être chargée).
+        """
+        self.ensure_fresh()
+        courses = [dict(course) for course in self._courses.values() if not year or course.get("year") == year]
+        return sorted(courses, key=lambda course: course.get("created_at") or "", reverse=True)
+
+    def __len__(self) -> int:
+        return len(self._courses)
+
+
+# Instance partagée par tous les services du processus
+_course_cache: Optional[CourseCache] = None
+_course_cache_lock = threading.Lock()
+
+
+def get_course_cache() -> CourseCache:
+    """
+    Retourne le cache des cours partagé par le processus (COURSE_CACHE_TTL_SECONDS).
+    """
+    global _course_cache
+    if _course_cache is None:
+        with _course_cache_lock:
+            if _course_cache is None:
+                _course_cache = CourseCache(ttl=float(os.getenv("COURSE_CACHE_TTL_SECONDS", "600")))
+    return _course_cache
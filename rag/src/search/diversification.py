@@ -0,0 +1,60 @@
+# src/search/diversification.py
+from typing import List, Optional, Union
+import numpy as np
+from src.search.vector_index import normalize_rows
+
+
+def mmr_select(
+    query_embedding: Union[List[float], np.ndarray],
+    candidate_embeddings: np.ndarray,
+    top_k: int,
+    lambda_mult: float = 0.7,
+    relevance: Optional[np.ndarray] = None
+) -> List[int]:
+    """
+    Sélectionne des candidats par pertinence marginale maximale (MMR).
+
+    À chaque étape, le candidat retenu maximise
+    lambda * sim(requête, c) - (1 - lambda) * max sim(c, déjà retenus) :
+    les diapositives quasi identiques à une page déjà retenue sont écartées au
+    profit de pages un peu moins proches mais nouvelles. Les similarités entre
+    candidats sont calculées en un seul produit matriciel.
+
+    Args:
+        query_embedding: Embedding de la requête.
+        candidate_embeddings (np.ndarray): Embeddings des candidats (n, d).
+        top_k (int): Nombre de candidats à retenir.
+        lambda_mult (float): 1.0 = pertinence seule, 0.0 = diversité seule.
+        relevance (Optional[np.ndarray]): Pertinence de chaque candidat (par exemple le
+            score d'un reranker) ; par défaut, la similarité cosinus avec la requête.
+
+    Returns:
+        List[int]: Indices des candidats retenus, dans l'ordre de sélection.
+    """
+    count = len(candidate_embeddings)
+    top_k = min(top_k, count)
+    if top_k <= 0:
+        return []
+
+    candidates = normalize_rows(candidate_embeddings)
+    if relevance is None:
+        relevance = candidates @ normalize_rows(query_embedding)[0]
+    else:
+        relevance = np.asarray(relevance, dtype=np.float32)
+    pairwise = candidates @ candidates.T
+
+    selected = [int(np.argmax(relevance))]
+    # Similarité maximale de chaque candidat avec les pages déjà retenues
+    redundancy = pairwise[selected[0]].copy()
+    available = np.ones(count, dtype=bool)
+    available[selected[0]] = False
+
+    while len(selected) < top_k:
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        scores[~available] = -np.inf
+        best = int(np.argmax(scores))
+        selected.append(best)
+        available[best] = False
+        np.maximum(redundancy, pairwise[best], out=redundancy)
+
+    return selected
@@ -0,0 +1,45 @@
+# src/search/fusion.py
+from typing import List, Dict, Any, Optional, Tuple
+
+# Constante de lissage usuelle de la fusion par rang réciproque (Cormack et al., 2009)
+RRF_K = 60
+
+
+def reciprocal_rank_fusion(
+    rankings: List[List[Any]],
+    weights: Optional[List[float]] = None,
+    k: int = RRF_K
+) -> List[Tuple[Any, float]]:
+    """
+    Fusionne plusieurs classements par rang réciproque pondéré.
+
+    Chaque élément reçoit la somme de poids / (k + rang) sur les classements où il
+    apparaît : seule la position compte, ce qui permet de combiner des scores
+    d'échelles différentes (cosinus, BM25).
+
+    Args:
+        rankings (List[List[Any]]): Classements d'identifiants, du meilleur au moins bon.
+        weights (Optional[List[float]]): Poids de chaque classement (1.0 par défaut).
+        k (int): Constante de lissage.
+
+    Returns:
+        List[Tuple[Any, float]]: Identifiants et scores fusionnés, par score décroissant
+            (à score égal, l'ordre de première apparition est conservé).
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[Any, float] = {}
+
+    for ranking, weight in zip(rankings, weights):
+        if not weight:
+            continue
+        for rank, item in enumerate(dict.fromkeys(ranking), start=1):
+            scores[item] = scores.get(item, 0.0) + weight / (k + rank)
+
+    return sorted(scores.items(), key=lambda entry: entry[1], reverse=True)
+
+
+def max_fusion_score(weights: List[float], k: int = RRF_K) -> float:
+    """
+    Score maximal possible (premier rang dans tous les classements), pour normaliser entre 0 et 1.
+    """
+    return sum(weights) / (k + 1) or 1.0
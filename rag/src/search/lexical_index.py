@@ -0,0 +1,295 @@
+# src/search/lexical_index.py
+import os
+import re
+import math
+import time
+import logging
+import threading
+import unicodedata
+from collections import Counter
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from src.search.vector_index import top_k_indices, course_rows
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Paramètres BM25 usuels
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Mots vides français (après suppression des accents) ignorés à l'indexation
+STOPWORDS = frozenset("""
+a au aux avec ce ces dans de des du elle en est et eux il ils je la le les leur lui ma mais me meme mes moi mon
+ne nos notre nous on ou par pas pour qu que qui sa se ses son sur ta te tes toi ton tu un une vos votre vous
+c d j l m n s t y ete etre sont cette cet comment quoi quel quelle quels quelles
+""".split())
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Découpe un texte en termes normalisés (minuscules, sans accents, sans mots vides).
+
+    Les noms de composants (2N2222, LM741) et les symboles de formules (V_CE, R1)
+    sont conservés comme des termes à part entière.
+    """
+    normalized = unicodedata.normalize("NFKD", (text or "").lower())
+    normalized = "".join(char for char in normalized if not unicodedata.combining(char))
+    return [token for token in TOKEN_PATTERN.findall(normalized) if token not in STOPWORDS]
+
+
+def bm25_postings(texts: List[str]) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+    """
+    Calcule les listes (indices de documents, poids BM25) de chaque terme des textes.
+
+    Args:
+        texts (List[str]): Textes des documents.
+
+    Returns:
+        Dict[str, Tuple[np.ndarray, np.ndarray]]: Postings par terme.
+    """
+    term_counts = [Counter(tokenize(text)) for text in texts]
+    lengths = np.asarray([sum(counts.values()) for counts in term_counts], dtype=np.float32)
+    average_length = float(lengths.mean()) if len(lengths) and lengths.mean() > 0 else 1.0
+
+    postings_docs: Dict[str, List[int]] = {}
+    postings_tf: Dict[str, List[int]] = {}
+    for doc_index, counts in enumerate(term_counts):
+        for term, tf in counts.items():
+            postings_docs.setdefault(term, []).append(doc_index)
+            postings_tf.setdefault(term, []).append(tf)
+
+    count = len(term_counts)
+    postings = {}
+    for term, docs in postings_docs.items():
+        docs = np.asarray(docs, dtype=np.int64)
+        tf = np.asarray(postings_tf[term], dtype=np.float32)
+        idf = math.log(1.0 + (count - len(docs) + 0.5) / (len(docs) + 0.5))
+        norm = BM25_K1 * (1.0 - BM25_B + BM25_B * lengths[docs] / average_length)
+        postings[term] = (docs, (idf * tf * (BM25_K1 + 1.0) / (tf + norm)).astype(np.float32))
+
+    return postings
+
+
+def bm25_scores(postings: Dict[str, Tuple[np.ndarray, np.ndarray]], count: int, query: str) -> Optional[np.ndarray]:
+    """
+    Score BM25 de chaque document pour une requête.
+
+    Returns:
+        Optional[np.ndarray]: Scores des `count` documents, ou None si aucun terme de
+            la requête n'est indexé.
+    """
+    terms = [term for term in dict.fromkeys(tokenize(query)) if term in postings]
+    if not count or not terms:
+        return None
+
+    scores = np.zeros(count, dtype=np.float32)
+    for term in terms:
+        docs, weights = postings[term]
+        scores[docs] += weights
+    return scores
+
+
+class BM25Index:
+    """
+    Index lexical BM25 en processus sur pages.content_text.
+
+    Complète la recherche par embeddings d'images, qui manque les noms exacts de
+    composants et les symboles. Le poids BM25 de chaque couple (terme, page) est
+    précalculé : une recherche se limite à sommer les listes des termes de la requête.
+    """
+
+    def __init__(self, refresh_interval: float = 300.0):
+        """
+        Initialise un index vide.
+
+        Args:
+            refresh_interval (float): Délai en secondes avant une reconstruction complète
+                depuis la table pages (0 pour désactiver la reconstruction périodique).
+        """
+        self.refresh_interval = refresh_interval
+        # IDs des pages, cours des pages et listes (indices de pages, poids BM25) par terme, remplacés ensemble
+        self._state: Tuple[np.ndarray, np.ndarray, Dict[str, Tuple[np.ndarray, np.ndarray]]] = (
+            np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), {}
+        )
+        self.last_refresh: Optional[float] = None
+        self._stale = False
+        self._lock = threading.Lock()
+        self._refreshing = False
+
+    def __len__(self) -> int:
+        return len(self._state[0])
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.last_refresh is not None
+
+    def build(self, page_ids: List[int], texts: List[str], course_ids: Optional[List[int]] = None) -> None:
+        """
+        Construit l'index à partir des textes des pages.
+
+        Args:
+            page_ids (List[int]): IDs des pages.
+            texts (List[str]): Textes correspondants.
+            course_ids (Optional[List[int]]): Cours de chaque page, -1 si inconnu.
+        """
+        postings = bm25_postings(texts)
+
+        # Remplacement en bloc : les recherches concurrentes gardent l'ancien index
+        courses = np.full(len(page_ids), -1, dtype=np.int64) if course_ids is None else np.asarray(course_ids, dtype=np.int64)
+        self._state = (np.asarray(page_ids, dtype=np.int64), courses, postings)
+        self.last_refresh = time.time()
+        self._stale = False
+
+        logger.info(f"Index lexical construit: {len(page_ids)} pages, {len(postings)} termes")
+
+    def refresh(self, page_size: int = 500) -> int:
+        """
+        Reconstruit l'index depuis la table pages, par pages de résultats.
+
+        Returns:
+            int: Nombre de pages indexées.
+        """
+        # Import local : le client n'est nécessaire que pour la reconstruction
+        from src.storage.supabase_client import get_supabase_client
+
+        try:
+            supabase = get_supabase_client()
+            page_ids = []
+            course_ids = []
+            texts = []
+            offset = 0
+
+            while True:
+                result = supabase.table("pages").select(
+                    "id, course_id, content_text"
+                ).order("id").range(offset, offset + page_size - 1).execute()
+
+                rows = result.data or []
+                for row in rows:
+                    page_ids.append(row["id"])
+                    course_ids.append(row.get("course_id") or -1)
+                    texts.append(row.get("content_text") or "")
+
+                if len(rows) < page_size:
+                    break
+                offset += page_size
+
+            self.build(page_ids, texts, course_ids)
+            return len(page_ids)
+        finally:
+            self._refreshing = False
+
+    def ensure_fresh(self) -> None:
+        """
+        Construit l'index s'il est vide et déclenche une reconstruction en arrière-plan
+        lorsqu'il a été invalidé ou que le délai de rafraîchissement est dépassé.
+        """
+        if not self.is_loaded:
+            with self._lock:
+                if not self.is_loaded:
+                    self.refresh()
+            return
+
+        expired = self.refresh_interval and time.time() - self.last_refresh > self.refresh_interval
+        if self._stale or expired:
+            with self._lock:
+                if self._refreshing:
+                    return
+                self._refreshing = True
+            threading.Thread(target=self._background_refresh, daemon=True).start()
+
+    def _background_refresh(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Erreur lors de la reconstruction de l'index lexical: {str(e)}")
+
+    def invalidate(self) -> None:
+        """
+        Demande une reconstruction au prochain accès (après l'ingestion de pages).
+        """
+        self._stale = True
+
+    def search(self, query: str, top_k: int = 5, course_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """
+        Recherche les pages dont le texte correspond le mieux à la requête.
+
+        Args:
+            query (str): Requête textuelle.
+            top_k (int): Nombre maximum de résultats à retourner.
+            course_ids (Optional[List[int]]): Cours autorisés (None pour tout le corpus).
+
+        Returns:
+            List[Dict[str, Any]]: Résultats (page_id, score) par score BM25 décroissant.
+        """
+        ids, courses, postings = self._state
+        scores = bm25_scores(postings, len(ids), query)
+        if scores is None or top_k <= 0:
+            return []
+
+        if course_ids is not None:
+            rows = course_rows(courses, course_ids)
+            ids, scores = ids[rows], scores[rows]
+
+        indices, top_scores = top_k_indices(scores, top_k)
+        return [
+            {"page_id": int(ids[index]), "score": float(score)}
+            for index, score in zip(indices, top_scores)
+            if score > 0
+        ]
+
+    def term_coverage(self, query: str, page_ids: List[int]) -> np.ndarray:
+        """
+        Part des termes de la requête présents dans le texte de chaque page.
+
+        Args:
+            query (str): Requête textuelle.
+            page_ids (List[int]): IDs des pages.
+
+        Returns:
+            np.ndarray: Couverture entre 0 et 1 pour chaque page (NaN si la page n'est pas indexée).
+        """
+        ids, _, postings = self._state
+        coverage = np.full(len(page_ids), np.nan, dtype=np.float32)
+        if not len(ids) or not len(page_ids):
+            return coverage
+
+        # Position de chaque page dans l'index (-1 si absente)
+        sorter = np.argsort(ids)
+        wanted = np.asarray(page_ids, dtype=np.int64)
+        slots = np.minimum(np.searchsorted(ids, wanted, sorter=sorter), len(ids) - 1)
+        positions = np.where(ids[sorter[slots]] == wanted, sorter[slots], -1)
+        indexed = positions >= 0
+
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            coverage[indexed] = 0.0
+            return coverage
+
+        matched = np.zeros(len(page_ids), dtype=np.float32)
+        for term in terms:
+            if term in postings:
+                matched += np.isin(positions, postings[term][0])
+        coverage[indexed] = matched[indexed] / len(terms)
+        return coverage
+
+
+# Instance partagée par tous les services du processus
+_lexical_index: Optional[BM25Index] = None
+_lexical_index_lock = threading.Lock()
+
+
+def get_lexical_index() -> BM25Index:
+    """
+    Retourne l'index lexical partagé par le processus (LEXICAL_INDEX_REFRESH_SECONDS).
+    """
+    global _lexical_index
+    if _lexical_index is None:
+        with _lexical_index_lock:
+            if _lexical_index is None:
+                _lexical_index = BM25Index(refresh_interval=float(os.getenv("LEXICAL_INDEX_REFRESH_SECONDS", "300")))
+    return _lexical_index
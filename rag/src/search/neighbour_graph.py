@@ -0,0 +1,318 @@
+# src/search/neighbour_graph.py
+import os
+import logging
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+import numpy as np
+from src.search.vector_index import normalize_rows
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NEIGHBOUR_GRAPH_VERSION = 1
+
+# Nombre de voisins sémantiques précalculés par page
+DEFAULT_SEMANTIC_NEIGHBOURS = 5
+
+# Les pages du même cours à moins de SEMANTIC_EXCLUDE_WINDOW pages sont déjà des voisines
+# physiques : elles ne sont pas retenues comme voisines sémantiques
+SEMANTIC_EXCLUDE_WINDOW = 2
+
+# Nombre de lignes de la matrice de similarité calculées à la fois lors de la construction
+GRAPH_BLOCK_SIZE = 256
+
+
+class NeighbourGraph:
+    """
+    Graphe de voisinage précalculé des pages : voisines physiques et sémantiques.
+
+    Toutes les pages, avec ou sans embedding, sont rangées par (course_id,
+    page_number) : les voisines physiques d'une page sont lues par recherche
+    dichotomique dans ce tri, sans requête de plage.
+    Les k pages les plus similaires du corpus (autres chapitres, autres cours)
+    sont stockées dans une matrice (n, k) d'indices de lignes, avec leurs
+    similarités en float16, dans un fichier .npz compact.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialise un graphe vide.
+
+        Args:
+            path (Optional[str]): Fichier du graphe (NEIGHBOUR_GRAPH_PATH).
+        """
+        self.path = path
+        self.ids = np.empty(0, dtype=np.int64)
+        self.course_ids = np.empty(0, dtype=np.int64)
+        self.page_numbers = np.empty(0, dtype=np.int32)
+        self.neighbours = np.empty((0, 0), dtype=np.int32)
+        self.similarities = np.empty((0, 0), dtype=np.float16)
+        self._row_of: Dict[int, int] = {}
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, page_id: int) -> bool:
+        return page_id in self._row_of
+
+    @property
+    def is_loaded(self) -> bool:
+        return len(self.ids) > 0
+
+    def build(
+        self,
+        page_ids: np.ndarray,
+        course_ids: np.ndarray,
+        page_numbers: np.ndarray,
+        embeddings: np.ndarray,
+        k: int = DEFAULT_SEMANTIC_NEIGHBOURS,
+        embedded: Optional[np.ndarray] = None
+    ) -> None:
+        """
+        Construit le graphe à partir des pages et de leurs embeddings.
+
+        Args:
+            page_ids (np.ndarray): IDs des pages (n,).
+            course_ids (np.ndarray): Cours de chaque page (n,).
+            page_numbers (np.ndarray): Numéro de chaque page dans son cours (n,).
+            embeddings (np.ndarray): Embeddings correspondants (n, d).
+            k (int): Nombre de voisins sémantiques par page.
+            embedded (Optional[np.ndarray]): Pages qui ont un embedding (n,), toutes par
+                défaut ; les autres n'ont que des voisines physiques.
+        """
+        order = np.lexsort((np.asarray(page_numbers), np.asarray(course_ids)))
+        ids = np.asarray(page_ids, dtype=np.int64)[order]
+        courses = np.asarray(course_ids, dtype=np.int64)[order]
+        numbers = np.asarray(page_numbers, dtype=np.int32)[order]
+        vectors = normalize_rows(np.asarray(embeddings)[order])
+        with_vector = np.ones(len(ids), dtype=bool) if embedded is None else np.asarray(embedded, dtype=bool)[order]
+
+        count = len(ids)
+        k = max(0, min(k, int(with_vector.sum()) - 1))
+        neighbours = np.full((count, k), -1, dtype=np.int32)
+        similarities = np.zeros((count, k), dtype=np.float16)
+
+        for start in range(0, count if k else 0, GRAPH_BLOCK_SIZE):
+            stop = min(start + GRAPH_BLOCK_SIZE, count)
+            scores = vectors[start:stop] @ vectors.T
+
+            # Exclure la page elle-même et ses voisines physiques
+            excluded = (courses[start:stop, None] == courses[None, :]) & (
+                np.abs(numbers[start:stop, None] - numbers[None, :]) <= SEMANTIC_EXCLUDE_WINDOW
+            )
+            excluded[np.arange(stop - start), np.arange(start, stop)] = True
+            # Pages sans embedding : ni voisines sémantiques, ni candidates
+            excluded |= ~with_vector[None, :]
+            excluded[~with_vector[start:stop]] = True
+            scores[excluded] = -np.inf
+
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            ranking = np.argsort(-top_scores, axis=1, kind="stable")
+            top = np.take_along_axis(top, ranking, axis=1)
+            top_scores = np.take_along_axis(top_scores, ranking, axis=1)
+
+            valid = np.isfinite(top_scores)
+            neighbours[start:stop] = np.where(valid, top, -1)
+            similarities[start:stop] = np.where(valid, top_scores, 0.0)
+
+        self._replace(ids, courses, numbers, neighbours, similarities)
+        logger.info(f"Graphe de voisinage construit: {count} pages, {k} voisins sémantiques par page")
+
+    def _replace(self, ids, courses, numbers, neighbours, similarities) -> None:
+        row_of = {int(page_id): row for row, page_id in enumerate(ids)}
+        with self._lock:
+            self.ids, self.course_ids, self.page_numbers = ids, courses, numbers
+            self.neighbours, self.similarities = neighbours, similarities
+            self._row_of = row_of
+
+    def _snapshot(self):
+        # Références cohérentes entre elles, même si un rechargement a lieu pendant la lecture
+        with self._lock:
+            return self._row_of, self.ids, self.course_ids, self.page_numbers, self.neighbours, self.similarities
+
+    def physical_neighbours(self, page_id: int, context_size: int = 1) -> List[int]:
+        """
+        Pages du même cours à au plus context_size pages de distance, page incluse, par numéro.
+
+        Args:
+            page_id (int): ID de la page centrale.
+            context_size (int): Nombre de pages avant et après.
+
+        Returns:
+            List[int]: IDs des pages de la fenêtre (vide si la page n'est pas dans le graphe).
+        """
+        row_of, ids, courses, numbers, _, _ = self._snapshot()
+        row = row_of.get(page_id)
+        if row is None:
+            return []
+
+        # Lignes du cours, puis lignes dont le numéro est dans la fenêtre (numéros répétés ou manquants compris)
+        course_start = np.searchsorted(courses, courses[row], side="left")
+        course_stop = np.searchsorted(courses, courses[row], side="right")
+        course_numbers = numbers[course_start:course_stop]
+        start = course_start + np.searchsorted(course_numbers, numbers[row] - context_size, side="left")
+        stop = course_start + np.searchsorted(course_numbers, numbers[row] + context_size, side="right")
+        return [int(page) for page in ids[start:stop]]
+
+    def semantic_neighbours(self, page_id: int, k: Optional[int] = None, min_similarity: float = 0.0) -> List[Tuple[int, float]]:
+        """
+        Pages les plus similaires à une page, hors voisines physiques.
+
+        Args:
+            page_id (int): ID de la page.
+            k (Optional[int]): Nombre maximum de voisines (toutes celles du graphe par défaut).
+            min_similarity (float): Similarité minimum.
+
+        Returns:
+            List[Tuple[int, float]]: (ID de page, similarité) par similarité décroissante.
+        """
+        row_of, ids, _, _, neighbours, similarities = self._snapshot()
+        row = row_of.get(page_id)
+        if row is None:
+            return []
+
+        return [
+            (int(ids[neighbour]), float(similarity))
+            for neighbour, similarity in zip(neighbours[row][:k], similarities[row][:k])
+            if neighbour >= 0 and similarity >= min_similarity
+        ]
+
+    def save(self, path: Optional[str] = None) -> None:
+        """
+        Enregistre le graphe sur disque (format .npz).
+
+        Args:
+            path (Optional[str]): Chemin du fichier (par défaut celui du graphe).
+        """
+        path = path or self.path
+        if not path:
+            return
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        temp_path = f"{path}.tmp.npz"
+        np.savez(
+            temp_path,
+            version=np.asarray(NEIGHBOUR_GRAPH_VERSION),
+            ids=self.ids,
+            course_ids=self.course_ids,
+            page_numbers=self.page_numbers,
+            neighbours=self.neighbours,
+            similarities=self.similarities
+        )
+        os.replace(temp_path, path)
+        logger.info(f"Graphe de voisinage enregistré: {path} ({len(self)} pages)")
+
+    def load(self, path: Optional[str] = None) -> None:
+        """
+        Charge un graphe enregistré par save().
+
+        Args:
+            path (Optional[str]): Chemin du fichier (par défaut celui du graphe).
+        """
+        path = path or self.path
+        with np.load(path) as data:
+            version = int(data["version"])
+            if version > NEIGHBOUR_GRAPH_VERSION:
+                raise ValueError(f"Version de graphe de voisinage non supportée: {version}")
+            self._replace(
+                data["ids"], data["course_ids"], data["page_numbers"], data["neighbours"], data["similarities"]
+            )
+        self._mtime = os.path.getmtime(path)
+        logger.info(f"Graphe de voisinage chargé: {path} ({len(self)} pages)")
+
+    def ensure_fresh(self) -> None:
+        """
+        Charge le fichier du graphe s'il existe, et le recharge lorsqu'il a été reconstruit.
+        """
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            if self._mtime != os.path.getmtime(self.path):
+                self.load()
+        except Exception as e:
+            logger.error(f"Erreur lors du chargement du graphe de voisinage: {str(e)}")
+
+
+def build_neighbour_graph(k: int = DEFAULT_SEMANTIC_NEIGHBOURS, page_size: int = 500) -> NeighbourGraph:
+    """
+    Construit le graphe de voisinage de tout le corpus depuis Supabase.
+
+    Toutes les pages de la table pages y figurent ; celles sans embedding n'ont que
+    des voisines physiques.
+
+    Args:
+        k (int): Nombre de voisins sémantiques par page.
+        page_size (int): Nombre de lignes récupérées par requête.
+
+    Returns:
+        NeighbourGraph: Graphe construit (non enregistré).
+    """
+    # Imports locaux : le stockage n'est nécessaire que pour la construction hors ligne
+    from src.embeddings.embedding_storage import get_embedding_storage
+    from src.storage.supabase_client import get_supabase_client
+
+    page_ids, embeddings = get_embedding_storage().get_all_embeddings(page_size)
+
+    supabase = get_supabase_client()
+    positions: Dict[int, Tuple[int, int]] = {}
+    offset = 0
+    while True:
+        result = supabase.table("pages").select(
+            "id, course_id, page_number"
+        ).order("id").range(offset, offset + page_size - 1).execute()
+
+        rows = result.data or []
+        positions.update({row["id"]: (row.get("course_id") or -1, row.get("page_number") or 0) for row in rows})
+
+        if len(rows) < page_size:
+            break
+        offset += page_size
+
+    all_ids = np.asarray(sorted(positions), dtype=np.int64)
+    known = np.isin(page_ids, all_ids)
+    if not known.all():
+        logger.warning(f"{int((~known).sum())} embeddings sans page correspondante ignorés")
+    page_ids, embeddings = page_ids[known], embeddings[known]
+
+    # Pages sans embedding : ligne nulle dans la matrice, exclue des voisinages sémantiques
+    rows = np.searchsorted(all_ids, page_ids)
+    matrix = np.zeros((len(all_ids), embeddings.shape[1]), dtype=np.float32)
+    matrix[rows] = embeddings
+    embedded = np.zeros(len(all_ids), dtype=bool)
+    embedded[rows] = True
+    if not embedded.all():
+        logger.info(f"{int((~embedded).sum())} pages sans embedding : voisines physiques uniquement")
+
+    graph = NeighbourGraph()
+    graph.build(
+        all_ids,
+        np.asarray([positions[int(page_id)][0] for page_id in all_ids], dtype=np.int64),
+        np.asarray([positions[int(page_id)][1] for page_id in all_ids], dtype=np.int32),
+        matrix,
+        k,
+        embedded
+    )
+    return graph
+
+
+# Instance partagée par tous les moteurs du processus
+_neighbour_graph: Optional[NeighbourGraph] = None
+_neighbour_graph_lock = threading.Lock()
+
+
+def get_neighbour_graph() -> NeighbourGraph:
+    """
+    Retourne le graphe de voisinage partagé par le processus (NEIGHBOUR_GRAPH_PATH),
+    vide si aucun fichier n'a été construit.
+    """
+    global _neighbour_graph
+    if _neighbour_graph is None:
+        with _neighbour_graph_lock:
+            if _neighbour_graph is None:
+                _neighbour_graph = NeighbourGraph(path=os.getenv("NEIGHBOUR_GRAPH_PATH", "data/embeddings/neighbour_graph.npz"))
+    _neighbour_graph.ensure_fresh()
+    return _neighbour_graph
@@ -0,0 +1,199 @@
+# src/search/page_cache.py
+import os
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Coût fixe estimé d'une entrée (dictionnaire, chemins, entiers) en plus du texte
+ENTRY_OVERHEAD_BYTES = 256
+
+
+def page_size(page: Dict[str, Any]) -> int:
+    """
+    Estime la taille mémoire d'une ligne de page à partir de son content_text.
+    """
+    return len((page.get("content_text") or "").encode("utf-8")) + ENTRY_OVERHEAD_BYTES
+
+
+class PageCache:
+    """
+    Cache LRU des lignes de la table pages, borné par la taille totale des textes.
+
+    Les mêmes pages (chapitres d'introduction, pages voisines des résultats
+    fréquents) reviennent dans presque toutes les requêtes. Les pages sont
+    indexées par ID et par (course_id, page_number) pour servir aussi les
+    fenêtres de contexte.
+    """
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024):
+        """
+        Initialise un cache vide.
+
+        Args:
+            max_bytes (int): Taille maximale cumulée des entrées en octets.
+        """
+        self.max_bytes = max_bytes
+        self._pages: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._positions: Dict[Tuple[int, int], int] = {}
+        self._sizes: Dict[int, int] = {}
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def get_many(self, page_ids: List[int]) -> Tuple[Dict[int, Dict[str, Any]], List[int]]:
+        """
+        Retourne les pages en cache et la liste des IDs absents.
+
+        Args:
+            page_ids (List[int]): IDs des pages.
+
+        Returns:
+            Tuple[Dict[int, Dict[str, Any]], List[int]]: Pages trouvées (copies) indexées
+                par ID et IDs à récupérer dans Supabase.
+        """
+        found = {}
+        missing = []
+        with self._lock:
+            for page_id in dict.fromkeys(page_ids):
+                page = self._pages.get(page_id)
+                if page is None:
+                    missing.append(page_id)
+                    continue
+                self._pages.move_to_end(page_id)
+                found[page_id] = dict(page)
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def get_positions(self, course_id: int, page_numbers: List[int]) -> Tuple[Dict[int, Dict[str, Any]], List[int]]:
+        """
+        Retourne les pages en cache d'un cours par numéro de page.
+
+        Args:
+            course_id (int): ID du cours.
+            page_numbers (List[int]): Numéros de pages.
+
+        Returns:
+            Tuple[Dict[int, Dict[str, Any]], List[int]]: Pages trouvées (copies) indexées
+                par numéro et numéros à récupérer dans Supabase.
+        """
+        found = {}
+        missing = []
+        with self._lock:
+            for page_number in page_numbers:
+                page_id = self._positions.get((course_id, page_number))
+                if page_id is None:
+                    missing.append(page_number)
+                    continue
+                self._pages.move_to_end(page_id)
+                found[page_number] = dict(self._pages[page_id])
+            self.hits += len(found)
+            self.misses += len(missing)
+        return found, missing
+
+    def put(self, pages: List[Dict[str, Any]]) -> None:
+        """
+        Ajoute ou remplace des pages puis évince les moins récemment utilisées.
+
+        Args:
+            pages (List[Dict[str, Any]]): Lignes de pages (id, course_id, page_number, content_text...).
+        """
+        with self._lock:
+            for page in pages:
+                page_id = page.get("id")
+                size = page_size(page)
+                if page_id is None or size > self.max_bytes:
+                    continue
+
+                self._discard(page_id)
+                self._pages[page_id] = dict(page)
+                self._sizes[page_id] = size
+                self.current_bytes += size
+                if page.get("course_id") is not None and page.get("page_number") is not None:
+                    self._positions[(page["course_id"], page["page_number"])] = page_id
+
+            while self.current_bytes > self.max_bytes and self._pages:
+                self._discard(next(iter(self._pages)))
+                self.evictions += 1
+
+    def _discard(self, page_id: int) -> None:
+        page = self._pages.pop(page_id, None)
+        if page is None:
+            return
+        self.current_bytes -= self._sizes.pop(page_id)
+        position = (page.get("course_id"), page.get("page_number"))
+        if self._positions.get(position) == page_id:
+            del self._positions[position]
+
+    def invalidate(self, page_ids: Optional[List[int]] = None) -> None:
+        """
+        Retire des pages du cache (toutes si page_ids est None).
+
+        Args:
+            page_ids (Optional[List[int]]): IDs des pages à retirer.
+        """
+        with self._lock:
+            if page_ids is None:
+                self._pages.clear()
+                self._positions.clear()
+                self._sizes.clear()
+                self.current_bytes = 0
+            else:
+                for page_id in page_ids:
+                    self._discard(page_id)
+
+    def invalidate_course(self, course_id: int) -> None:
+        """
+        Retire toutes les pages d'un cours (après l'ingestion d'un PDF dans ce cours).
+
+        Args:
+            course_id (int): ID du cours.
+        """
+        with self._lock:
+            page_ids = [page_id for page_id, page in self._pages.items() if page.get("course_id") == course_id]
+            for page_id in page_ids:
+                self._discard(page_id)
+        logger.info(f"Cache des pages invalidé pour le cours {course_id} ({len(page_ids)} pages retirées)")
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retourne les compteurs du cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._pages),
+                "bytes": self.current_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+# Instance partagée par tous les services du processus
+_page_cache: Optional[PageCache] = None
+_page_cache_lock = threading.Lock()
+
+
+def get_page_cache() -> PageCache:
+    """
+    Retourne le cache des pages partagé par le processus (PAGE_CACHE_MAX_BYTES).
+    """
+    global _page_cache
+    if _page_cache is None:
+        with _page_cache_lock:
+            if _page_cache is None:
+                _page_cache = PageCache(max_bytes=int(os.getenv("PAGE_CACHE_MAX_BYTES", str(32 * 1024 * 1024))))
+    return _page_cache
@@ -0,0 +1,142 @@
+# src/search/query_expansion.py
+import os
+import re
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from src.search.result_cache import normalize_query
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EXPANSION_PROMPT = """Tu aides un moteur de recherche dans des supports de cours d'école d'ingénieurs.
+Reformule la question d'un étudiant en {count} requêtes de recherche complémentaires :
+des paraphrases utilisant le vocabulaire technique du cours et, si la question est vague
+ou composée, les sous-questions qu'elle contient.
+Réponds uniquement par une liste JSON de chaînes, sans commentaire.
+
+Question : {query}"""
+
+# Puces et numérotation retirées lorsque le modèle répond par une liste en texte libre
+LIST_MARKER = re.compile(r"^\s*(?:[-*•]|\d+[.)])\s*")
+
+
+def parse_variants(content: str) -> List[str]:
+    """
+    Extrait les requêtes de la réponse du modèle (liste JSON, ou une requête par ligne).
+    """
+    match = re.search(r"\[.*\]", content or "", re.DOTALL)
+    if match:
+        try:
+            variants = json.loads(match.group(0))
+            return [str(variant).strip() for variant in variants if str(variant).strip()]
+        except ValueError:
+            pass
+
+    lines = [LIST_MARKER.sub("", line).strip().strip('"') for line in (content or "").splitlines()]
+    return [line for line in lines if line]
+
+
+class QueryExpander:
+    """
+    Génère des paraphrases et sous-questions d'une requête avec un LLM.
+
+    Les expansions sont mises en cache par requête normalisée : une question
+    répétée ne coûte pas de nouvel appel au modèle.
+    """
+
+    def __init__(self, client=None, model: Optional[str] = None, max_variants: int = 3, cache_size: int = 500):
+        """
+        Initialise le générateur d'expansions.
+
+        Args:
+            client: Client OpenRouter (créé au premier appel si absent).
+            model (Optional[str]): Modèle utilisé (modèle par défaut du client si absent).
+            max_variants (int): Nombre maximum de requêtes générées en plus de l'originale.
+            cache_size (int): Nombre maximum d'expansions en cache.
+        """
+        self._client = client
+        self.model = model
+        self.max_variants = max_variants
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[str, Optional[str], int], List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            # Import local : le client n'est nécessaire que si l'expansion est utilisée
+            from src.api.openrouter_client import get_openrouter_client
+            self._client = get_openrouter_client()
+        return self._client
+
+    def expand(self, query: str) -> List[str]:
+        """
+        Retourne la requête suivie de ses variantes (sans doublons).
+
+        En cas d'échec du modèle, seule la requête originale est retournée (et rien
+        n'est mis en cache).
+
+        Args:
+            query (str): Requête de l'utilisateur.
+
+        Returns:
+            List[str]: Requête originale puis variantes générées.
+        """
+        key = (normalize_query(query), self.model, self.max_variants)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                return list(cached)
+
+        try:
+            response = self.client.generate_response(
+                [{"role": "user", "content": EXPANSION_PROMPT.format(count=self.max_variants, query=query)}],
+                model=self.model,
+                temperature=0.3,
+                max_tokens=300
+            )
+            content = response["choices"][0]["message"]["content"]
+        except Exception as e:
+            logger.error(f"Erreur lors de l'expansion de la requête: {str(e)}")
+            return [query]
+
+        variants = {normalize_query(query): query}
+        for variant in parse_variants(content):
+            if len(variants) > self.max_variants:
+                break
+            variants.setdefault(normalize_query(variant), variant)
+        expanded = list(variants.values())
+        logger.info(f"Requête étendue en {len(expanded) - 1} variantes: {expanded[1:]}")
+
+        with self._lock:
+            self._cache[key] = expanded
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return list(expanded)
+
+
+# Instance partagée par tous les moteurs du processus
+_query_expander: Optional[QueryExpander] = None
+_query_expander_lock = threading.Lock()
+
+
+def get_query_expander() -> QueryExpander:
+    """
+    Retourne le générateur d'expansions partagé par le processus
+    (QUERY_EXPANSION_MODEL, QUERY_EXPANSION_VARIANTS).
+    """
+    global _query_expander
+    if _query_expander is None:
+        with _query_expander_lock:
+            if _query_expander is None:
+                _query_expander = QueryExpander(
+                    model=os.getenv("QUERY_EXPANSION_MODEL") or None,
+                    max_variants=int(os.getenv("QUERY_EXPANSION_VARIANTS", "3"))
+                )
+    return _query_expander
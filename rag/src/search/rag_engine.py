@@ -1,13 +1,34 @@
 # src/search/rag_engine.py
+import os
+import time
 import logging
 from typing import List, Dict, Any, Optional, Tuple
-from src.search.search_service import get_search_service
+from src.search.search_service import get_search_service, get_search_executor, record_timing
 from src.search.content_retriever import get_content_retriever
+from src.search.context_packer import get_context_budget, pack_pages
+from src.search.query_expansion import get_query_expander
+from src.search.fusion import reciprocal_rank_fusion, max_fusion_score
+from src.search.neighbour_graph import get_neighbour_graph
+from src.search.chunk_index import get_chunk_index
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Poids des variantes générées par rapport à la requête originale dans la fusion
+EXPANSION_VARIANT_WEIGHT = 0.7
+
+# Score d'une page de contexte (voisine physique) et d'une page apparentée (voisine
+# sémantique), relatif à la similarité du résultat qui l'apporte
+CONTEXT_PAGE_FACTOR = 0.8
+RELATED_PAGE_FACTOR = 0.6
+
+# Similarité minimum entre un résultat et une page apparentée
+MIN_RELATED_SIMILARITY = 0.5
+
+# Séparateur entre deux passages non contigus d'une même page
+PASSAGE_SEPARATOR = "\n[...]\n"
+
 class RAGEngine:
     """
     Moteur de RAG (Retrieval-Augmented Generation) qui combine recherche et 
@@ -20,154 +41,423 @@ class RAGEngine:
         """
         self.search_service = get_search_service()
         self.content_retriever = get_content_retriever()
+        self.query_expander = get_query_expander()
+        
+        # Expansion de requête désactivée par défaut (QUERY_EXPANSION=true pour l'activer)
+        self.expand_queries = os.getenv("QUERY_EXPANSION", "false").lower() == "true"
+        
+        # Graphe de voisinage précalculé (scripts/build_neighbour_graph.py), s'il existe
+        self.neighbour_graph = get_neighbour_graph()
+        self.related_pages = int(os.getenv("NEIGHBOUR_GRAPH_RELATED_PAGES", "2"))
+        
+        # Passages conservés par page dans le contexte du LLM (0 pour les pages entières)
+        self.passages_per_page = int(os.getenv("CONTEXT_PASSAGES_PER_PAGE", "3"))
+        self.chunk_index = get_chunk_index() if self.passages_per_page > 0 else None
         logger.info("Moteur RAG initialisé")
     
-    def retrieve(self, query: str, top_k: int = 5, include_context: bool = True, context_size: int = 1) -> Dict[str, Any]:
+    def retrieve(
+        self,
+        query: str,
+        top_k: int = 5,
+        include_context: bool = True,
+        context_size: int = 1,
+        debug: bool = False,
+        course_ids: Optional[List[int]] = None,
+        year: Optional[str] = None,
+        expand_query: Optional[bool] = None
+    ) -> Dict[str, Any]:
         """
         Récupère les informations pertinentes en fonction d'une requête.
         
+        Avec l'expansion de requête, des paraphrases et sous-questions générées par
+        un LLM sont cherchées en plus de la requête, et les classements sont
+        fusionnés par rang réciproque.
+        
         Args:
             query (str): Requête textuelle.
             top_k (int): Nombre maximum de résultats à retourner.
             include_context (bool): Si True, inclut les pages de contexte.
             context_size (int): Nombre de pages de contexte à inclure.
+            debug (bool): Si True, ajoute la durée de chaque étape dans "timings".
+            course_ids (Optional[List[int]]): Limite la recherche à ces cours.
+            year (Optional[str]): Limite la recherche aux cours de cette année (ING1, ING2, ING3).
+            expand_query (Optional[bool]): Active l'expansion de requête (QUERY_EXPANSION par défaut).
             
         Returns:
             Dict[str, Any]: Résultats structurés avec les informations pertinentes.
         """
+        start_time = time.perf_counter()
+        timings: Dict[str, float] = {}
+        expand_query = self.expand_queries if expand_query is None else expand_query
+        
         try:
-            # Rechercher les pages pertinentes
-            search_results = self.search_service.search(query, top_k=top_k)
+            if expand_query:
+                search_results = self._expanded_search(query, top_k, timings, course_ids, year)
+            else:
+                # Rechercher les pages pertinentes, en préchargeant les cours pendant l'embedding
+                search_results = self.search_service.search(
+                    query,
+                    top_k=top_k,
+                    prefetch=[self.content_retriever.prefetch_courses],
+                    timings=timings,
+                    course_ids=course_ids,
+                    year=year
+                )
             
             if not search_results:
                 logger.warning(f"Aucun résultat trouvé pour la requête: {query}")
-                return {"query": query, "results": [], "context": {}}
+                return self._with_timings({"query": query, "results": [], "context": {}}, timings, start_time, debug)
+            
+            # Lignes de pages déjà récupérées par la recherche, réutilisées sans nouvelle requête
+            known_pages = {result['id']: result for result in search_results if result.get('id')}
+            page_ids = list(known_pages)
             
             # Enrichir les résultats avec le contenu complet
-            enriched_results = []
-            context_pages = {}
+            step_start = time.perf_counter()
+            page_contents = self.content_retriever.get_pages_content(page_ids, known_pages)
+            record_timing(timings, "page_content", step_start)
             
+            enriched_results = []
             for result in search_results:
-                page_id = result.get('id')
-                if not page_id:
-                    continue
-                
-                # Récupérer le contenu complet de la page
-                page_content = self.content_retriever.get_page_content(page_id)
+                page_content = page_contents.get(result.get('id'))
                 if page_content:
                     # Fusionner les informations
                     result.update(page_content)
                     enriched_results.append(result)
-                
-                # Récupérer les pages de contexte si demandé
-                if include_context:
-                    context = self.content_retriever.get_context_pages(page_id, context_size)
-                    if context:
-                        context_pages[page_id] = context
             
-            return {
+            # Récupérer les pages de contexte si demandé (depuis le graphe de voisinage s'il est construit)
+            context_pages = {}
+            related_pages = {}
+            if include_context:
+                step_start = time.perf_counter()
+                self.neighbour_graph.ensure_fresh()
+                if self.neighbour_graph.is_loaded:
+                    context_pages, related_pages = self.content_retriever.get_graph_context(
+                        page_ids,
+                        self.neighbour_graph,
+                        context_size,
+                        self.related_pages,
+                        MIN_RELATED_SIMILARITY,
+                        known_pages
+                    )
+                else:
+                    context_pages = self.content_retriever.get_context_windows(page_ids, context_size, known_pages)
+                record_timing(timings, "context_pages", step_start)
+            
+            return self._with_timings({
                 "query": query,
                 "results": enriched_results,
-                "context": context_pages
-            }
+                "context": context_pages,
+                "related": related_pages
+            }, timings, start_time, debug)
             
         except Exception as e:
             logger.error(f"Erreur lors de la récupération des informations: {str(e)}")
-            return {"query": query, "results": [], "context": {}, "error": str(e)}
+            return self._with_timings({"query": query, "results": [], "context": {}, "error": str(e)}, timings, start_time, debug)
+    
+    def _expanded_search(
+        self,
+        query: str,
+        top_k: int,
+        timings: Dict[str, float],
+        course_ids: Optional[List[int]] = None,
+        year: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Recherche la requête et ses variantes générées, puis fusionne les classements.
+        
+        La requête originale est cherchée pendant l'appel au LLM d'expansion ; les
+        variantes sont ensuite cherchées ensemble (search_many). Expansions et
+        résultats par variante sont en cache : une question répétée ne relance
+        ni le LLM ni les recherches.
+        
+        Args:
+            query (str): Requête textuelle.
+            top_k (int): Nombre maximum de résultats à retourner.
+            timings (Dict[str, float]): Reçoit la durée de chaque étape.
+            course_ids (Optional[List[int]]): Limite la recherche à ces cours.
+            year (Optional[str]): Limite la recherche aux cours de cette année (ING1, ING2, ING3).
+            
+        Returns:
+            List[Dict[str, Any]]: Résultats fusionnés ; similarity est le score fusionné
+                normalisé et matched_queries le nombre de requêtes ayant trouvé la page.
+        """
+        expansion_future = get_search_executor().submit(self.query_expander.expand, query)
+        
+        original_results = self.search_service.search(
+            query,
+            top_k=top_k,
+            prefetch=[self.content_retriever.prefetch_courses],
+            timings=timings,
+            course_ids=course_ids,
+            year=year
+        )
+        
+        step_start = time.perf_counter()
+        variants = expansion_future.result()[1:]
+        record_timing(timings, "query_expansion_wait", step_start)
+        if not variants:
+            return original_results
+        
+        step_start = time.perf_counter()
+        variant_results = self.search_service.search_many(variants, top_k=top_k, course_ids=course_ids, year=year)
+        record_timing(timings, "variant_search", step_start)
+        
+        rankings = [[result['id'] for result in results] for results in [original_results] + variant_results]
+        weights = [1.0] + [EXPANSION_VARIANT_WEIGHT] * len(variants)
+        max_score = max_fusion_score(weights)
+        
+        # Première occurrence de chaque page (détails identiques d'une variante à l'autre)
+        pages_by_id: Dict[int, Dict[str, Any]] = {}
+        matched_queries: Dict[int, int] = {}
+        for results in [original_results] + variant_results:
+            for result in results:
+                pages_by_id.setdefault(result['id'], result)
+                matched_queries[result['id']] = matched_queries.get(result['id'], 0) + 1
+        
+        return [
+            {**pages_by_id[page_id], "similarity": score / max_score, "matched_queries": matched_queries[page_id]}
+            for page_id, score in reciprocal_rank_fusion(rankings, weights)[:top_k]
+        ]
+    
+    def _with_timings(self, result: Dict[str, Any], timings: Dict[str, float], start_time: float, debug: bool) -> Dict[str, Any]:
+        """
+        Ajoute la décomposition des latences par étape au résultat en mode debug.
+        """
+        record_timing(timings, "total", start_time)
+        logger.info("Latences de la récupération: " + ", ".join(f"{stage}={duration:.3f}s" for stage, duration in timings.items()))
+        if debug:
+            result["timings"] = timings
+        return result
+    
+    def merge_pages(
+        self,
+        results: List[Dict[str, Any]],
+        context_pages: Dict[int, List[Dict[str, Any]]],
+        related_pages: Optional[Dict[int, List[Dict[str, Any]]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Fusionne les résultats et leurs fenêtres de contexte qui se recouvrent.
+        
+        Lorsque plusieurs résultats sont des pages voisines d'un même cours, leurs
+        fenêtres partagent des pages : chaque page n'apparaît qu'une fois, avec son
+        meilleur score (une page de contexte vaut CONTEXT_PAGE_FACTOR fois la
+        similarité du résultat qui l'apporte, une page apparentée RELATED_PAGE_FACTOR
+        fois), et reste un résultat si elle en est un.
+        
+        Args:
+            results (List[Dict[str, Any]]): Résultats enrichis de la recherche.
+            context_pages (Dict[int, List[Dict[str, Any]]]): Fenêtres de contexte par ID de résultat.
+            related_pages (Optional[Dict[int, List[Dict[str, Any]]]]): Pages apparentées
+                (voisines sémantiques, avec leur "course") par ID de résultat.
+            
+        Returns:
+            List[Dict[str, Any]]: Pages uniques (id, page_number, course, content_text,
+                similarity, is_context) par score décroissant.
+        """
+        merged: Dict[int, Dict[str, Any]] = {}
+        
+        def add(page: Dict[str, Any], course: Dict[str, Any], similarity: float, is_context: bool) -> None:
+            page_id = page.get('id')
+            current = merged.get(page_id)
+            if current is None:
+                merged[page_id] = {
+                    "id": page_id,
+                    "page_number": page.get('page_number'),
+                    "course_id": page.get('course_id'),
+                    "course": course,
+                    "content_text": page.get('content_text', ""),
+                    "similarity": similarity,
+                    "is_context": is_context
+                }
+                return
+            current["similarity"] = max(current["similarity"], similarity)
+            current["is_context"] = current["is_context"] and is_context
+        
+        for result in results:
+            add(result, result.get('courses') or {}, result.get('similarity', 0), False)
+        
+        for result in results:
+            course = result.get('courses') or {}
+            # Réduire l'importance des pages de contexte
+            ctx_similarity = result.get('similarity', 0) * CONTEXT_PAGE_FACTOR
+            for ctx_page in context_pages.get(result.get('id'), []):
+                add(ctx_page, course, ctx_similarity, True)
+            
+            # Pages apparentées d'autres chapitres, moins prioritaires que les voisines physiques
+            related_similarity = result.get('similarity', 0) * RELATED_PAGE_FACTOR
+            for related_page in (related_pages or {}).get(result.get('id'), []):
+                add(related_page, related_page.get('course') or {}, related_similarity, True)
+        
+        # Score décroissant, puis ordre de lecture dans le cours
+        return sorted(
+            merged.values(),
+            key=lambda page: (-page["similarity"], page["course_id"] or 0, page["page_number"] or 0)
+        )
     
-    def build_context_for_llm(self, query: str, top_k: int = 3, context_size: int = 1) -> Dict[str, Any]:
+    def build_context_for_llm(
+        self,
+        query: str,
+        top_k: int = 3,
+        context_size: int = 1,
+        model: Optional[str] = None,
+        max_tokens: int = 1500,
+        token_budget: Optional[int] = None,
+        debug: bool = False,
+        course_ids: Optional[List[int]] = None,
+        year: Optional[str] = None,
+        expand_query: Optional[bool] = None
+    ) -> Dict[str, Any]:
         """
         Construit un contexte structuré et formaté pour le LLM.
         
+        Les pages sont ajoutées par score décroissant jusqu'à épuisement du budget de
+        tokens du modèle ; les pages les moins pertinentes sont tronquées ou écartées.
+        De chaque page, seuls les passages qui répondent à la question sont conservés
+        (CONTEXT_PASSAGES_PER_PAGE), avec le numéro de page pour la citation.
+        
         Args:
             query (str): Requête textuelle.
             top_k (int): Nombre maximum de résultats à inclure.
             context_size (int): Nombre de pages de contexte à inclure.
+            model (Optional[str]): Modèle destinataire, qui détermine le budget de tokens.
+            max_tokens (int): Nombre maximum de tokens de la réponse du modèle.
+            token_budget (Optional[int]): Budget explicite, prioritaire sur celui du modèle.
+            debug (bool): Si True, ajoute la durée de chaque étape dans "timings".
+            course_ids (Optional[List[int]]): Limite la recherche à ces cours.
+            year (Optional[str]): Limite la recherche aux cours de cette année (ING1, ING2, ING3).
+            expand_query (Optional[bool]): Active l'expansion de requête (QUERY_EXPANSION par défaut).
             
         Returns:
             Dict[str, Any]: Contexte structuré pour le LLM et métadonnées.
         """
         try:
             # Récupérer les informations pertinentes
-            retrieval_results = self.retrieve(query, top_k, True, context_size)
+            retrieval_results = self.retrieve(
+                query, top_k, True, context_size,
+                debug=debug, course_ids=course_ids, year=year, expand_query=expand_query
+            )
             results = retrieval_results.get('results', [])
             context_pages = retrieval_results.get('context', {})
+            timings = retrieval_results.get('timings')
             
             if not results:
                 logger.warning(f"Aucun résultat disponible pour construire le contexte LLM")
-                return {"context": "", "metadata": {"success": False, "message": "Aucun contenu pertinent trouvé."}}
+                return self._with_debug_timings(
+                    {"context": "", "metadata": {"success": False, "message": "Aucun contenu pertinent trouvé."}},
+                    timings
+                )
+            
+            budget = token_budget if token_budget is not None else get_context_budget(model, max_tokens)
+            
+            pages = self.merge_pages(results, context_pages, retrieval_results.get('related'))
+            if self.chunk_index is not None:
+                step_start = time.perf_counter()
+                pages = self.select_passages(query, pages)
+                record_timing(timings, "passage_selection", step_start)
             
-            # Construire le contexte formaté pour le LLM
-            context_blocks = []
+            # Remplir le budget avec les pages fusionnées, par score décroissant
+            step_start = time.perf_counter()
+            packed = pack_pages(pages, budget, self._format_context_block)
+            record_timing(timings, "context_packing", step_start)
+            
+            # Construire les métadonnées
             metadata = {
                 "success": True,
                 "pages": [],
-                "courses": {}
+                "courses": {},
+                "token_budget": budget,
+                "context_tokens": packed["used_tokens"],
+                "dropped_pages": [self._page_metadata(page) for page in packed["dropped"]]
             }
             
-            for result in results:
-                page_id = result.get('id')
-                page_number = result.get('page_number')
-                course = result.get('courses', {})
-                course_id = course.get('id') if course else None
-                course_name = course.get('name', "Inconnu") if course else "Inconnu"
-                content_text = result.get('content_text', "")
-                similarity = result.get('similarity', 0)
+            for page in packed["included"]:
+                course = page['course']
+                course_id = course.get('id') if course else page.get('course_id')
                 
-                # Ajouter les métadonnées
                 if course_id and course_id not in metadata["courses"]:
                     metadata["courses"][course_id] = {
-                        "name": course_name,
+                        "name": course.get('name', "Inconnu") if course else "Inconnu",
                         "year": course.get('year', "") if course else ""
                     }
                 
-                metadata["pages"].append({
-                    "id": page_id,
-                    "page_number": page_number,
-                    "course_id": course_id,
-                    "similarity": similarity
-                })
-                
-                # Construire le bloc de contexte
-                context_block = f"--- Cours: {course_name} | Page: {page_number} ---\n{content_text}\n"
-                context_blocks.append((context_block, similarity))
-                
-                # Ajouter le contexte des pages environnantes si disponible
-                if page_id in context_pages:
-                    for ctx_page in context_pages[page_id]:
-                        ctx_id = ctx_page.get('id')
-                        if ctx_id == page_id:  # Éviter les doublons
-                            continue
-                        
-                        ctx_number = ctx_page.get('page_number')
-                        ctx_text = ctx_page.get('content_text', "")
-                        
-                        # Ajouter avec une similarité légèrement inférieure
-                        ctx_similarity = similarity * 0.8  # Réduire l'importance
-                        ctx_block = f"--- Cours: {course_name} | Page: {ctx_number} (Contexte) ---\n{ctx_text}\n"
-                        context_blocks.append((ctx_block, ctx_similarity))
-                        
-                        # Ajouter aux métadonnées
-                        metadata["pages"].append({
-                            "id": ctx_id,
-                            "page_number": ctx_number,
-                            "course_id": course_id,
-                            "similarity": ctx_similarity,
-                            "is_context": True
-                        })
-            
-            # Trier les blocs par similarité et construire le contexte final
-            context_blocks.sort(key=lambda x: x[1], reverse=True)
-            full_context = "\n".join([block for block, _ in context_blocks])
-            
-            return {
+                page_metadata = self._page_metadata(page)
+                if page['truncated']:
+                    page_metadata["truncated"] = True
+                if page.get('excerpt'):
+                    page_metadata["excerpt"] = True
+                metadata["pages"].append(page_metadata)
+            
+            full_context = "\n".join(packed["blocks"])
+            
+            return self._with_debug_timings({
                 "context": full_context,
                 "metadata": metadata
-            }
+            }, timings)
             
         except Exception as e:
             logger.error(f"Erreur lors de la construction du contexte pour le LLM: {str(e)}")
             return {"context": "", "metadata": {"success": False, "message": str(e)}}
+    
+    def select_passages(self, query: str, pages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Réduit le texte de chaque page à ses passages les plus pertinents pour la requête.
+        
+        Les pages dont tous les passages sont retenus, ou dont aucun passage ne
+        contient de terme de la requête, gardent leur texte complet.
+        
+        Args:
+            query (str): Requête textuelle.
+            pages (List[Dict[str, Any]]): Pages fusionnées (merge_pages).
+            
+        Returns:
+            List[Dict[str, Any]]: Pages, avec "excerpt" pour celles réduites à des passages.
+        """
+        try:
+            self.chunk_index.ensure_loaded()
+            passages = self.chunk_index.select_passages(
+                query, [page['id'] for page in pages], self.passages_per_page
+            )
+        except Exception as e:
+            logger.error(f"Erreur lors de la sélection des passages: {str(e)}")
+            return pages
+        
+        selected = []
+        for page in pages:
+            kept, total = passages.get(page['id'], ([], 0))
+            if kept and len(kept) < total:
+                page = {**page, "content_text": PASSAGE_SEPARATOR.join(kept), "excerpt": True}
+            selected.append(page)
+        return selected
+    
+    def _format_context_block(self, page: Dict[str, Any], text: str) -> str:
+        """
+        Formate le bloc de contexte d'une page.
+        """
+        course = page.get('course')
+        course_name = course.get('name', "Inconnu") if course else "Inconnu"
+        label = f"{page['page_number']} (Contexte)" if page['is_context'] else page['page_number']
+        return f"--- Cours: {course_name} | Page: {label} ---\n{text}\n"
+    
+    def _page_metadata(self, page: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Métadonnées d'une page fusionnée (ID, numéro, cours, similarité).
+        """
+        course = page.get('course')
+        page_metadata = {
+            "id": page['id'],
+            "page_number": page['page_number'],
+            "course_id": course.get('id') if course else page.get('course_id'),
+            "similarity": page['similarity']
+        }
+        if page['is_context']:
+            page_metadata["is_context"] = True
+        return page_metadata
+    
+    def _with_debug_timings(self, result: Dict[str, Any], timings: Optional[Dict[str, float]]) -> Dict[str, Any]:
+        if timings is not None:
+            result["timings"] = timings
+        return result
 
 # Fonction pour obtenir une instance du moteur RAG
 def get_rag_engine() -> RAGEngine:
@@ -0,0 +1,135 @@
+# src/search/reranker.py
+import os
+import logging
+from typing import List, Dict, Any, Optional, Callable
+import numpy as np
+from src.search.vector_index import normalize_rows
+from src.search.lexical_index import get_lexical_index
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Nombre de candidats de la première passe rescorés par le reranker
+RERANK_CANDIDATES = 50
+
+
+class Reranker:
+    """
+    Second étage de classement : rescore les meilleurs candidats de la première passe.
+
+    Une sous-classe implémente `score`, qui retourne un score de pertinence
+    (idéalement entre 0 et 1) par candidat, ou NaN lorsqu'elle ne peut pas le
+    calculer ; le service de recherche le combine avec le score de première passe.
+    """
+
+    name = "base"
+
+    def score(
+        self,
+        query: Optional[str],
+        query_embedding: Optional[List[float]],
+        candidates: List[Dict[str, Any]]
+    ) -> np.ndarray:
+        """
+        Calcule le score de chaque candidat.
+
+        Args:
+            query (Optional[str]): Requête textuelle (None pour une recherche par embedding).
+            query_embedding (Optional[List[float]]): Embedding de la requête.
+            candidates (List[Dict[str, Any]]): Candidats (page_id, similarity) de la première passe.
+
+        Returns:
+            np.ndarray: Scores des candidats (NaN si inconnu).
+        """
+        raise NotImplementedError
+
+
+class FullPrecisionReranker(Reranker):
+    """
+    Recalcule la similarité cosinus exacte avec les embeddings float32 de page_embeddings.
+
+    Utile lorsque la première passe est approximative (index HNSW de pgvector,
+    snapshot float16). Sur une première passe exacte (index en mémoire float32,
+    recherche séquentielle), il recalcule le même score et ne change rien.
+    Il lit RERANK_CANDIDATES embeddings dans Supabase : ce n'est pas le reranker
+    par défaut, et il faut relever SEARCH_RERANK_BUDGET_MS (50 ms par défaut)
+    pour l'activer, sans quoi il dépasse son budget et la première passe est conservée.
+    """
+
+    name = "full_precision"
+
+    def __init__(self, embedding_storage=None):
+        if embedding_storage is None:
+            # Import local : le stockage n'est nécessaire que si ce reranker est activé
+            from src.embeddings.embedding_storage import get_embedding_storage
+            embedding_storage = get_embedding_storage()
+        self.embedding_storage = embedding_storage
+
+    def score(self, query, query_embedding, candidates) -> np.ndarray:
+        scores = np.full(len(candidates), np.nan, dtype=np.float32)
+        if not query_embedding or not candidates:
+            return scores
+
+        vectors, found = self.embedding_storage.get_page_embeddings([candidate['page_id'] for candidate in candidates])
+        if found.any():
+            scores[found] = normalize_rows(vectors[found]) @ normalize_rows(query_embedding)[0]
+        return scores
+
+
+class LexicalOverlapReranker(Reranker):
+    """
+    Favorise les pages qui contiennent les termes exacts de la requête
+    (part des termes présents dans content_text, d'après l'index BM25).
+    """
+
+    name = "lexical"
+
+    def __init__(self, lexical_index=None):
+        self.lexical_index = lexical_index or get_lexical_index()
+
+    def score(self, query, query_embedding, candidates) -> np.ndarray:
+        if not query or not candidates:
+            return np.full(len(candidates), np.nan, dtype=np.float32)
+
+        self.lexical_index.ensure_fresh()
+        return self.lexical_index.term_coverage(query, [candidate['page_id'] for candidate in candidates])
+
+
+# Rerankers disponibles par nom (SEARCH_RERANKER)
+_rerankers: Dict[str, Callable[[], Reranker]] = {
+    FullPrecisionReranker.name: FullPrecisionReranker,
+    LexicalOverlapReranker.name: LexicalOverlapReranker
+}
+
+
+def register_reranker(name: str, factory: Callable[[], Reranker]) -> None:
+    """
+    Enregistre un reranker (par exemple un modèle cross-encoder local) sous un nom.
+
+    Args:
+        name (str): Nom à utiliser dans SEARCH_RERANKER.
+        factory (Callable[[], Reranker]): Fonction ou classe créant le reranker.
+    """
+    _rerankers[name] = factory
+
+
+def get_reranker(name: Optional[str] = None) -> Optional[Reranker]:
+    """
+    Crée le reranker configuré (SEARCH_RERANKER, aucun par défaut).
+
+    Args:
+        name (Optional[str]): Nom du reranker, prioritaire sur la variable d'environnement.
+
+    Returns:
+        Optional[Reranker]: Reranker, ou None si aucun n'est configuré ou s'il est inconnu.
+    """
+    name = name if name is not None else os.getenv("SEARCH_RERANKER", "")
+    if not name:
+        return None
+
+    factory = _rerankers.get(name)
+    if factory is None:
+        logger.error(f"Reranker inconnu: {name} (disponibles: {', '.join(sorted(_rerankers))})")
+        return None
+    return factory()
@@ -0,0 +1,151 @@
+# src/search/result_cache.py
+import os
+import re
+import time
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Tuple, Hashable
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalise une requête pour la clé du cache (casse, espaces, forme Unicode).
+
+    Les accents sont conservés : ils peuvent changer le sens de la requête.
+    """
+    normalized = unicodedata.normalize("NFC", query or "").lower()
+    return WHITESPACE.sub(" ", normalized).strip()
+
+
+class SearchResultCache:
+    """
+    Cache LRU des résultats de recherche, étiqueté par version du corpus.
+
+    Chaque écriture d'embeddings incrémente la version : les entrées calculées
+    avec une version antérieure ne sont plus servies, sans avoir à parcourir le
+    cache. La durée de vie borne l'obsolescence due aux écritures faites par
+    d'autres processus (scripts d'ingestion).
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600.0):
+        """
+        Initialise un cache vide.
+
+        Args:
+            max_entries (int): Nombre maximum de recherches en cache (0 pour désactiver le cache).
+            ttl (float): Durée de vie d'une entrée en secondes (0 pour aucune limite).
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = 0
+        # Clé -> (version du corpus, date d'insertion, résultats)
+        self._entries: "OrderedDict[Hashable, Tuple[int, float, List[Dict[str, Any]]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(query: str, **params: Any) -> Hashable:
+        """
+        Construit la clé d'une recherche à partir de la requête normalisée et des paramètres.
+        """
+        return (normalize_query(query),) + tuple(sorted(params.items()))
+
+    def get(self, key: Hashable) -> Optional[List[Dict[str, Any]]]:
+        """
+        Retourne les résultats en cache (copies) ou None s'ils sont absents ou périmés.
+        """
+        if not self.max_entries:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                version, stored_at, results = entry
+                if version == self.version and (not self.ttl or time.time() - stored_at <= self.ttl):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return [dict(result) for result in results]
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, results: List[Dict[str, Any]], version: int) -> None:
+        """
+        Ajoute les résultats d'une recherche.
+
+        Args:
+            key (Hashable): Clé de la recherche (make_key).
+            results (List[Dict[str, Any]]): Résultats à conserver.
+            version (int): Version du corpus lue avant la recherche ; si une écriture
+                a eu lieu entre-temps, les résultats ne sont pas conservés.
+        """
+        if not self.max_entries:
+            return
+
+        with self._lock:
+            if version != self.version:
+                return
+            self._entries[key] = (version, time.time(), [dict(result) for result in results])
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def bump_version(self) -> int:
+        """
+        Signale une modification du corpus : toutes les entrées existantes deviennent périmées.
+
+        Returns:
+            int: Nouvelle version du corpus.
+        """
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            return self.version
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Retourne les compteurs du cache.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+# Instance partagée par tous les services du processus
+_result_cache: Optional[SearchResultCache] = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> SearchResultCache:
+    """
+    Retourne le cache des résultats de recherche partagé par le processus
+    (SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_TTL_SECONDS).
+    """
+    global _result_cache
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = SearchResultCache(
+                    max_entries=int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1000")),
+                    ttl=float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "3600"))
+                )
+    return _result_cache
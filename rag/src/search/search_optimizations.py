@@ -1,13 +1,28 @@
 # src/search/search_optimizations.py
+import re
+import copy
+import zlib
 import logging
 import time
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
 from functools import lru_cache
 from typing import List, Dict, Any, Tuple, Optional
+import numpy as np
+from src.search.vector_index import normalize_rows
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Taille des n-grammes de caractères et dimension des vecteurs hachés utilisés pour le regroupement
+GROUPING_NGRAM_SIZE = 3
+GROUPING_HASH_DIMENSION = 1024
+
+# Nombre de lignes de la matrice de similarité calculées à la fois
+GROUPING_BLOCK_SIZE = 512
+
 # Décorateur pour mesurer le temps d'exécution
 def timing_decorator(func):
     def wrapper(*args, **kwargs):
@@ -51,51 +66,234 @@ def cached_query_embedding(query: str, client_func) -> Optional[List[float]]:
         logger.error(f"Erreur lors de la génération de l'embedding mis en cache: {str(e)}")
         return None
 
+def normalize_for_grouping(query: str) -> str:
+    """
+    Normalise une requête pour le regroupement (minuscules, sans accents ni ponctuation).
+    """
+    normalized = unicodedata.normalize("NFKD", (query or "").lower())
+    normalized = "".join(char for char in normalized if not unicodedata.combining(char))
+    return " ".join(re.findall(r"\w+", normalized))
+
+def ngram_vectors(texts: List[str], n: int = GROUPING_NGRAM_SIZE, dimension: int = GROUPING_HASH_DIMENSION) -> np.ndarray:
+    """
+    Vecteurs normalisés des n-grammes de caractères des textes, hachés dans une dimension fixe.
+    
+    Args:
+        texts (List[str]): Textes normalisés.
+        n (int): Taille des n-grammes.
+        dimension (int): Dimension des vecteurs (nombre de cases du hachage).
+        
+    Returns:
+        np.ndarray: Matrice (len(texts), dimension) de lignes normalisées.
+    """
+    rows = []
+    columns = []
+    for row, text in enumerate(texts):
+        padded = f" {text} "
+        for start in range(max(1, len(padded) - n + 1)):
+            rows.append(row)
+            columns.append(zlib.crc32(padded[start:start + n].encode("utf-8")) % dimension)
+    
+    counts = np.zeros((len(texts), dimension), dtype=np.float32)
+    np.add.at(counts, (np.asarray(rows, dtype=np.int64), np.asarray(columns, dtype=np.int64)), 1.0)
+    return normalize_rows(counts)
+
 # Optimisation pour regrouper les requêtes similaires
-def group_similar_queries(queries: List[str], threshold: float = 0.95) -> List[List[int]]:
+def group_similar_queries(queries: List[str], threshold: Optional[float] = None) -> List[List[int]]:
     """
-    Regroupe les requêtes similaires pour réduire le nombre d'appels d'embedding.
-    Cette fonction est un placeholder pour une implémentation plus sophistiquée.
+    Regroupe les requêtes identiques pour réduire le nombre d'appels d'embedding.
+    
+    Par défaut, seules les requêtes identiques après normalisation (casse, accents,
+    ponctuation) sont regroupées. Si `threshold` est fourni, les textes distincts
+    restants sont aussi comparés par similarité cosinus de leurs n-grammes de
+    caractères, calculée par blocs de produits matriciels ; ce regroupement approché
+    ne réunit jamais deux requêtes dont les nombres diffèrent ("chapitre 2" et
+    "chapitre 3" restent séparés). Chaque groupe est formé autour de sa première
+    requête (dans l'ordre d'entrée), qui sert de représentante.
     
     Args:
         queries (List[str]): Liste de requêtes.
-        threshold (float): Seuil de similarité.
+        threshold (Optional[float]): Seuil de similarité (de 0 à 1) pour rejoindre un
+            groupe, ou None pour le seul regroupement exact.
         
     Returns:
-        List[List[int]]: Groupes d'indices de requêtes similaires.
+        List[List[int]]: Groupes d'indices de requêtes similaires, la représentante en tête.
+    """
+    # Regroupement exact sur le texte normalisé
+    positions_by_text: Dict[str, List[int]] = {}
+    for index, query in enumerate(queries):
+        positions_by_text.setdefault(normalize_for_grouping(query), []).append(index)
+    texts = list(positions_by_text)
+    if threshold is None or len(texts) <= 1:
+        return list(positions_by_text.values())
+    
+    vectors = ngram_vectors(texts)
+    # Identifiant de la suite des nombres de chaque texte : seuls des textes de même suite peuvent être regroupés
+    number_keys: Dict[tuple, int] = {}
+    numbers_of = np.asarray(
+        [number_keys.setdefault(tuple(re.findall(r"\d+", text)), len(number_keys)) for text in texts],
+        dtype=np.int64
+    )
+    leader_of = np.full(len(texts), -1, dtype=np.int64)
+    
+    for block_start in range(0, len(texts), GROUPING_BLOCK_SIZE):
+        block = slice(block_start, min(block_start + GROUPING_BLOCK_SIZE, len(texts)))
+        # Similarités du bloc avec les textes suivants : (taille du bloc, nombre de textes)
+        similarities = vectors[block] @ vectors.T
+        for offset, text_index in enumerate(range(block.start, block.stop)):
+            if leader_of[text_index] >= 0:
+                continue
+            # Les textes précédents ont déjà tous un groupe : seuls les suivants peuvent rejoindre celui-ci
+            candidates = (similarities[offset] >= threshold) & (leader_of < 0) & (numbers_of == numbers_of[text_index])
+            members = np.flatnonzero(candidates)
+            leader_of[members] = text_index
+            leader_of[text_index] = text_index
+    
+    groups: Dict[int, List[int]] = {}
+    for text_index, leader in enumerate(leader_of):
+        groups.setdefault(int(leader), []).extend(positions_by_text[texts[text_index]])
+    return [sorted(group) for group in groups.values()]
+
+class TokenBucket:
+    """
+    Seau à jetons pour limiter le débit des appels (jetons par seconde, avec rafales).
     """
-    # Cette fonction est un placeholder pour une implémentation plus sophistiquée
-    # En pratique, nous pourrions utiliser une similarité de texte ou d'embedding
-    # Pour l'instant, chaque requête est dans son propre groupe
-    return [[i] for i in range(len(queries))]
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        """
+        Initialise un seau plein.
+        
+        Args:
+            rate (float): Jetons ajoutés par seconde.
+            capacity (Optional[float]): Nombre maximum de jetons accumulés (rate par défaut).
+        """
+        self.rate = rate
+        self.capacity = max(capacity if capacity is not None else rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Attend que les jetons soient disponibles puis les consomme.
+        
+        Args:
+            tokens (float): Nombre de jetons (borné par la capacité du seau).
+            
+        Returns:
+            float: Temps d'attente en secondes.
+        """
+        tokens = min(tokens, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                delay = (tokens - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
 
-# Batch processing pour les requêtes multiples
-def process_queries_in_batch(queries: List[str], batch_size: int = 10, processor_func=None) -> List[Any]:
+# Traitement concurrent des requêtes multiples
+def process_queries_in_batch(
+    queries: List[str],
+    batch_size: int = 10,
+    processor_func=None,
+    group_similar: bool = True,
+    similarity_threshold: Optional[float] = None,
+    max_in_flight: int = 4,
+    queries_per_second: Optional[float] = None,
+    stats: Optional[Dict[str, Any]] = None
+) -> List[Any]:
     """
-    Traite plusieurs requêtes par lots pour améliorer les performances.
+    Traite plusieurs requêtes par lots concurrents pour améliorer les performances.
+    
+    Les requêtes identiques après normalisation sont regroupées (group_similar_queries) : seule
+    la représentante de chaque groupe est traitée et une copie de son résultat est
+    donnée à chacune des autres requêtes du groupe. Au plus `max_in_flight` lots
+    sont traités en même temps, au rythme d'un seau à jetons de
+    `queries_per_second` requêtes par seconde. Un lot en échec est rejoué requête
+    par requête : une requête en échec reçoit {"query": ..., "error": ...} sans
+    empêcher les autres d'aboutir.
     
     Args:
         queries (List[str]): Liste de requêtes.
         batch_size (int): Taille de chaque lot.
-        processor_func: Fonction de traitement à appliquer à chaque lot.
+        processor_func: Fonction de traitement à appliquer à chaque lot (une liste de
+            requêtes en entrée, un résultat par requête en sortie).
+        group_similar (bool): Si True, ne traite qu'une requête par groupe de requêtes identiques.
+        similarity_threshold (Optional[float]): Seuil de similarité pour regrouper aussi les
+            requêtes quasi identiques (None, par défaut, pour le seul regroupement exact).
+        max_in_flight (int): Nombre maximum de lots traités simultanément.
+        queries_per_second (Optional[float]): Débit maximum (None pour ne pas limiter).
+        stats (Optional[Dict[str, Any]]): Si fourni, reçoit le bilan du traitement
+            (requêtes, requêtes traitées, erreurs, durée, débit).
         
     Returns:
-        List[Any]: Résultats pour toutes les requêtes.
+        List[Any]: Résultats pour toutes les requêtes, dans l'ordre des requêtes.
     """
     if not processor_func:
         logger.error("Aucune fonction de traitement fournie")
         return []
-        
-    results = []
-    for i in range(0, len(queries), batch_size):
-        batch = queries[i:i + batch_size]
-        logger.info(f"Traitement du lot {i//batch_size + 1}/{(len(queries) + batch_size - 1)//batch_size}")
-        
-        batch_results = processor_func(batch)
-        results.extend(batch_results)
-        
-        # Petite pause pour ne pas surcharger l'API
-        if i + batch_size < len(queries):
-            time.sleep(0.5)
     
-    return results
\ No newline at end of file
+    start_time = time.perf_counter()
+    if group_similar:
+        groups = group_similar_queries(queries, similarity_threshold)
+    else:
+        groups = [[index] for index in range(len(queries))]
+    representatives = [queries[group[0]] for group in groups]
+    if len(representatives) < len(queries):
+        logger.info(f"{len(queries)} requêtes regroupées en {len(representatives)} requêtes distinctes")
+    
+    bucket = TokenBucket(queries_per_second, capacity=max(queries_per_second, batch_size)) if queries_per_second else None
+    batches = [representatives[i:i + batch_size] for i in range(0, len(representatives), batch_size)]
+    
+    def run(batch: List[str]) -> List[Any]:
+        if bucket is not None:
+            bucket.acquire(len(batch))
+        batch_results = list(processor_func(batch))
+        if len(batch_results) != len(batch):
+            raise ValueError(f"{len(batch_results)} résultats pour un lot de {len(batch)} requêtes")
+        return batch_results
+    
+    def run_with_fallback(batch: List[str]) -> List[Any]:
+        try:
+            return run(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                logger.error(f"Erreur lors du traitement de la requête '{batch[0]}': {str(e)}")
+                return [{"query": batch[0], "error": str(e)}]
+            logger.warning(f"Échec d'un lot de {len(batch)} requêtes, nouvel essai requête par requête: {str(e)}")
+            return [run_with_fallback([query])[0] for query in batch]
+    
+    # Pool propre à l'appel : processor_func peut lui-même utiliser le pool de recherche partagé
+    with ThreadPoolExecutor(max_workers=max(1, max_in_flight), thread_name_prefix="batch") as executor:
+        representative_results = [result for batch_results in executor.map(run_with_fallback, batches) for result in batch_results]
+    
+    # Recopier le résultat de chaque représentante pour les requêtes de son groupe,
+    # une copie par requête : modifier un résultat ne modifie pas ceux du même groupe
+    results: List[Any] = [None] * len(queries)
+    for group, result in zip(groups, representative_results):
+        results[group[0]] = result
+        for index in group[1:]:
+            results[index] = copy.deepcopy(result)
+    
+    duration = time.perf_counter() - start_time
+    errors = sum(1 for result in representative_results if isinstance(result, dict) and "error" in result)
+    logger.info(
+        f"{len(queries)} requêtes traitées en {duration:.2f}s ({len(representatives)} traitements, "
+        f"{len(queries) / duration if duration > 0 else 0:.1f} requêtes/s, {errors} erreurs)"
+    )
+    if stats is not None:
+        stats.update({
+            "queries": len(queries),
+            "processed": len(representatives),
+            "errors": errors,
+            "duration": duration,
+            "queries_per_second": len(queries) / duration if duration > 0 else 0.0
+        })
+    
+    return results
@@ -1,14 +1,86 @@
 # src/search/search_service.py
+import os
+import time
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from typing import List, Dict, Any, Optional, Tuple, Callable
+import numpy as np
 from src.embeddings.embedding_generator import get_embedding_generator
-from src.embeddings.embedding_storage import get_embedding_storage
+from src.embeddings.embedding_storage import get_embedding_storage, FETCH_CHUNK_SIZE
 from src.storage.supabase_client import get_supabase_client
+from src.search.vector_index import get_active_index, get_search_backend
+from src.search.lexical_index import get_lexical_index
+from src.search.fusion import reciprocal_rank_fusion, max_fusion_score
+from src.search.course_cache import get_course_cache
+from src.search.diversification import mmr_select
+from src.search.result_cache import get_result_cache
+from src.search.reranker import get_reranker, RERANK_CANDIDATES
 
 # Configuration du logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Pool partagé pour exécuter en parallèle les travaux indépendants d'une recherche
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("SEARCH_WORKERS", "8")), thread_name_prefix="search")
+
+# Pool dédié au reranking : un reranker hors budget n'occupe pas les threads de recherche
+RERANK_WORKERS = 2
+_rerank_executor = ThreadPoolExecutor(max_workers=RERANK_WORKERS, thread_name_prefix="rerank")
+
+# Un reranking hors budget continue de tourner : on n'en soumet pas de nouveau tant que
+# tous les workers sont occupés, pour que la file du pool ne grossisse pas sous charge
+_rerank_slots = threading.BoundedSemaphore(RERANK_WORKERS)
+
+# En recherche hybride, chaque branche fournit top_k * HYBRID_CANDIDATE_FACTOR candidats à la fusion
+HYBRID_CANDIDATE_FACTOR = 3
+
+# Avec la diversification MMR, top_k * MMR_CANDIDATE_FACTOR candidats sont classés avant sélection
+MMR_CANDIDATE_FACTOR = 4
+
+# Scores recopiés des résultats de recherche vers les détails des pages
+SCORE_FIELDS = ("similarity", "vector_similarity", "lexical_score", "retrieval_similarity", "rerank_score")
+
+# Variante filtrée de match_page_embeddings, appelée lorsqu'un filtre de cours est demandé :
+#
+#   CREATE OR REPLACE FUNCTION match_page_embeddings_filtered(
+#     query_embedding vector(1536),
+#     match_threshold float,
+#     match_count int,
+#     filter_course_ids bigint[]
+#   )
+#   RETURNS TABLE (id bigint, page_id bigint, similarity float)
+#   LANGUAGE plpgsql
+#   AS $$
+#   BEGIN
+#     RETURN QUERY
+#     SELECT pe.id, pe.page_id, 1 - (pe.embedding <=> query_embedding) AS similarity
+#     FROM page_embeddings pe
+#     JOIN pages p ON p.id = pe.page_id
+#     WHERE p.course_id = ANY(filter_course_ids)
+#       AND 1 - (pe.embedding <=> query_embedding) > match_threshold
+#     ORDER BY similarity DESC
+#     LIMIT match_count;
+#   END;
+#   $$;
+MATCH_FILTERED_FUNCTION = "match_page_embeddings_filtered"
+
+
+def get_search_executor() -> ThreadPoolExecutor:
+    """
+    Retourne le pool de threads partagé par les services de recherche.
+    """
+    return _executor
+
+
+def record_timing(timings: Optional[Dict[str, float]], stage: str, start_time: float) -> None:
+    """
+    Enregistre la durée d'une étape (en secondes) si un dictionnaire de timings est fourni.
+    """
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - start_time
+
+
 class SearchService:
     """
     Service de recherche basé sur les embeddings pour trouver les contenus les plus pertinents.
@@ -21,38 +93,537 @@ class SearchService:
         self.embedding_generator = get_embedding_generator()
         self.embedding_storage = get_embedding_storage()
         self.supabase = get_supabase_client()
-        logger.info("Service de recherche initialisé")
+        self.backend = get_search_backend()
+        self.vector_index = get_active_index()
+        
+        # Poids de chaque branche dans la fusion par rang réciproque. La recherche hybride
+        # est désactivée par défaut (SEARCH_LEXICAL_WEIGHT=0) : activée, elle remplace le
+        # cosinus de similarity par le score fusionné et charge l'index BM25 des pages
+        self.vector_weight = float(os.getenv("SEARCH_VECTOR_WEIGHT", "1.0"))
+        self.lexical_weight = float(os.getenv("SEARCH_LEXICAL_WEIGHT", "0"))
+        self.lexical_index = get_lexical_index() if self.lexical_weight > 0 else None
+        
+        # Compromis pertinence/diversité de la MMR, désactivée par défaut (1.0) : activée,
+        # elle lit les embeddings de MMR_CANDIDATE_FACTOR fois plus de candidats
+        self.mmr_lambda = float(os.getenv("SEARCH_MMR_LAMBDA", "1.0"))
+        
+        # Second étage optionnel (SEARCH_RERANKER), combiné au score de première passe
+        # avec le poids SEARCH_RERANK_WEIGHT et abandonné au-delà de SEARCH_RERANK_BUDGET_MS
+        self.reranker = get_reranker()
+        self.rerank_weight = float(os.getenv("SEARCH_RERANK_WEIGHT", "0.5"))
+        self.rerank_budget = float(os.getenv("SEARCH_RERANK_BUDGET_MS", "50")) / 1000
+        
+        # Résultats des recherches textuelles, périmés à chaque écriture d'embeddings
+        self.result_cache = get_result_cache()
+        
+        logger.info(
+            f"Service de recherche initialisé (backend: {self.backend}, "
+            f"hybride: {'oui' if self.lexical_index is not None else 'non'}, "
+            f"reranker: {self.reranker.name if self.reranker is not None else 'aucun'})"
+        )
     
-    def search(self, query: str, top_k: int = 5, threshold: float = 0.5) -> List[Dict[str, Any]]:
+    def search(
+        self,
+        query: str,
+        top_k: int = 5,
+        threshold: float = 0.5,
+        prefetch: Optional[List[Callable[[], Any]]] = None,
+        timings: Optional[Dict[str, float]] = None,
+        course_ids: Optional[List[int]] = None,
+        year: Optional[str] = None,
+        mmr_lambda: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
         """
         Effectue une recherche sémantique basée sur une requête textuelle.
         
+        Les tâches de `prefetch` (par exemple le préchargement des métadonnées de cours)
+        sont lancées en parallèle de l'appel d'embedding, qui est l'étape la plus lente.
+        En recherche hybride (SEARCH_LEXICAL_WEIGHT > 0), la recherche lexicale BM25
+        l'est aussi et les deux classements sont fusionnés par rang réciproque ; la
+        similarité des résultats est alors le score fusionné normalisé entre 0 et 1 et
+        le cosinus est conservé dans vector_similarity. Le seuil ne s'applique qu'à la
+        branche vectorielle : une page trouvée par la seule recherche lexicale est
+        conservée quel que soit son cosinus. Une recherche identique déjà effectuée sur
+        la même version du corpus est servie depuis le cache des résultats.
+        
         Args:
             query (str): Requête textuelle.
             top_k (int): Nombre maximum de résultats à retourner.
-            threshold (float): Seuil de similarité minimum (de 0 à 1).
+            threshold (float): Seuil de similarité minimum (de 0 à 1) de la branche vectorielle
+                (non appliqué aux pages trouvées par la seule branche lexicale).
+            prefetch (Optional[List[Callable]]): Tâches indépendantes à exécuter en parallèle.
+            timings (Optional[Dict[str, float]]): Si fourni, reçoit la durée de chaque étape.
+            course_ids (Optional[List[int]]): Limite la recherche à ces cours.
+            year (Optional[str]): Limite la recherche aux cours de cette année (ING1, ING2, ING3).
+            mmr_lambda (Optional[float]): Compromis pertinence/diversité (SEARCH_MMR_LAMBDA par défaut).
             
         Returns:
             List[Dict[str, Any]]: Liste des résultats pertinents avec leurs métadonnées.
         """
+        start_time = time.perf_counter()
+        prefetch_futures = [_executor.submit(task) for task in prefetch or []]
+        
+        course_filter = self._resolve_course_filter(course_ids, year)
+        if course_filter is not None and not course_filter:
+            logger.warning(f"Aucun cours ne correspond au filtre (cours: {course_ids}, année: {year})")
+            return []
+        
         try:
+            step_start = time.perf_counter()
+            cache_key = self._cache_key(query, top_k, threshold, course_filter, mmr_lambda)
+            cached = self.result_cache.get(cache_key)
+            record_timing(timings, "result_cache", step_start)
+            if cached is not None:
+                logger.info(f"Résultats servis depuis le cache pour la requête: {query}")
+                return cached
+            corpus_version = self.result_cache.version
+            
+            pool_size = self._pool_size(top_k, mmr_lambda)
+            candidate_count = pool_size
+            lexical_future = None
+            if self.lexical_index is not None:
+                candidate_count = pool_size * HYBRID_CANDIDATE_FACTOR
+                lexical_future = _executor.submit(self._lexical_search, query, candidate_count, course_filter)
+            
             # Générer l'embedding pour la requête
+            step_start = time.perf_counter()
             query_embedding = self.embedding_generator.generate_query_embedding(query)
+            record_timing(timings, "embedding", step_start)
             
-            if not query_embedding:
+            vector_matches = []
+            if query_embedding:
+                # Rechercher les pages similaires
+                step_start = time.perf_counter()
+                vector_matches = self._match_embeddings(query_embedding, candidate_count, threshold, course_filter)
+                record_timing(timings, "vector_search", step_start)
+            else:
                 logger.error("Impossible de générer l'embedding pour la requête")
-                return []
             
-            # Rechercher les pages similaires
-            similar_pages = self.search_with_embedding(query_embedding, top_k, threshold)
+            lexical_matches = []
+            if lexical_future is not None:
+                step_start = time.perf_counter()
+                lexical_matches = lexical_future.result()
+                record_timing(timings, "lexical_wait", step_start)
+            
+            matches = self._fuse(vector_matches, lexical_matches, pool_size)
+            if not matches:
+                logger.warning("Aucune page similaire trouvée")
+                return []
             
-            return similar_pages
+            matches = self._rerank(query, query_embedding, matches, timings)
+            matches = self._diversify(query_embedding, matches, top_k, mmr_lambda, timings)
+            results = self._with_page_details(matches, timings)
+            self.result_cache.put(cache_key, results, corpus_version)
+            return results
             
         except Exception as e:
             logger.error(f"Erreur lors de la recherche: {str(e)}")
             return []
+        finally:
+            # Attendre la fin des préchargements (déjà recouverts par l'embedding en général)
+            step_start = time.perf_counter()
+            for future in prefetch_futures:
+                try:
+                    future.result()
+                except Exception as e:
+                    logger.warning(f"Échec d'une tâche de préchargement: {str(e)}")
+            record_timing(timings, "prefetch_wait", step_start)
+            record_timing(timings, "search_total", start_time)
+    
+    def search_many(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        threshold: float = 0.5,
+        timings: Optional[Dict[str, float]] = None,
+        course_ids: Optional[List[int]] = None,
+        year: Optional[str] = None,
+        mmr_lambda: Optional[float] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Effectue plusieurs recherches en un lot (évaluation, préchargement).
+        
+        Les embeddings des requêtes sont générés en parallèle ; avec l'index exact en
+        mémoire, toutes les requêtes sont classées en un seul produit matriciel, sinon
+        les recherches vectorielles sont lancées en parallèle. Les détails des pages de
+        tous les résultats sont récupérés en une requête. Les requêtes déjà en cache
+        ou répétées dans le lot ne sont cherchées qu'une fois.
+        
+        Args:
+            queries (List[str]): Requêtes textuelles.
+            top_k (int): Nombre maximum de résultats par requête.
+            threshold (float): Seuil de similarité minimum (de 0 à 1) de la branche vectorielle
+                (non appliqué aux pages trouvées par la seule branche lexicale).
+            timings (Optional[Dict[str, float]]): Si fourni, reçoit la durée de chaque étape du lot.
+            course_ids (Optional[List[int]]): Limite la recherche à ces cours.
+            year (Optional[str]): Limite la recherche aux cours de cette année (ING1, ING2, ING3).
+            mmr_lambda (Optional[float]): Compromis pertinence/diversité (SEARCH_MMR_LAMBDA par défaut).
+            
+        Returns:
+            List[List[Dict[str, Any]]]: Résultats de chaque requête, dans l'ordre des requêtes.
+        """
+        start_time = time.perf_counter()
+        empty = [[] for _ in queries]
+        
+        course_filter = self._resolve_course_filter(course_ids, year)
+        if not queries or (course_filter is not None and not course_filter):
+            return empty
+        
+        try:
+            # Servir depuis le cache les requêtes déjà traitées ; une requête répétée dans le lot n'est cherchée qu'une fois
+            step_start = time.perf_counter()
+            results = list(empty)
+            pending: Dict[Any, List[int]] = {}
+            for position, query in enumerate(queries):
+                cache_key = self._cache_key(query, top_k, threshold, course_filter, mmr_lambda)
+                if cache_key in pending:
+                    pending[cache_key].append(position)
+                    continue
+                cached = self.result_cache.get(cache_key)
+                if cached is not None:
+                    results[position] = cached
+                else:
+                    pending[cache_key] = [position]
+            record_timing(timings, "result_cache", step_start)
+            if not pending:
+                return results
+            corpus_version = self.result_cache.version
+            pending_queries = [queries[positions[0]] for positions in pending.values()]
+            
+            pool_size = self._pool_size(top_k, mmr_lambda)
+            candidate_count = pool_size
+            lexical_futures = []
+            if self.lexical_index is not None:
+                candidate_count = pool_size * HYBRID_CANDIDATE_FACTOR
+                lexical_futures = [
+                    _executor.submit(self._lexical_search, query, candidate_count, course_filter)
+                    for query in pending_queries
+                ]
+            
+            # Générer les embeddings des requêtes en parallèle
+            step_start = time.perf_counter()
+            query_embeddings = list(_executor.map(self.embedding_generator.generate_query_embedding, pending_queries))
+            record_timing(timings, "embedding", step_start)
+            
+            step_start = time.perf_counter()
+            vector_matches = self._match_many(query_embeddings, candidate_count, threshold, course_filter)
+            record_timing(timings, "vector_search", step_start)
+            
+            step_start = time.perf_counter()
+            lexical_matches = [future.result() for future in lexical_futures] or [[] for _ in pending_queries]
+            record_timing(timings, "lexical_wait", step_start)
+            
+            all_matches = [
+                self._diversify(
+                    query_embedding,
+                    self._rerank(query, query_embedding, self._fuse(vectors, lexical, pool_size), timings),
+                    top_k,
+                    mmr_lambda,
+                    timings
+                )
+                for query, query_embedding, vectors, lexical in zip(
+                    pending_queries, query_embeddings, vector_matches, lexical_matches
+                )
+            ]
+            
+            # Détails de toutes les pages du lot en une seule requête
+            step_start = time.perf_counter()
+            pages_by_id = self._get_pages_details([match['page_id'] for matches in all_matches for match in matches])
+            record_timing(timings, "page_details", step_start)
+            
+            for (cache_key, positions), matches in zip(pending.items(), all_matches):
+                query_results = self._with_page_details(matches, pages_by_id=pages_by_id)
+                self.result_cache.put(cache_key, query_results, corpus_version)
+                for position in positions:
+                    results[position] = [dict(result) for result in query_results]
+            
+            logger.info(
+                f"Lot de {len(queries)} recherches terminé en {time.perf_counter() - start_time:.2f}s "
+                f"({len(queries) - len(pending_queries)} servies sans nouvelle recherche)"
+            )
+            return results
+            
+        except Exception as e:
+            logger.error(f"Erreur lors de la recherche par lot: {str(e)}")
+            return empty
+        finally:
+            record_timing(timings, "search_total", start_time)
+    
+    def _match_many(
+        self,
+        query_embeddings: List[Optional[List[float]]],
+        top_k: int,
+        threshold: float,
+        course_ids: Optional[List[int]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Recherche vectorielle de plusieurs requêtes (liste vide pour un embedding manquant).
+        """
+        valid = [index for index, embedding in enumerate(query_embeddings) if embedding]
+        results = [[] for _ in query_embeddings]
+        if len(valid) < len(query_embeddings):
+            logger.error(f"Impossible de générer l'embedding de {len(query_embeddings) - len(valid)} requêtes")
+        if not valid:
+            return results
+        
+        if self.vector_index is not None and hasattr(self.vector_index, "search_many"):
+            # Index exact : un seul produit matriciel pour tout le lot
+            self.vector_index.ensure_fresh()
+            matches = self.vector_index.search_many(
+                [query_embeddings[index] for index in valid], top_k, threshold, course_ids=course_ids
+            )
+        else:
+            matches = list(_executor.map(
+                lambda index: self._match_embeddings(query_embeddings[index], top_k, threshold, course_ids),
+                valid
+            ))
+        
+        for index, query_matches in zip(valid, matches):
+            results[index] = query_matches
+        return results
+    
+    def _cache_key(
+        self,
+        query: str,
+        top_k: int,
+        threshold: float,
+        course_filter: Optional[List[int]],
+        mmr_lambda: Optional[float]
+    ):
+        """
+        Clé du cache des résultats : requête normalisée et paramètres effectifs de la recherche.
+        """
+        return self.result_cache.make_key(
+            query,
+            top_k=top_k,
+            threshold=threshold,
+            course_ids=None if course_filter is None else tuple(sorted(course_filter)),
+            mmr_lambda=self.mmr_lambda if mmr_lambda is None else mmr_lambda,
+            reranker=self.reranker.name if self.reranker is not None else None
+        )
+    
+    def _pool_size(self, top_k: int, mmr_lambda: Optional[float]) -> int:
+        """
+        Nombre de candidats à classer avant la sélection finale (sur-échantillonnage pour la MMR).
+        """
+        lambda_mult = self.mmr_lambda if mmr_lambda is None else mmr_lambda
+        pool_size = top_k * MMR_CANDIDATE_FACTOR if lambda_mult < 1.0 else top_k
+        if self.reranker is not None:
+            pool_size = max(pool_size, RERANK_CANDIDATES)
+        return pool_size
+    
+    def _rerank(
+        self,
+        query: Optional[str],
+        query_embedding: Optional[List[float]],
+        matches: List[Dict[str, Any]],
+        timings: Optional[Dict[str, float]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Rescore les RERANK_CANDIDATES meilleurs candidats avec le reranker configuré.
+        
+        Le score final est (1 - SEARCH_RERANK_WEIGHT) * score de première passe
+        + SEARCH_RERANK_WEIGHT * score du reranker ; le score de première passe est
+        conservé dans retrieval_similarity. Si le reranker dépasse son budget de
+        latence ou échoue, ou si les RERANK_WORKERS workers sont encore occupés par
+        des rerankings précédents, l'ordre de première passe est conservé.
+        
+        Args:
+            query (Optional[str]): Requête textuelle (None pour une recherche par embedding).
+            query_embedding (Optional[List[float]]): Embedding de la requête.
+            matches (List[Dict[str, Any]]): Candidats classés (page_id, scores).
+            timings (Optional[Dict[str, float]]): Si fourni, reçoit la durée de l'étape.
+            
+        Returns:
+            List[Dict[str, Any]]: Candidats reclassés.
+        """
+        if self.reranker is None or len(matches) <= 1:
+            return matches
+        
+        if not _rerank_slots.acquire(blocking=False):
+            logger.warning(f"Reranking {self.reranker.name} ignoré: rerankings précédents encore en cours")
+            return matches
+        
+        step_start = time.perf_counter()
+        head, tail = matches[:RERANK_CANDIDATES], matches[RERANK_CANDIDATES:]
+        try:
+            try:
+                future = _rerank_executor.submit(self.reranker.score, query, query_embedding, head)
+            except Exception:
+                _rerank_slots.release()
+                raise
+            # Le slot est libéré à la fin du calcul, même s'il se termine après le budget
+            future.add_done_callback(lambda _: _rerank_slots.release())
+            scores = np.asarray(future.result(timeout=self.rerank_budget), dtype=np.float32)
+        except FuturesTimeoutError:
+            logger.warning(
+                f"Reranking {self.reranker.name} ignoré: budget de {self.rerank_budget * 1000:.0f} ms dépassé"
+            )
+            return matches
+        except Exception as e:
+            logger.error(f"Erreur lors du reranking {self.reranker.name}: {str(e)}")
+            return matches
+        finally:
+            record_timing(timings, "rerank", step_start)
+        
+        first_stage = np.asarray([match.get('similarity') or 0.0 for match in head], dtype=np.float32)
+        known = ~np.isnan(scores)
+        combined = first_stage.copy()
+        combined[known] = (1.0 - self.rerank_weight) * first_stage[known] + self.rerank_weight * scores[known]
+        
+        reranked = [
+            {
+                **match,
+                "similarity": float(combined[index]),
+                "retrieval_similarity": match.get('similarity'),
+                "rerank_score": float(scores[index]) if known[index] else None
+            }
+            for index, match in enumerate(head)
+        ]
+        return [reranked[index] for index in np.argsort(-combined, kind="stable")] + tail
+    
+    def _diversify(
+        self,
+        query_embedding: Optional[List[float]],
+        matches: List[Dict[str, Any]],
+        top_k: int,
+        mmr_lambda: Optional[float] = None,
+        timings: Optional[Dict[str, float]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Sélectionne top_k résultats parmi les candidats par pertinence marginale maximale.
+        
+        La pertinence est le score de classement des candidats (similarity : cosinus,
+        score fusionné ou score reclassé) : une page trouvée par la seule recherche
+        lexicale n'est pas écartée pour son faible cosinus. Les embeddings des
+        candidats, qui ne servent qu'à mesurer la redondance, sont lus dans l'index en
+        processus, sinon en une requête groupée sur page_embeddings. Les candidats sans
+        embedding complètent la sélection s'il reste de la place.
+        
+        Args:
+            query_embedding (Optional[List[float]]): Embedding de la requête.
+            matches (List[Dict[str, Any]]): Candidats classés (page_id, scores).
+            top_k (int): Nombre de résultats à retenir.
+            mmr_lambda (Optional[float]): Compromis pertinence/diversité (SEARCH_MMR_LAMBDA par défaut).
+            timings (Optional[Dict[str, float]]): Si fourni, reçoit la durée de l'étape.
+            
+        Returns:
+            List[Dict[str, Any]]: Résultats retenus, dans l'ordre de sélection.
+        """
+        lambda_mult = self.mmr_lambda if mmr_lambda is None else mmr_lambda
+        if lambda_mult >= 1.0 or not query_embedding or len(matches) <= 1:
+            return matches[:top_k]
+        
+        step_start = time.perf_counter()
+        try:
+            page_ids = [match['page_id'] for match in matches]
+            if self.vector_index is not None and hasattr(self.vector_index, "get_vectors"):
+                vectors, found = self.vector_index.get_vectors(page_ids)
+            else:
+                vectors, found = self.embedding_storage.get_page_embeddings(page_ids)
+            
+            with_vectors = [match for match, has_vector in zip(matches, found) if has_vector]
+            without_vectors = [match for match, has_vector in zip(matches, found) if not has_vector]
+            
+            # Pertinence = score de classement (fusion ou reranking), pas le cosinus recalculé
+            relevance = np.asarray([match.get('similarity') or 0.0 for match in with_vectors], dtype=np.float32)
+            
+            selected = mmr_select(query_embedding, vectors[found], top_k, lambda_mult, relevance)
+            return ([with_vectors[index] for index in selected] + without_vectors)[:top_k]
+            
+        except Exception as e:
+            logger.error(f"Erreur lors de la diversification MMR: {str(e)}")
+            return matches[:top_k]
+        finally:
+            record_timing(timings, "mmr", step_start)
+    
+    def _resolve_course_filter(self, course_ids: Optional[List[int]], year: Optional[str]) -> Optional[List[int]]:
+        """
+        Convertit les filtres de cours et d'année en une liste de cours autorisés.
+        
+        Args:
+            course_ids (Optional[List[int]]): Cours demandés.
+            year (Optional[str]): Année demandée (ING1, ING2, ING3).
+            
+        Returns:
+            Optional[List[int]]: Cours autorisés (intersection des deux filtres),
+                ou None si aucun filtre n'est demandé.
+        """
+        if course_ids is None and not year:
+            return None
+        
+        allowed = list(dict.fromkeys(course_ids)) if course_ids is not None else None
+        if year:
+            year_courses = {course["id"] for course in get_course_cache().list_courses(year)}
+            allowed = [course_id for course_id in allowed if course_id in year_courses] if allowed is not None else sorted(year_courses)
+        
+        return allowed
+    
+    def _lexical_search(self, query: str, top_k: int, course_ids: Optional[List[int]] = None) -> List[Dict[str, Any]]:
+        """
+        Branche lexicale de la recherche hybride (BM25 sur content_text).
+        
+        Returns:
+            List[Dict[str, Any]]: Résultats (page_id, score), vides en cas d'erreur.
+        """
+        try:
+            self.lexical_index.ensure_fresh()
+            return self.lexical_index.search(query, top_k, course_ids=course_ids)
+        except Exception as e:
+            logger.error(f"Erreur lors de la recherche lexicale: {str(e)}")
+            return []
     
-    def search_with_embedding(self, query_embedding: List[float], top_k: int = 5, threshold: float = 0.5) -> List[Dict[str, Any]]:
+    def _fuse(self, vector_matches: List[Dict[str, Any]], lexical_matches: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+        """
+        Fusionne les branches vectorielle et lexicale par rang réciproque pondéré.
+        
+        En mode hybride, similarity est toujours le score fusionné normalisé entre 0
+        et 1, même si la branche lexicale n'a rien trouvé : les scores restent
+        comparables d'une requête à l'autre. Le cosinus est conservé dans
+        vector_similarity. Sans branche lexicale, similarity est le cosinus.
+        
+        Args:
+            vector_matches (List[Dict[str, Any]]): Résultats (page_id, similarity) de la branche vectorielle.
+            lexical_matches (List[Dict[str, Any]]): Résultats (page_id, score) de la branche lexicale.
+            top_k (int): Nombre maximum de résultats à retourner.
+            
+        Returns:
+            List[Dict[str, Any]]: Résultats (page_id, similarity) par score fusionné décroissant,
+                avec vector_similarity et lexical_score pour chaque branche qui a trouvé la page.
+        """
+        if self.lexical_index is None:
+            return vector_matches[:top_k]
+        
+        weights = [self.vector_weight, self.lexical_weight]
+        fused = reciprocal_rank_fusion(
+            [[match['page_id'] for match in vector_matches], [match['page_id'] for match in lexical_matches]],
+            weights
+        )
+        max_score = max_fusion_score(weights)
+        
+        vector_similarities = {match['page_id']: match.get('similarity') for match in vector_matches}
+        lexical_scores = {match['page_id']: match.get('score') for match in lexical_matches}
+        
+        return [
+            {
+                "page_id": page_id,
+                "similarity": score / max_score,
+                "vector_similarity": vector_similarities.get(page_id),
+                "lexical_score": lexical_scores.get(page_id)
+            }
+            for page_id, score in fused[:top_k]
+        ]
+    
+    def search_with_embedding(
+        self,
+        query_embedding: List[float],
+        top_k: int = 5,
+        threshold: float = 0.5,
+        timings: Optional[Dict[str, float]] = None,
+        course_ids: Optional[List[int]] = None,
+        year: Optional[str] = None,
+        mmr_lambda: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
         """
         Effectue une recherche sémantique basée sur un embedding.
         
@@ -60,53 +631,134 @@ class SearchService:
             query_embedding (List[float]): Embedding de la requête.
             top_k (int): Nombre maximum de résultats à retourner.
             threshold (float): Seuil de similarité minimum (de 0 à 1).
+            timings (Optional[Dict[str, float]]): Si fourni, reçoit la durée de chaque étape.
+            course_ids (Optional[List[int]]): Limite la recherche à ces cours.
+            year (Optional[str]): Limite la recherche aux cours de cette année (ING1, ING2, ING3).
+            mmr_lambda (Optional[float]): Compromis pertinence/diversité (SEARCH_MMR_LAMBDA par défaut).
             
         Returns:
             List[Dict[str, Any]]: Liste des résultats pertinents avec leurs métadonnées.
         """
         try:
-            # Rechercher les pages similaires via la fonction RPC
-            similar_embeddings = self.supabase.rpc(
-                "match_page_embeddings",
-                {
-                    "query_embedding": query_embedding,
-                    "match_threshold": threshold,
-                    "match_count": top_k
-                }
-            ).execute()
-            
-            if not similar_embeddings.data:
-                logger.warning("Aucune page similaire trouvée")
+            course_filter = self._resolve_course_filter(course_ids, year)
+            if course_filter is not None and not course_filter:
+                logger.warning(f"Aucun cours ne correspond au filtre (cours: {course_ids}, année: {year})")
                 return []
             
-            # Récupérer les informations détaillées des pages
-            detailed_results = []
-            
-            for result in similar_embeddings.data:
-                page_id = result.get('page_id')
-                similarity = result.get('similarity')
-                
-                if not page_id:
-                    continue
-                
-                # Récupérer les détails de la page
-                page_details = self._get_page_details(page_id)
-                
-                if page_details:
-                    # Ajouter le score de similarité
-                    page_details['similarity'] = similarity
-                    detailed_results.append(page_details)
+            # Rechercher les pages similaires
+            step_start = time.perf_counter()
+            similar_embeddings = self._match_embeddings(query_embedding, self._pool_size(top_k, mmr_lambda), threshold, course_filter)
+            record_timing(timings, "vector_search", step_start)
             
-            # Trier par similarité décroissante
-            detailed_results.sort(key=lambda x: x.get('similarity', 0), reverse=True)
+            if not similar_embeddings:
+                logger.warning("Aucune page similaire trouvée")
+                return []
             
-            logger.info(f"Recherche terminée avec {len(detailed_results)} résultats pertinents")
-            return detailed_results
+            similar_embeddings = self._rerank(None, query_embedding, similar_embeddings, timings)
+            similar_embeddings = self._diversify(query_embedding, similar_embeddings, top_k, mmr_lambda, timings)
+            return self._with_page_details(similar_embeddings, timings)
             
         except Exception as e:
             logger.error(f"Erreur lors de la recherche avec embedding: {str(e)}")
             return []
     
+    def _with_page_details(
+        self,
+        matches: List[Dict[str, Any]],
+        timings: Optional[Dict[str, float]] = None,
+        pages_by_id: Optional[Dict[int, Dict[str, Any]]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Complète les résultats (page_id, scores) avec les détails des pages, en une requête.
+        
+        Args:
+            matches (List[Dict[str, Any]]): Résultats classés de la recherche.
+            timings (Optional[Dict[str, float]]): Si fourni, reçoit la durée de l'étape.
+            pages_by_id (Optional[Dict[int, Dict[str, Any]]]): Détails déjà récupérés
+                (recherche par lot) ; sinon ils sont lus depuis Supabase.
+            
+        Returns:
+            List[Dict[str, Any]]: Détails des pages avec leurs scores, dans l'ordre de `matches`
+                (celui de la sélection MMR le cas échéant).
+        """
+        step_start = time.perf_counter()
+        detailed_results = []
+        
+        if pages_by_id is None:
+            # Récupérer les détails de toutes les pages en une seule requête
+            page_ids = [match.get('page_id') for match in matches if match.get('page_id')]
+            pages_by_id = self._get_pages_details(page_ids)
+        
+        # Conserver l'ordre du classement
+        for match in matches:
+            page_details = pages_by_id.get(match.get('page_id'))
+            
+            if page_details:
+                # Ajouter les scores (copie : une page peut apparaître deux fois)
+                page_details = dict(page_details)
+                for key in SCORE_FIELDS:
+                    if key in match:
+                        page_details[key] = match[key]
+                detailed_results.append(page_details)
+        
+        record_timing(timings, "page_details", step_start)
+        
+        logger.info(f"Recherche terminée avec {len(detailed_results)} résultats pertinents")
+        return detailed_results
+    
+    def _match_embeddings(
+        self,
+        query_embedding: List[float],
+        top_k: int,
+        threshold: float,
+        course_ids: Optional[List[int]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Recherche les embeddings les plus proches via le backend configuré.
+        
+        Le filtre de cours est appliqué pendant le parcours (masque de l'index en
+        processus ou clause WHERE de la fonction RPC), pas après coup : le top-k
+        reste complet.
+        
+        Args:
+            query_embedding (List[float]): Embedding de la requête.
+            top_k (int): Nombre maximum de résultats à retourner.
+            threshold (float): Seuil de similarité minimum (de 0 à 1).
+            course_ids (Optional[List[int]]): Cours autorisés (None pour tout le corpus).
+            
+        Returns:
+            List[Dict[str, Any]]: Résultats (page_id, similarity) par similarité décroissante.
+        """
+        if self.vector_index is not None:
+            # Index en processus : produit matriciel local, sans aller-retour réseau
+            self.vector_index.ensure_fresh()
+            return self.vector_index.search(query_embedding, top_k, threshold, course_ids=course_ids)
+        
+        if course_ids is not None:
+            rpc_response = self.supabase.rpc(
+                MATCH_FILTERED_FUNCTION,
+                {
+                    "query_embedding": query_embedding,
+                    "match_threshold": threshold,
+                    "match_count": top_k,
+                    "filter_course_ids": course_ids
+                }
+            ).execute()
+            
+            return rpc_response.data or []
+        
+        # Rechercher les pages similaires via la fonction RPC
+        rpc_response = self.supabase.rpc(
+            "match_page_embeddings",
+            {
+                "query_embedding": query_embedding,
+                "match_threshold": threshold,
+                "match_count": top_k
+            }
+        ).execute()
+        
+        return rpc_response.data or []
+    
     def _get_page_details(self, page_id: int) -> Optional[Dict[str, Any]]:
         """
         Récupère les détails d'une page à partir de son ID.
@@ -117,21 +769,45 @@ class SearchService:
         Returns:
             Optional[Dict[str, Any]]: Détails de la page ou None si non trouvée.
         """
+        page_details = self._get_pages_details([page_id]).get(page_id)
+        if not page_details:
+            logger.warning(f"Page non trouvée avec l'ID: {page_id}")
+        return page_details
+    
+    def _get_pages_details(self, page_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        """
+        Récupère les détails de plusieurs pages avec leur cours, par filtres `in` de
+        FETCH_CHUNK_SIZE IDs (une seule requête pour les résultats d'une recherche).
+        
+        Args:
+            page_ids (List[int]): IDs des pages dans Supabase.
+            
+        Returns:
+            Dict[int, Dict[str, Any]]: Détails des pages trouvées, indexés par ID.
+        """
+        if not page_ids:
+            return {}
+        
         try:
-            # Récupérer les détails de la page avec une jointure sur le cours
-            page_result = self.supabase.from_("pages").select(
-                "id, page_number, image_path, content_text, courses(id, name, year)"
-            ).eq("id", page_id).execute()
+            unique_ids = list(dict.fromkeys(page_ids))
+            pages_by_id = {}
+            for i in range(0, len(unique_ids), FETCH_CHUNK_SIZE):
+                # Récupérer les détails des pages avec une jointure sur le cours
+                pages_result = self.supabase.from_("pages").select(
+                    "id, page_number, image_path, content_text, course_id, courses(id, name, year)"
+                ).in_("id", unique_ids[i:i + FETCH_CHUNK_SIZE]).execute()
+                
+                pages_by_id.update({page['id']: page for page in pages_result.data or []})
             
-            if page_result.data and len(page_result.data) > 0:
-                return page_result.data[0]
-            else:
-                logger.warning(f"Page non trouvée avec l'ID: {page_id}")
-                return None
+            missing = [page_id for page_id in page_ids if page_id not in pages_by_id]
+            if missing:
+                logger.warning(f"Pages non trouvées avec les IDs: {missing}")
+            
+            return pages_by_id
                 
         except Exception as e:
-            logger.error(f"Erreur lors de la récupération des détails de la page {page_id}: {str(e)}")
-            return None
+            logger.error(f"Erreur lors de la récupération des détails des pages {page_ids}: {str(e)}")
+            return {}
 
 # Fonction pour obtenir une instance du service de recherche
 def get_search_service() -> SearchService:
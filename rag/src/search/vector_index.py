@@ -0,0 +1,500 @@
+# src/search/vector_index.py
+import os
+import time
+import logging
+import threading
+from typing import List, Dict, Any, Optional, Tuple, Union
+import numpy as np
+from src.embeddings.embedding_snapshot import read_snapshot, get_snapshot_path
+from src.embeddings.embedding_quantization import QuantizedEmbeddingMatrix
+
+# Configuration du logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Backends de recherche vectorielle disponibles
+RPC_BACKEND = "rpc"
+MEMORY_BACKEND = "memory"
+ANN_BACKEND = "ann"
+
+# Avec une première passe réduite, top_k * FIRST_PASS_RESCORE_FACTOR candidats sont rescorés en float32
+FIRST_PASS_RESCORE_FACTOR = 4
+
+
+def get_search_backend() -> str:
+    """
+    Retourne le backend de recherche vectorielle configuré (VECTOR_SEARCH_BACKEND).
+
+    Returns:
+        str: "rpc" pour la fonction Supabase match_page_embeddings (par défaut),
+            "memory" pour l'index exact en mémoire, "ann" pour l'index approximatif IVF.
+    """
+    return os.getenv("VECTOR_SEARCH_BACKEND", RPC_BACKEND).lower()
+
+
+def get_active_index():
+    """
+    Retourne l'index en processus correspondant au backend configuré.
+
+    Returns:
+        InMemoryVectorIndex, IVFIndex ou None pour le backend RPC.
+    """
+    backend = get_search_backend()
+    if backend == MEMORY_BACKEND:
+        return get_vector_index()
+    if backend == ANN_BACKEND:
+        # Import local : ann_index dépend de ce module
+        from src.search.ann_index import get_ann_index
+        return get_ann_index()
+    return None
+
+
+def course_rows(row_course_ids: np.ndarray, course_ids: List[int]) -> np.ndarray:
+    """
+    Indices des lignes dont le cours fait partie du filtre.
+
+    Args:
+        row_course_ids (np.ndarray): Cours de chaque ligne de l'index (n,).
+        course_ids (List[int]): Cours autorisés.
+
+    Returns:
+        np.ndarray: Indices des lignes retenues.
+    """
+    return np.flatnonzero(np.isin(row_course_ids, np.asarray(list(course_ids), dtype=np.int64)))
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    Normalise les lignes d'une matrice pour que le produit scalaire soit une similarité cosinus.
+    """
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=np.float32))
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(matrix / norms)
+
+
+class InMemoryVectorIndex:
+    """
+    Index vectoriel exact en mémoire, alternative à la fonction RPC match_page_embeddings.
+
+    Tous les embeddings de page_embeddings sont chargés dans une matrice float32
+    contiguë et normalisée. Une recherche correspond à un produit matrice-vecteur
+    (BLAS) suivi d'un argpartition pour extraire le top-k.
+
+    Avec une première passe réduite (`first_pass_dimension`), les scores sont
+    d'abord calculés sur une copie tronquée et quantifiée (QuantizedEmbeddingMatrix,
+    int8 par défaut), puis les top_k * FIRST_PASS_RESCORE_FACTOR meilleurs
+    candidats sont rescorés avec les lignes float32 : les similarités retournées
+    restent des cosinus exacts.
+    """
+
+    def __init__(
+        self,
+        refresh_interval: float = 300.0,
+        snapshot_path: Optional[str] = None,
+        first_pass_dimension: int = 0,
+        first_pass_precision: str = "int8"
+    ):
+        """
+        Initialise l'index vide.
+
+        Args:
+            refresh_interval (float): Délai en secondes avant un rechargement complet
+                depuis page_embeddings (0 pour désactiver le rechargement périodique).
+            snapshot_path (Optional[str]): Snapshot binaire à projeter en mémoire
+                (np.memmap) au lieu de charger les embeddings depuis Supabase.
+            first_pass_dimension (int): Dimension de la première passe réduite
+                (0 pour une recherche exacte en une passe).
+            first_pass_precision (str): Précision de la première passe (float32, float16 ou int8).
+        """
+        self.refresh_interval = refresh_interval
+        self.snapshot_path = snapshot_path
+        self.first_pass_dimension = first_pass_dimension
+        self.first_pass_precision = first_pass_precision
+        self.first_pass: Optional[QuantizedEmbeddingMatrix] = None
+        self._snapshot_mtime: Optional[float] = None
+        self.ids = np.empty(0, dtype=np.int64)
+        self.matrix = np.empty((0, 0), dtype=np.float32)
+        self.course_ids = np.empty(0, dtype=np.int64)
+        self._positions: Dict[int, int] = {}
+        self.last_refresh: Optional[float] = None
+
+        self._lock = threading.RLock()
+        self._refreshing = False
+        logger.info("Index vectoriel en mémoire initialisé")
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def is_loaded(self) -> bool:
+        return self.last_refresh is not None
+
+    def load(self, page_ids: np.ndarray, embeddings: np.ndarray, normalized: bool = False, course_ids: Optional[np.ndarray] = None) -> None:
+        """
+        Remplace le contenu de l'index.
+
+        Args:
+            page_ids (np.ndarray): IDs des pages (n,).
+            embeddings (np.ndarray): Embeddings correspondants (n, d).
+            normalized (bool): Si True, les lignes sont déjà normalisées et la matrice
+                est utilisée telle quelle (sans copie, par exemple un memmap).
+            course_ids (Optional[np.ndarray]): Cours de chaque page (n,), -1 si inconnu.
+        """
+        ids = np.asarray(page_ids, dtype=np.int64)
+        courses = np.full(len(ids), -1, dtype=np.int64) if course_ids is None else np.asarray(course_ids, dtype=np.int64)
+        if not len(ids):
+            matrix = np.empty((0, 0), dtype=np.float32)
+        elif normalized and embeddings.dtype == np.float32:
+            matrix = embeddings
+        else:
+            matrix = normalize_rows(embeddings)
+        first_pass = self._build_first_pass(matrix) if len(ids) else None
+
+        with self._lock:
+            self.ids = ids
+            self.matrix = matrix
+            self.first_pass = first_pass
+            self.course_ids = courses
+            self._positions = {int(page_id): position for position, page_id in enumerate(ids)}
+            self.last_refresh = time.time()
+
+        logger.info(f"Index vectoriel chargé avec {len(ids)} embeddings")
+
+    def _build_first_pass(self, matrix: np.ndarray) -> Optional[QuantizedEmbeddingMatrix]:
+        # Copie propre au worker, mais réduite : dimension first_pass_dimension en int8 par défaut
+        if not self.first_pass_dimension:
+            return None
+        return QuantizedEmbeddingMatrix(matrix, self.first_pass_dimension, self.first_pass_precision, keep_full=False)
+
+    def refresh(self) -> int:
+        """
+        Recharge l'index complet depuis le snapshot configuré, sinon depuis la table page_embeddings.
+
+        Returns:
+            int: Nombre d'embeddings chargés.
+        """
+        # Import local pour éviter un import circulaire avec le stockage des embeddings
+        from src.embeddings.embedding_storage import get_embedding_storage
+
+        try:
+            if self.snapshot_path and os.path.exists(self.snapshot_path):
+                return self.load_snapshot(self.snapshot_path)
+
+            storage = get_embedding_storage()
+            page_ids, embeddings = storage.get_all_embeddings()
+            page_courses = storage.get_page_course_ids()
+            self.load(page_ids, embeddings, course_ids=[page_courses.get(int(page_id), -1) for page_id in page_ids])
+            return len(page_ids)
+        finally:
+            self._refreshing = False
+
+    def load_snapshot(self, path: str) -> int:
+        """
+        Projette un snapshot binaire en mémoire (lecture seule, partagé entre workers).
+
+        Le snapshot n'est relu que s'il a été modifié depuis le dernier chargement,
+        afin de conserver les embeddings ajoutés depuis par l'ingestion. Les
+        recherches calculent directement sur le memmap : seul un snapshot float32
+        normalisé est accepté (un snapshot float16 imposerait une copie par worker).
+
+        Args:
+            path (str): Chemin du fichier snapshot.
+
+        Returns:
+            int: Nombre d'embeddings dans l'index.
+        """
+        mtime = os.path.getmtime(path)
+        if self.is_loaded and mtime == self._snapshot_mtime:
+            self.last_refresh = time.time()
+            return len(self)
+
+        page_ids, matrix, header = read_snapshot(path)
+        if header["dtype"] != "float32" or not header["normalized"]:
+            raise ValueError(
+                f"Snapshot {path} non projetable sans copie ({header['dtype']}, normalisé: {header['normalized']}): "
+                f"le réexporter avec scripts/export_embedding_snapshot.py"
+            )
+        course_ids = header["course_ids"]
+        if course_ids is None:
+            course_ids = self._fetch_course_ids(page_ids)
+        self.load(page_ids, matrix, normalized=header["normalized"], course_ids=course_ids)
+        self._snapshot_mtime = mtime
+        return len(page_ids)
+
+    def _fetch_course_ids(self, page_ids: np.ndarray) -> np.ndarray:
+        """
+        Lit les cours des pages dans la table pages (snapshot sans cours, version 1).
+
+        En cas d'échec, les cours sont inconnus (-1) : les recherches filtrées par
+        cours ne trouvent alors aucune page de ce snapshot.
+        """
+        # Import local pour éviter un import circulaire avec le stockage des embeddings
+        from src.embeddings.embedding_storage import get_embedding_storage
+
+        try:
+            page_courses = get_embedding_storage().get_page_course_ids()
+        except Exception as e:
+            logger.error(f"Impossible de récupérer les cours des pages du snapshot: {str(e)}")
+            page_courses = {}
+        return np.asarray([page_courses.get(int(page_id), -1) for page_id in page_ids], dtype=np.int64)
+
+    def ensure_fresh(self) -> None:
+        """
+        Charge l'index s'il est vide et déclenche un rechargement en arrière-plan
+        lorsque le délai de rafraîchissement est dépassé.
+        """
+        if not self.is_loaded:
+            with self._lock:
+                if not self.is_loaded:
+                    self.refresh()
+            return
+
+        if self.refresh_interval and time.time() - self.last_refresh > self.refresh_interval:
+            with self._lock:
+                if self._refreshing:
+                    return
+                self._refreshing = True
+            # Les recherches continuent sur l'ancienne matrice pendant le rechargement
+            threading.Thread(target=self._background_refresh, daemon=True).start()
+
+    def _background_refresh(self) -> None:
+        try:
+            self.refresh()
+        except Exception as e:
+            logger.error(f"Erreur lors du rafraîchissement de l'index vectoriel: {str(e)}")
+
+    def add(self, page_ids: List[int], embeddings: Union[List[List[float]], np.ndarray], course_ids: Optional[List[int]] = None) -> None:
+        """
+        Ajoute ou remplace des embeddings dans l'index (chemin d'ingestion).
+
+        Args:
+            page_ids (List[int]): IDs des pages.
+            embeddings: Embeddings correspondants.
+            course_ids (Optional[List[int]]): Cours de chaque page, -1 si inconnu.
+        """
+        if not len(page_ids):
+            return
+
+        vectors = normalize_rows(embeddings)
+        page_courses = [-1] * len(page_ids) if course_ids is None else [int(course_id) for course_id in course_ids]
+
+        with self._lock:
+            ids = self.ids
+            matrix = self.matrix if len(self.ids) else np.empty((0, vectors.shape[1]), dtype=np.float32)
+            positions = dict(self._positions)
+
+            new_ids = []
+            new_rows = []
+            new_courses = []
+            row_positions = []
+            replaced = matrix.copy() if any(int(page_id) in positions for page_id in page_ids) else matrix
+            courses = self.course_ids.copy()
+            for page_id, vector, course_id in zip(page_ids, vectors, page_courses):
+                position = positions.get(int(page_id))
+                if position is not None:
+                    replaced[position] = vector
+                    courses[position] = course_id
+                else:
+                    position = len(ids) + len(new_ids)
+                    positions[int(page_id)] = position
+                    new_ids.append(int(page_id))
+                    new_rows.append(vector)
+                    new_courses.append(course_id)
+                row_positions.append(position)
+
+            if new_rows:
+                ids = np.concatenate([ids, np.asarray(new_ids, dtype=np.int64)])
+                replaced = np.ascontiguousarray(np.vstack([replaced, np.asarray(new_rows)]))
+                courses = np.concatenate([courses, np.asarray(new_courses, dtype=np.int64)])
+
+            # Première passe : seules les lignes ajoutées ou remplacées sont requantifiées
+            if self.first_pass is not None:
+                first_pass = self.first_pass.with_rows(row_positions, vectors)
+            else:
+                first_pass = self._build_first_pass(replaced)
+
+            self.ids = ids
+            self.matrix = replaced
+            self.first_pass = first_pass
+            self.course_ids = courses
+            self._positions = positions
+
+        logger.info(f"{len(page_ids)} embeddings ajoutés à l'index vectoriel ({len(self)} au total)")
+
+    def _snapshot(self):
+        # Références cohérentes entre elles : add() et load() les remplacent sous le même verrou
+        with self._lock:
+            return self._positions, self.ids, self.matrix, self.course_ids, self.first_pass
+
+    def get_vectors(self, page_ids: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Retourne les embeddings normalisés de pages de l'index.
+
+        Args:
+            page_ids (List[int]): IDs des pages.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Matrice (n, d), lignes nulles pour les pages
+                absentes, et masque des pages trouvées (n,).
+        """
+        positions, _, matrix, _, _ = self._snapshot()
+
+        rows = [positions.get(int(page_id)) for page_id in page_ids]
+        found = np.asarray([row is not None for row in rows], dtype=bool)
+        vectors = np.zeros((len(page_ids), matrix.shape[1] if matrix.ndim == 2 else 0), dtype=np.float32)
+        if found.any():
+            vectors[found] = matrix[[row for row in rows if row is not None]]
+        return vectors, found
+
+    def search(
+        self,
+        query_embedding: Union[List[float], np.ndarray],
+        top_k: int = 5,
+        threshold: float = 0.5,
+        course_ids: Optional[List[int]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Recherche les pages les plus similaires à un embedding de requête.
+
+        Avec un filtre de cours, seules les lignes des cours demandés sont lues et
+        comparées : le top-k est calculé parmi elles et reste complet.
+
+        Args:
+            query_embedding: Embedding de la requête.
+            top_k (int): Nombre maximum de résultats à retourner.
+            threshold (float): Seuil de similarité minimum (de 0 à 1).
+            course_ids (Optional[List[int]]): Cours autorisés (None pour tout le corpus).
+
+        Returns:
+            List[Dict[str, Any]]: Résultats au format de match_page_embeddings
+                (page_id, similarity), par similarité décroissante.
+        """
+        return self.search_many([query_embedding], top_k, threshold, course_ids)[0]
+
+    def search_many(
+        self,
+        query_embeddings: Union[List[List[float]], np.ndarray],
+        top_k: int = 5,
+        threshold: float = 0.5,
+        course_ids: Optional[List[int]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Recherche les pages les plus similaires à plusieurs embeddings de requête.
+
+        Toutes les requêtes sont comparées à l'index en un seul produit matriciel
+        (q, d) x (d, n), au lieu d'un produit matrice-vecteur par requête. Avec une
+        première passe réduite, chaque requête est d'abord classée sur la copie
+        quantifiée, puis ses meilleurs candidats sont rescorés en float32.
+
+        Args:
+            query_embeddings: Embeddings des requêtes (q, d).
+            top_k (int): Nombre maximum de résultats par requête.
+            threshold (float): Seuil de similarité minimum (de 0 à 1).
+            course_ids (Optional[List[int]]): Cours autorisés (None pour tout le corpus).
+
+        Returns:
+            List[List[Dict[str, Any]]]: Résultats (page_id, similarity) de chaque requête,
+                dans l'ordre des requêtes.
+        """
+        # Instantané pris sous le verrou : un ajout ou un rechargement concurrent ne
+        # peut pas associer les IDs d'un état à la matrice d'un autre
+        _, ids, matrix, row_courses, first_pass = self._snapshot()
+        empty = [[] for _ in range(len(query_embeddings))]
+        if len(ids) == 0 or top_k <= 0 or not len(query_embeddings):
+            return empty
+
+        rows = None
+        if course_ids is not None:
+            rows = course_rows(row_courses, course_ids)
+            ids, matrix = ids[rows], matrix[rows]
+            if len(ids) == 0:
+                return empty
+
+        queries = normalize_rows(query_embeddings)
+        if first_pass is not None:
+            ranked = [self._two_pass(first_pass, matrix, rows, query, top_k) for query in queries]
+        else:
+            ranked = [top_k_indices(row_scores, top_k) for row_scores in queries @ matrix.T]
+
+        results = []
+        for indices, similarities in ranked:
+            results.append([
+                {"page_id": int(ids[index]), "similarity": float(similarity)}
+                for index, similarity in zip(indices, similarities)
+                if similarity > threshold
+            ])
+        return results
+
+    @staticmethod
+    def _two_pass(
+        first_pass: QuantizedEmbeddingMatrix,
+        matrix: np.ndarray,
+        rows: Optional[np.ndarray],
+        query: np.ndarray,
+        top_k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Classe une requête sur la copie réduite puis rescore ses candidats en float32.
+
+        Args:
+            first_pass (QuantizedEmbeddingMatrix): Copie réduite de toutes les lignes de l'index.
+            matrix (np.ndarray): Lignes float32 (déjà restreintes au filtre de cours).
+            rows (Optional[np.ndarray]): Lignes de l'index retenues par le filtre de cours.
+            query (np.ndarray): Embedding normalisé de la requête.
+            top_k (int): Nombre de résultats.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Indices (dans `matrix`) et cosinus exacts, par score décroissant.
+        """
+        approximate = first_pass.first_pass_scores(query)
+        if rows is not None:
+            approximate = approximate[rows]
+        candidates, _ = top_k_indices(approximate, top_k * FIRST_PASS_RESCORE_FACTOR)
+        order, similarities = top_k_indices(matrix[candidates] @ query, top_k)
+        return candidates[order], similarities
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sélectionne les top_k meilleurs scores avec argpartition puis les trie.
+
+    Args:
+        scores (np.ndarray): Scores (n,).
+        top_k (int): Nombre de résultats.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Indices et scores triés par score décroissant.
+    """
+    top_k = min(top_k, len(scores))
+    if top_k <= 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+    if top_k < len(scores):
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        candidates = np.arange(len(scores))
+    order = np.argsort(-scores[candidates], kind="stable")
+    return candidates[order], scores[candidates[order]]
+
+
+# Instance partagée par tous les services du processus
+_vector_index: Optional[InMemoryVectorIndex] = None
+_vector_index_lock = threading.Lock()
+
+
+def get_vector_index() -> InMemoryVectorIndex:
+    """
+    Retourne l'index vectoriel en mémoire partagé par le processus (première passe
+    réduite si VECTOR_INDEX_FIRST_PASS_DIM est défini, par exemple 256).
+    """
+    global _vector_index
+    if _vector_index is None:
+        with _vector_index_lock:
+            if _vector_index is None:
+                _vector_index = InMemoryVectorIndex(
+                    refresh_interval=float(os.getenv("VECTOR_INDEX_REFRESH_SECONDS", "300")),
+                    snapshot_path=get_snapshot_path(),
+                    first_pass_dimension=int(os.getenv("VECTOR_INDEX_FIRST_PASS_DIM", "0")),
+                    first_pass_precision=os.getenv("VECTOR_INDEX_FIRST_PASS_PRECISION", "int8")
+                )
+    return _vector_index
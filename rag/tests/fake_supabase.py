@@ -0,0 +1,148 @@
+# tests/fake_supabase.py
+"""
+Client Supabase en mémoire pour les tests unitaires.
+
+Reproduit le sous-ensemble de l'API PostgREST utilisé par le projet
+(select, eq, in_, gte, lte, order, range, limit, insert, upsert, rpc) et
+enregistre chaque requête exécutée, pour vérifier le nombre d'allers-retours
+et la taille des filtres `in`.
+"""
+from typing import Any, Callable, Dict, List, Optional
+
+
+class FakeResult:
+    def __init__(self, data: List[Dict[str, Any]]):
+        self.data = data
+        self.count = len(data)
+
+
+class FakeQuery:
+    def __init__(self, client: "FakeSupabase", table: str):
+        self.client = client
+        self.table = table
+        self.operation = "select"
+        self.columns = "*"
+        self.rows: List[Dict[str, Any]] = []
+        self.options: Dict[str, Any] = {}
+        self.filters: List[Callable[[Dict[str, Any]], bool]] = []
+        self.in_sizes: List[int] = []
+        self.ordering = None
+        self.bounds = None
+        self.max_rows = None
+
+    def select(self, columns: str = "*", **options):
+        self.operation, self.columns = "select", columns
+        return self
+
+    def insert(self, rows):
+        self.operation, self.rows = "insert", rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, **options):
+        self.operation, self.rows, self.options = "upsert", rows if isinstance(rows, list) else [rows], options
+        return self
+
+    def eq(self, column: str, value: Any):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column: str, values):
+        values = list(values)
+        self.in_sizes.append(len(values))
+        self.filters.append(lambda row: row.get(column) in set(values))
+        return self
+
+    def gte(self, column: str, value: Any):
+        self.filters.append(lambda row: row.get(column) is not None and row.get(column) >= value)
+        return self
+
+    def lte(self, column: str, value: Any):
+        self.filters.append(lambda row: row.get(column) is not None and row.get(column) <= value)
+        return self
+
+    def order(self, column: str, desc: bool = False):
+        self.ordering = (column, desc)
+        return self
+
+    def range(self, start: int, stop: int):
+        self.bounds = (start, stop)
+        return self
+
+    def limit(self, count: int):
+        self.max_rows = count
+        return self
+
+    def execute(self) -> FakeResult:
+        self.client.queries.append(self)
+        if self.client.fail_on is not None and self.client.fail_on(self):
+            raise Exception(f"Erreur simulée sur {self.table}")
+
+        table = self.client.tables.setdefault(self.table, [])
+        if self.operation == "insert":
+            inserted = []
+            for row in self.rows:
+                row = dict(row, id=row.get("id", self.client.next_id(self.table)))
+                table.append(row)
+                inserted.append(dict(row))
+            return FakeResult(inserted)
+
+        if self.operation == "upsert":
+            key = self.options.get("on_conflict", "id")
+            upserted = []
+            for row in self.rows:
+                existing = next((current for current in table if current.get(key) == row.get(key)), None)
+                if existing is not None:
+                    existing.update(row)
+                else:
+                    existing = dict(row, id=row.get("id", self.client.next_id(self.table)))
+                    table.append(existing)
+                upserted.append(dict(existing))
+            return FakeResult([] if self.options.get("returning") == "minimal" else upserted)
+
+        rows = [row for row in table if all(check(row) for check in self.filters)]
+        if self.ordering:
+            column, desc = self.ordering
+            rows.sort(key=lambda row: row.get(column), reverse=desc)
+        if self.bounds:
+            rows = rows[self.bounds[0]:self.bounds[1] + 1]
+        if self.max_rows is not None:
+            rows = rows[:self.max_rows]
+        return FakeResult([dict(row) for row in rows])
+
+
+class FakeRpc:
+    def __init__(self, client: "FakeSupabase", name: str, params: Dict[str, Any]):
+        self.client, self.name, self.params = client, name, params
+
+    def execute(self) -> FakeResult:
+        self.client.rpcs.append((self.name, self.params))
+        handler = self.client.rpc_handlers.get(self.name)
+        return FakeResult(handler(self.params) if handler else [])
+
+
+class FakeSupabase:
+    """
+    Client Supabase en mémoire : tables sous forme de listes de dictionnaires.
+    """
+
+    def __init__(self, tables: Optional[Dict[str, List[Dict[str, Any]]]] = None):
+        self.tables = {name: [dict(row) for row in rows] for name, rows in (tables or {}).items()}
+        self.queries: List[FakeQuery] = []
+        self.rpcs: List[tuple] = []
+        self.rpc_handlers: Dict[str, Callable[[Dict[str, Any]], List[Dict[str, Any]]]] = {}
+        # Prédicat sur la requête : si vrai, execute() lève une exception
+        self.fail_on: Optional[Callable[[FakeQuery], bool]] = None
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    from_ = table
+
+    def rpc(self, name: str, params: Dict[str, Any]) -> FakeRpc:
+        return FakeRpc(self, name, params)
+
+    def next_id(self, table: str) -> int:
+        return max((row.get("id") or 0 for row in self.tables.get(table, [])), default=0) + 1
+
+    def queries_on(self, table: str, operation: Optional[str] = None) -> List[FakeQuery]:
+        return [query for query in self.queries if query.table == table and (operation is None or query.operation == operation)]
@@ -0,0 +1,169 @@
+# tests/test_ann_index.py
+import os
+import sys
+import tempfile
+from unittest import mock
+import numpy as np
+
+# Ajouter le répertoire parent au chemin Python
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.search.ann_index import IVFIndex, spherical_kmeans
+from src.embeddings.embedding_storage import EmbeddingStorage
+from tests.fake_supabase import FakeSupabase
+
+
+def _clustered_embeddings(count: int = 2000, dimension: int = 64, clusters: int = 20, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    embeddings = centers[rng.integers(0, clusters, size=count)] + 0.3 * rng.standard_normal((count, dimension)).astype(np.float32)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def _recall(index: IVFIndex, embeddings: np.ndarray, nprobe: int, top_k: int = 10) -> float:
+    hits = 0
+    queries = embeddings[:50]
+    for query in queries:
+        expected = set(np.argsort(-(embeddings @ query))[:top_k].tolist())
+        results = index.search(query, top_k, threshold=-1.0, nprobe=nprobe)
+        hits += len(expected.intersection(result["page_id"] for result in results))
+    return hits / (len(queries) * top_k)
+
+
+def test_kmeans_centroids_normalized():
+    """
+    Vérifie que le k-means sphérique produit des centroïdes normalisés.
+    """
+    centroids = spherical_kmeans(_clustered_embeddings(), 16)
+
+    assert centroids.shape == (16, 64)
+    assert np.allclose(np.linalg.norm(centroids, axis=1), 1.0, atol=1e-5)
+
+
+def test_recall_increases_with_nprobe():
+    """
+    Vérifie que le rappel atteint la recherche exacte quand toutes les listes sont parcourues.
+    """
+    embeddings = _clustered_embeddings()
+    index = IVFIndex(n_lists=32)
+    index.build(np.arange(len(embeddings)), embeddings)
+
+    assert _recall(index, embeddings, nprobe=32) == 1.0
+    assert _recall(index, embeddings, nprobe=8) >= _recall(index, embeddings, nprobe=1)
+
+
+def test_incremental_insert_and_persistence():
+    """
+    Vérifie les insertions incrémentales et la persistance sur disque.
+    """
+    embeddings = _clustered_embeddings()
+    index = IVFIndex(n_lists=16, nprobe=16)
+    index.build(np.arange(1000), embeddings[:1000])
+    index.add(list(range(1000, 1010)), embeddings[1000:1010])
+    index.add([5], embeddings[1500:1501])
+
+    assert len(index) == 1010
+    assert index.search(embeddings[1005], top_k=1, threshold=0.0)[0]["page_id"] == 1005
+    assert index.search(embeddings[1500], top_k=1, threshold=0.0)[0]["page_id"] == 5
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "ivf.npz")
+        index.save(path)
+
+        restored = IVFIndex(nprobe=16, path=path)
+        restored.ensure_fresh()
+
+        assert len(restored) == 1010
+        assert restored.search(embeddings[1005], top_k=1, threshold=0.0)[0]["page_id"] == 1005
+
+
+def test_course_filter_probes_matching_lists():
+    """
+    Vérifie qu'une recherche filtrée par cours renvoie un top-k complet, même pour un petit cours.
+    """
+    embeddings = _clustered_embeddings()
+    page_ids = np.arange(len(embeddings))
+    # Petit cours : 30 pages tirées au hasard dans tout le corpus
+    course_ids = np.zeros(len(embeddings), dtype=np.int64)
+    course_ids[np.random.default_rng(1).choice(len(embeddings), 30, replace=False)] = 7
+    index = IVFIndex(n_lists=32, nprobe=2)
+    index.build(page_ids, embeddings, course_ids=course_ids)
+
+    results = index.search(embeddings[0], top_k=10, threshold=-1.0, course_ids=[7])
+
+    assert len(results) == 10
+    assert all(course_ids[result["page_id"]] == 7 for result in results)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "ivf.npz")
+        index.save(path)
+        restored = IVFIndex(nprobe=2, path=path)
+        restored.load()
+        assert restored.search(embeddings[0], top_k=10, threshold=-1.0, course_ids=[7]) == results
+
+
+def test_ingestion_before_first_search_reaches_index():
+    """
+    Vérifie qu'une page ingérée avant la première recherche du worker est trouvée ensuite.
+    """
+    embeddings = _clustered_embeddings()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "ivf.npz")
+        # Index enregistré par un autre worker
+        saved = IVFIndex(n_lists=16, path=path)
+        saved.build(np.arange(1000), embeddings[:1000])
+        saved.save()
+
+        worker_index = IVFIndex(nprobe=16, path=path)
+        supabase = FakeSupabase({"pages": [{"id": 5000, "course_id": 3}]})
+        with mock.patch("src.embeddings.embedding_storage.get_supabase_client", return_value=supabase), \
+                mock.patch("src.embeddings.embedding_storage.get_active_index", return_value=worker_index):
+            stored_ids, failures = EmbeddingStorage().store_page_embeddings_bulk([(5000, embeddings[1500].tolist())])
+
+        assert stored_ids == [5000] and not failures
+        worker_index.ensure_fresh()
+        assert len(worker_index) == 1001
+        assert worker_index.search(embeddings[1500], top_k=1, threshold=0.0, course_ids=[3])[0]["page_id"] == 5000
+
+
+def test_workers_reload_and_merge_saves():
+    """
+    Vérifie que les enregistrements de deux workers se cumulent et que chacun recharge le fichier modifié.
+    """
+    embeddings = _clustered_embeddings()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "ivf.npz")
+        initial = IVFIndex(n_lists=16, path=path)
+        initial.build(np.arange(1000), embeddings[:1000])
+        initial.save()
+
+        first, second = IVFIndex(nprobe=16, path=path), IVFIndex(nprobe=16, path=path)
+        first.ensure_fresh()
+        second.ensure_fresh()
+
+        first.add([5000], embeddings[1500:1501])
+        first.save()
+        second.add([5001], embeddings[1600:1601])
+        second.save()
+
+        # Le premier worker voit l'enregistrement du second, sans perdre sa propre page
+        first.ensure_fresh()
+        assert 5001 in first and 5000 in first
+
+        restored = IVFIndex(nprobe=16, path=path)
+        restored.ensure_fresh()
+        assert len(restored) == 1002
+        assert restored.search(embeddings[1500], top_k=1, threshold=0.0)[0]["page_id"] == 5000
+        assert restored.search(embeddings[1600], top_k=1, threshold=0.0)[0]["page_id"] == 5001
+
+
+if __name__ == "__main__":
+    test_kmeans_centroids_normalized()
+    test_recall_increases_with_nprobe()
+    test_incremental_insert_and_persistence()
+    test_course_filter_probes_matching_lists()
+    test_ingestion_before_first_search_reaches_index()
+    test_workers_reload_and_merge_saves()
+    print("Tous les tests de l'index IVF ont réussi")
@@ -0,0 +1,73 @@
+# tests/test_batch_processing.py
+import os
+import sys
+import time
+import threading
+
+# Ajouter le répertoire parent au chemin Python
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.search.search_optimizations import process_queries_in_batch, TokenBucket
+
+QUERIES = [f"Question {k} : {'abcdefghij'[k % 10] * (k + 3)}" for k in range(24)]
+
+
+def test_concurrent_batches_keep_order_and_limit():
+    """
+    Vérifie l'ordre des résultats et le nombre maximum de lots simultanés.
+    """
+    in_flight = []
+    peak = []
+    lock = threading.Lock()
+
+    def processor(batch):
+        with lock:
+            in_flight.append(1)
+            peak.append(len(in_flight))
+        time.sleep(0.05)
+        with lock:
+            in_flight.pop()
+        return [query.upper() for query in batch]
+
+    stats = {}
+    results = process_queries_in_batch(QUERIES, batch_size=2, processor_func=processor, max_in_flight=3, group_similar=False, stats=stats)
+
+    assert results == [query.upper() for query in QUERIES]
+    assert max(peak) == 3
+    assert stats["queries"] == len(QUERIES) and stats["errors"] == 0
+    assert stats["queries_per_second"] > 0
+
+
+def test_failed_items_get_errors():
+    """
+    Vérifie qu'un lot en échec est rejoué requête par requête et que seule la requête fautive est en erreur.
+    """
+    def processor(batch):
+        if any(query.startswith("Question 5 ") for query in batch):
+            raise RuntimeError("service indisponible")
+        return [len(query) for query in batch]
+
+    stats = {}
+    results = process_queries_in_batch(QUERIES, batch_size=4, processor_func=processor, group_similar=False, stats=stats)
+
+    assert results[5] == {"query": QUERIES[5], "error": "service indisponible"}
+    assert results[4] == len(QUERIES[4]) and results[6] == len(QUERIES[6])
+    assert stats["errors"] == 1
+
+
+def test_token_bucket_paces_calls():
+    """
+    Vérifie que le seau à jetons limite le débit une fois la rafale initiale consommée.
+    """
+    bucket = TokenBucket(rate=50, capacity=1)
+    start = time.perf_counter()
+    for _ in range(6):
+        bucket.acquire()
+    assert time.perf_counter() - start >= 0.09
+
+
+if __name__ == "__main__":
+    test_concurrent_batches_keep_order_and_limit()
+    test_failed_items_get_errors()
+    test_token_bucket_paces_calls()
+    print("Tous les tests du traitement par lots ont réussi")
@@ -0,0 +1,135 @@
+# tests/test_chunk_index.py
+import os
+import sys
+from unittest.mock import patch
+
+# Ajouter le répertoire parent au chemin Python
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.fake_supabase import FakeSupabase
+from src.processing.text_chunker import split_into_chunks
+from src.search.chunk_index import ChunkIndex
+
+TRANSISTOR_PAGE = """Le transistor bipolaire
+
+Le transistor bipolaire est composé de trois zones dopées : émetteur, base et collecteur.
+
+En régime linéaire, le courant de collecteur vaut beta fois le courant de base.
+
+En commutation, le transistor 2N2222 est saturé : V_CE sat vaut environ 0,2 V."""
+
+OHM_PAGE = """Loi d'Ohm
+
+La tension aux bornes d'une résistance est proportionnelle au courant qui la traverse.
+
+Deux résistances en série s'additionnent."""
+
+
+def _build_index() -> ChunkIndex:
+    index = ChunkIndex()
+    index.build([1, 2], [TRANSISTOR_PAGE, OHM_PAGE])
+    return index
+
+
+def test_split_into_chunks_keeps_paragraphs_and_merges_titles():
+    """
+    Vérifie que le titre est regroupé avec le premier paragraphe et que les paragraphes restent séparés.
+    """
+    chunks = split_into_chunks(TRANSISTOR_PAGE)
+
+    assert len(chunks) == 3
+    assert chunks[0].startswith("Le transistor bipolaire Le transistor bipolaire est composé")
+    assert chunks[2].startswith("En commutation")
+
+
+def test_split_into_chunks_bounds_chunk_size():
+    """
+    Vérifie qu'un long paragraphe est découpé en passages de taille bornée sans perte de texte.
+    """
+    text = " ".join(f"Phrase numéro {index} sur le montage amplificateur." for index in range(40))
+    chunks = split_into_chunks(text, max_chars=200)
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 200 for chunk in chunks)
+    assert " ".join(chunks) == text
+    assert split_into_chunks("") == []
+
+
+def test_select_passages_keeps_relevant_paragraphs_in_order():
+    """
+    Vérifie que seuls les passages contenant les termes de la requête sont retenus, dans l'ordre de la page.
+    """
+    passages = _build_index().select_passages("courant de collecteur du 2N2222", [1, 2], max_passages=2)
+
+    kept, total = passages[1]
+    assert total == 3
+    assert [passage.split(",")[0] for passage in kept] == ["En régime linéaire", "En commutation"]
+    # Le courant apparaît aussi dans la loi d'Ohm
+    assert passages[2][1] == 2 and len(passages[2][0]) == 1
+
+
+def test_pages_without_matching_passage_are_not_excerpted():
+    """
+    Vérifie qu'une page sans terme de la requête n'est pas réduite (elle garde son texte complet).
+    """
+    index = _build_index()
+
+    assert 2 not in index.select_passages("transistor 2N2222", [1, 2])
+    assert index.select_passages("photosynthèse", [1, 2]) == {}
+
+
+def test_add_pages_replaces_and_appends():
+    """
+    Vérifie que l'ajout de pages ingérées remplace les passages existants d'une page et en ajoute de nouveaux.
+    """
+    index = _build_index()
+    index.add_pages([2, 3], ["Le condensateur stocke une charge.", "Diode Zener en régulation de tension."])
+
+    assert len(index) == 5
+    assert index.select_passages("résistances en série", [2]) == {}
+    assert index.select_passages("diode zener", [3])[3] == (["Diode Zener en régulation de tension."], 1)
+    assert index.select_passages("condensateur", [2])[2] == (["Le condensateur stocke une charge."], 1)
+
+
+def test_add_pages_in_background():
+    """
+    Vérifie que l'ajout en arrière-plan indexe les pages sans bloquer l'appelant, et que des ajouts successifs sont tous conservés.
+    """
+    index = _build_index()
+    threads = [
+        index.add_pages_in_background([3], ["Le condensateur stocke une charge."]),
+        index.add_pages_in_background([4], ["La bobine s'oppose aux variations de courant."])
+    ]
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert len(index) == 7
+    assert 3 in index.select_passages("condensateur", [3])
+    assert 4 in index.select_passages("bobine", [4])
+
+
+def test_loaded_once_from_pages_table():
+    """
+    Vérifie que l'index est chargé une seule fois depuis la table pages, puis suivi par les ajouts.
+    """
+    fake = FakeSupabase({"pages": [{"id": 1, "content_text": TRANSISTOR_PAGE}, {"id": 2, "content_text": OHM_PAGE}]})
+    index = ChunkIndex()
+    with patch("src.storage.supabase_client.get_supabase_client", return_value=fake):
+        index.ensure_loaded()
+        index.add_pages([3], ["Le condensateur stocke une charge."])
+        index.ensure_loaded()
+
+    assert len(fake.queries_on("pages", "select")) == 1
+    assert len(index) == 6
+    assert 3 in index.select_passages("condensateur", [3])
+
+
+if __name__ == "__main__":
+    test_split_into_chunks_keeps_paragraphs_and_merges_titles()
+    test_split_into_chunks_bounds_chunk_size()
+    test_select_passages_keeps_relevant_paragraphs_in_order()
+    test_pages_without_matching_passage_are_not_excerpted()
+    test_add_pages_replaces_and_appends()
+    test_add_pages_in_background()
+    test_loaded_once_from_pages_table()
+    print("Tous les tests de l'index des passages ont réussi")
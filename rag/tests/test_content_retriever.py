@@ -0,0 +1,116 @@
+# tests/test_content_retriever.py
+import os
+import sys
+from unittest.mock import patch
+
+# Ajouter le répertoire parent au chemin Python
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.fake_supabase import FakeSupabase
+from src.search.content_retriever import ContentRetriever, FETCH_CHUNK_SIZE
+from src.search.course_cache import CourseCache
+from src.search.page_cache import PageCache
+
+COURSES = [{"id": 1, "name": "Électronique", "year": "ING1"}, {"id": 2, "name": "Signal", "year": "ING2"}]
+
+
+def _page(page_id: int, course_id: int, page_number: int):
+    return {
+        "id": page_id,
+        "page_number": page_number,
+        "image_path": f"data/images/page_{page_id}.png",
+        "content_text": f"Page {page_number} du cours {course_id}",
+        "course_id": course_id
+    }
+
+
+def _retriever(fake: FakeSupabase) -> ContentRetriever:
+    # Caches propres au test : les caches partagés du processus ne sont pas touchés
+    retriever = ContentRetriever.__new__(ContentRetriever)
+    retriever.supabase = fake
+    retriever.course_cache = CourseCache()
+    retriever.page_cache = PageCache()
+    return retriever
+
+
+def test_pages_content_fetched_in_chunks_with_courses():
+    """
+    Vérifie que les pages inconnues sont lues par filtres `in` de FETCH_CHUNK_SIZE IDs, chacune avec son cours.
+    """
+    fake = FakeSupabase({
+        "pages": [_page(page_id, 1 + page_id % 2, page_id) for page_id in range(1, 251)],
+        "courses": COURSES
+    })
+    retriever = _retriever(fake)
+
+    with patch("src.search.course_cache.get_supabase_client", return_value=fake):
+        contents = retriever.get_pages_content(list(range(250, 0, -1)) + [999])
+
+    assert [size for query in fake.queries_on("pages") for size in query.in_sizes] == [FETCH_CHUNK_SIZE, FETCH_CHUNK_SIZE, 51]
+    assert sorted(contents) == list(range(1, 251))
+    assert contents[7]["content_text"] == "Page 7 du cours 2" and contents[7]["course"]["name"] == "Signal"
+    assert contents[8]["course"]["name"] == "Électronique"
+    assert contents[8]["image_exists"] is False
+
+
+def test_known_pages_and_page_cache_avoid_queries():
+    """
+    Vérifie que les lignes complètes fournies par la recherche et les pages en cache ne sont pas relues.
+    """
+    fake = FakeSupabase({"pages": [_page(page_id, 1, page_id) for page_id in range(1, 6)], "courses": COURSES})
+    retriever = _retriever(fake)
+    known_pages = {1: _page(1, 1, 1), 2: {"id": 2, "course_id": 1}}
+
+    with patch("src.search.course_cache.get_supabase_client", return_value=fake):
+        contents = retriever.get_pages_content([1, 2, 3], known_pages=known_pages)
+        # La ligne incomplète de la page 2 est relue avec la page 3
+        assert [query.in_sizes for query in fake.queries_on("pages")] == [[2]]
+        assert contents[2]["content_text"] == "Page 2 du cours 1"
+
+        retriever.get_pages_content([3, 2, 1])
+        assert len(fake.queries_on("pages")) == 1
+
+
+def test_context_windows_one_query_per_course_in_page_order():
+    """
+    Vérifie que les fenêtres de contexte sont lues en une requête par cours et rendues dans l'ordre des pages.
+    """
+    pages = [_page(page_id, 1, page_id) for page_id in range(1, 11)]
+    pages += [_page(100 + number, 2, number) for number in (1, 2, 4)]
+    fake = FakeSupabase({"pages": pages})
+    retriever = _retriever(fake)
+    known_pages = {page["id"]: page for page in pages if page["id"] in (1, 6, 102)}
+
+    windows = retriever.get_context_windows([6, 1, 102], context_size=1, known_pages=known_pages)
+
+    page_queries = fake.queries_on("pages")
+    assert len(page_queries) == 2
+    # Les pages centrales connues alimentent le cache : seules leurs voisines sont lues
+    assert sorted(query.in_sizes[0] for query in page_queries) == [2, 3]
+    assert [page["page_number"] for page in windows[6]] == [5, 6, 7]
+    assert [page["page_number"] for page in windows[1]] == [1, 2]
+    # La page 3 du cours 2 n'existe pas : la fenêtre est réduite aux pages présentes
+    assert [page["id"] for page in windows[102]] == [101, 102]
+
+
+def test_context_windows_reuse_cached_pages():
+    """
+    Vérifie qu'une seconde demande des mêmes fenêtres est servie par le cache des pages.
+    """
+    fake = FakeSupabase({"pages": [_page(page_id, 1, page_id) for page_id in range(1, 6)]})
+    retriever = _retriever(fake)
+
+    first = retriever.get_context_windows([3], context_size=1)
+    query_count = len(fake.queries)
+    second = retriever.get_context_windows([3], context_size=1)
+
+    assert len(fake.queries) == query_count
+    assert [page["id"] for page in second[3]] == [page["id"] for page in first[3]] == [2, 3, 4]
+
+
+if __name__ == "__main__":
+    test_pages_content_fetched_in_chunks_with_courses()
+    test_known_pages_and_page_cache_avoid_queries()
+    test_context_windows_one_query_per_course_in_page_order()
+    test_context_windows_reuse_cached_pages()
+    print("Tous les tests du récupérateur de contenu ont réussi")
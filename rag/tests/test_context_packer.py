@@ -0,0 +1,122 @@
+# tests/test_context_packer.py
+import os
+import sys
+
+# Ajouter le répertoire parent au chemin Python
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.search.context_packer import (
+    pack_pages, trim_to_tokens, estimate_tokens, get_context_budget, MIN_TRIMMED_TOKENS, TRIM_SUFFIX
+)
+
+
+def _format_block(page: dict, text: str) -> str:
+    return f"--- Page: {page['page_number']} ---\n{text}\n"
+
+
+def _page(page_number: int, similarity: float, sentences: int = 20) -> dict:
+    text = " ".join(f"Phrase {k} de la page {page_number}." for k in range(sentences))
+    return {"id": page_number, "page_number": page_number, "similarity": similarity, "content_text": text}
+
+
+def test_pack_respects_budget_and_score_order():
+    """
+    Vérifie que le budget est respecté et que les pages les mieux classées sont gardées entières.
+    """
+    pages = [_page(1, 0.5), _page(2, 0.9), _page(3, 0.7)]
+    page_tokens = estimate_tokens(_format_block(pages[0], pages[0]["content_text"]))
+    budget = int(page_tokens * 1.5)
+
+    packed = pack_pages(pages, budget, _format_block)
+
+    assert packed["used_tokens"] <= budget
+    assert [page["id"] for page in packed["included"]] == [2, 3]
+    assert packed["included"][0]["truncated"] is False
+    assert packed["included"][1]["truncated"] is True
+    assert [page["id"] for page in packed["dropped"]] == [1]
+
+
+def test_small_remainder_drops_page_but_keeps_shorter_ones():
+    """
+    Vérifie qu'une page trop longue pour le reste du budget est écartée sans bloquer les suivantes.
+    """
+    long_page = _page(1, 0.9, sentences=200)
+    short_page = _page(2, 0.5, sentences=1)
+    budget = MIN_TRIMMED_TOKENS // 2 + estimate_tokens(_format_block(short_page, short_page["content_text"]))
+
+    packed = pack_pages([long_page, short_page], budget, _format_block)
+
+    assert [page["id"] for page in packed["included"]] == [2]
+    assert [page["id"] for page in packed["dropped"]] == [1]
+
+
+def test_trim_keeps_whole_sentences():
+    """
+    Vérifie que la troncature s'arrête sur une fin de phrase.
+    """
+    text = "Première phrase. Deuxième phrase. Troisième phrase."
+    trimmed = trim_to_tokens(text, estimate_tokens("Première phrase. Deuxième phrase. [...]"))
+
+    assert trimmed == "Première phrase. Deuxième phrase. [...]"
+    assert trim_to_tokens(text, 1000) == text
+
+
+def test_trim_keeps_line_breaks():
+    """
+    Vérifie que la troncature conserve les sauts de ligne et les paragraphes du texte.
+    """
+    text = "Le transistor\n\nPolarisation : pont diviseur.\n- R1 = 10 kΩ\n- R2 = 2,2 kΩ\n\nEn commutation, V_CE sat vaut 0,2 V."
+    kept = "Le transistor\n\nPolarisation : pont diviseur.\n- R1 = 10 kΩ"
+    trimmed = trim_to_tokens(text, estimate_tokens(kept + TRIM_SUFFIX))
+
+    assert trimmed == kept + TRIM_SUFFIX
+
+
+def test_budget_depends_on_model_window():
+    """
+    Vérifie que le budget tient compte de la fenêtre du modèle et de la réponse attendue.
+    """
+    assert get_context_budget("gpt-3.5-turbo", max_tokens=1500) < get_context_budget("gpt-3.5-turbo-16k", max_tokens=1500)
+    assert get_context_budget("openai/gpt-4o") == get_context_budget("gpt-4o")
+    assert get_context_budget("gpt-4", max_tokens=8000) == 0
+
+
+def test_trim_reserves_suffix_tokens():
+    """
+    Vérifie que le texte tronqué, suffixe compris, ne dépasse jamais la limite de tokens.
+    """
+    text = "Première phrase. Deuxième phrase. Troisième phrase."
+    for max_tokens in range(estimate_tokens(TRIM_SUFFIX), estimate_tokens(text)):
+        trimmed = trim_to_tokens(text, max_tokens)
+        assert trimmed.endswith(TRIM_SUFFIX)
+        assert estimate_tokens(trimmed) <= max_tokens
+
+    long_sentence = " ".join(["transistor"] * 200)
+    assert estimate_tokens(trim_to_tokens(long_sentence, 20)) <= 20
+    # Estimateur plus strict que l'estimation par défaut (un token par mot)
+    words = lambda value: len(value.split())
+    assert words(trim_to_tokens(long_sentence, 20, estimator=words)) <= 20
+
+
+def test_used_tokens_never_exceed_budget():
+    """
+    Vérifie que les tokens utilisés restent dans le budget quel que soit le reste disponible à la troncature.
+    """
+    pages = [_page(1, 0.9), _page(2, 0.8), _page(3, 0.7)]
+    page_tokens = estimate_tokens(_format_block(pages[0], pages[0]["content_text"]))
+
+    for budget in range(page_tokens + MIN_TRIMMED_TOKENS, 3 * page_tokens, 7):
+        packed = pack_pages(pages, budget, _format_block)
+        assert packed["used_tokens"] <= budget
+        assert packed["used_tokens"] == sum(estimate_tokens(block) for block in packed["blocks"])
+
+
+if __name__ == "__main__":
+    test_pack_respects_budget_and_score_order()
+    test_small_remainder_drops_page_but_keeps_shorter_ones()
+    test_trim_keeps_whole_sentences()
+    test_trim_keeps_line_breaks()
+    test_trim_reserves_suffix_tokens()
+    test_used_tokens_never_exceed_budget()
+    test_budget_depends_on_model_window()
+    print("Tous les tests du packer de contexte ont réussi")
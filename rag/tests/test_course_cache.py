@@ -0,0 +1,113 @@
+# tests/test_course_cache.py
+import os
+import sys
+import time
+from unittest.mock import patch
+
+# Ajouter le répertoire parent au chemin Python
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.fake_supabase import FakeSupabase
+from src.search.course_cache import CourseCache
+
+COURSES = [
+    {"id": 1, "title": "Électronique analogique", "year": "ING1", "created_at": "2024-01-10"},
+    {"id": 2, "title": "Traitement du signal", "year": "ING2", "created_at": "2024-03-02"}
+]
+
+
+def _course_loads(fake: FakeSupabase) -> int:
+    return len([query for query in fake.queries_on("courses") if not query.in_sizes])
+
+
+def test_ttl_expiry_reloads_courses():
+    """
+    Vérifie que le cache n'interroge pas la table tant qu'il est frais, puis la recharge après le TTL.
+    """
+    fake = FakeSupabase({"courses": COURSES})
+    cache = CourseCache(ttl=60)
+
+    with patch("src.search.course_cache.get_supabase_client", return_value=fake):
+        assert [course["id"] for course in cache.list_courses()] == [2, 1]
+        assert cache.list_courses("ING1") == [COURSES[0]]
+        assert _course_loads(fake) == 1
+
+        fake.tables["courses"].append({"id": 3, "title": "Automatique", "year": "ING3", "created_at": "2024-05-01"})
+        cache.loaded_at = time.time() - 61
+        assert len(cache.list_courses()) == 3
+        assert _course_loads(fake) == 2
+
+
+def test_invalidate_forces_reload():
+    """
+    Vérifie qu'après invalidation, le prochain accès relit la table courses.
+    """
+    fake = FakeSupabase({"courses": COURSES})
+    cache = CourseCache(ttl=600)
+
+    with patch("src.search.course_cache.get_supabase_client", return_value=fake):
+        cache.ensure_fresh()
+        fake.tables["courses"][0] = dict(COURSES[0], title="Électronique numérique")
+        assert cache.get(1)["title"] == "Électronique analogique"
+
+        cache.invalidate()
+        assert not cache.is_fresh
+        assert cache.get(1)["title"] == "Électronique numérique"
+        assert _course_loads(fake) == 2
+
+
+def test_load_error_without_previous_load_is_raised():
+    """
+    Vérifie qu'un échec du premier chargement est propagé au lieu de renvoyer une liste vide.
+    """
+    fake = FakeSupabase({"courses": COURSES})
+    fake.fail_on = lambda query: query.table == "courses"
+    cache = CourseCache(ttl=600)
+
+    with patch("src.search.course_cache.get_supabase_client", return_value=fake):
+        try:
+            cache.list_courses()
+            assert False, "Exception attendue"
+        except Exception as e:
+            assert "Erreur simulée" in str(e)
+        assert not cache.has_loaded and not cache.is_fresh
+
+
+def test_load_error_after_successful_load_serves_stale_courses():
+    """
+    Vérifie qu'un échec de rechargement conserve les cours du dernier chargement réussi.
+    """
+    fake = FakeSupabase({"courses": COURSES})
+    cache = CourseCache(ttl=600)
+
+    with patch("src.search.course_cache.get_supabase_client", return_value=fake):
+        cache.ensure_fresh()
+        cache.invalidate()
+        fake.fail_on = lambda query: query.table == "courses"
+
+        assert [course["id"] for course in cache.list_courses()] == [2, 1]
+        assert cache.get_many([1, 2]) == {1: COURSES[0], 2: COURSES[1]}
+
+
+def test_returned_courses_are_copies():
+    """
+    Vérifie que modifier un cours retourné (par exemple attaché à une page) n'altère pas le cache.
+    """
+    fake = FakeSupabase({"courses": [dict(course) for course in COURSES]})
+    cache = CourseCache(ttl=600)
+
+    with patch("src.search.course_cache.get_supabase_client", return_value=fake):
+        cache.get(1)["title"] = "Modifié"
+        cache.get_many([2])[2]["year"] = "ING3"
+        cache.list_courses()[0]["created_at"] = None
+
+        assert cache.get_many([1, 2]) == {1: COURSES[0], 2: COURSES[1]}
+
+
+if __name__ == "__main__":
+    test_ttl_expiry_reloads_courses()
+    test_invalidate_forces_reload()
+    test_load_error_without_previous_load_is_raised()
+    test_load_error_after_successful_load_serves_stale_courses()
+    test_returned_courses_are_copies()
+    print("Tous les tests du cache des cours ont réussi")
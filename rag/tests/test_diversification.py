@@ -0,0 +1,64 @@
+# tests/test_diversification.py
+import os
+import sys
+import numpy as np
+
+# Ajouter le répertoire parent au chemin Python
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.search.diversification import mmr_select
+
+
+def _candidates():
+    """
+    Deux diapositives quasi identiques très proches de la requête et une page distincte.
+    """
+    query = np.array([1.0, 0.0, 0.0], dtype=np.float32)
+    candidates = np.array([
+        [0.95, 0.31, 0.0],
+        [0.95, 0.30, 0.01],
+        [0.80, 0.0, 0.60]
+    ], dtype=np.float32)
+    return query, candidates
+
+
+def test_near_duplicates_are_skipped():
+    """
+    Vérifie qu'une diapositive dupliquée cède sa place à une page différente.
+    """
+    query, candidates = _candidates()
+    assert mmr_select(query, candidates, top_k=2, lambda_mult=0.5) == [1, 2]
+
+
+def test_lambda_one_keeps_relevance_order():
+    """
+    Vérifie qu'avec lambda = 1 l'ordre est celui de la similarité à la requête.
+    """
+    query, candidates = _candidates()
+    assert mmr_select(query, candidates, top_k=3, lambda_mult=1.0) == [1, 0, 2]
+
+
+def test_relevance_override():
+    """
+    Vérifie que la pertinence fournie (score d'un reranker) remplace le cosinus.
+    """
+    query, candidates = _candidates()
+    relevance = np.array([0.1, 0.2, 0.9], dtype=np.float32)
+    assert mmr_select(query, candidates, top_k=1, lambda_mult=1.0, relevance=relevance) == [2]
+
+
+def test_top_k_is_bounded_by_candidates():
+    """
+    Vérifie les cas limites (plus de places que de candidats, aucun candidat).
+    """
+    query, candidates = _candidates()
+    assert sorted(mmr_select(query, candidates, top_k=10)) == [0, 1, 2]
+    assert mmr_select(query, np.empty((0, 3), dtype=np.float32), top_k=3) == []
+
+
+if __name__ == "__main__":
+    test_near_duplicates_are_skipped()
+    test_lambda_one_keeps_relevance_order()
+    test_relevance_override()
+    test_top_k_is_bounded_by_candidates()
+    print("Tous les tests de diversification ont réussi")
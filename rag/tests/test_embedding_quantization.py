@@ -0,0 +1,76 @@
+# tests/test_embedding_quantization.py
+import os
+import sys
+import numpy as np
+
+# Ajouter le répertoire parent au chemin Python
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.embeddings.embedding_quantization import (
+    reduce_dimension, quantize_int8, dequantize_int8, QuantizedEmbeddingMatrix
+)
+
+
+def _random_embeddings(count: int = 500, dimension: int = 1536, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    embeddings = rng.standard_normal((count, dimension)).astype(np.float32)
+    return embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+
+
+def test_reduce_dimension_normalizes():
+    """
+    Vérifie que la troncature conserve les premières composantes et renormalise.
+    """
+    embeddings = _random_embeddings(10)
+    reduced = reduce_dimension(embeddings, 256)
+
+    assert reduced.shape == (10, 256)
+    assert np.allclose(np.linalg.norm(reduced, axis=1), 1.0, atol=1e-5)
+    assert np.allclose(reduced[0] * np.linalg.norm(embeddings[0, :256]), embeddings[0, :256], atol=1e-5)
+
+
+def test_int8_round_trip():
+    """
+    Vérifie que la quantification int8 reste proche des valeurs d'origine.
+    """
+    embeddings = _random_embeddings(20, 256)
+    codes, scales = quantize_int8(embeddings)
+
+    assert codes.dtype == np.int8
+    assert np.abs(dequantize_int8(codes, scales) - embeddings).max() < scales.max()
+
+
+def test_rescoring_recovers_exact_results():
+    """
+    Vérifie que le rescoring pleine précision retrouve le meilleur résultat exact.
+    """
+    embeddings = _random_embeddings()
+    query = embeddings[42] + 0.01 * np.random.default_rng(1).standard_normal(1536).astype(np.float32)
+
+    for precision in ("float32", "float16", "int8"):
+        matrix = QuantizedEmbeddingMatrix(embeddings, reduced_dimension=256, precision=precision)
+        indices, scores = matrix.search(query, top_k=5)
+
+        assert indices[0] == 42
+        assert len(indices) == 5
+        assert np.all(np.diff(scores) <= 0)
+
+
+def test_memory_usage_without_full_copy():
+    """
+    Vérifie que la copie int8 réduite occupe bien moins de mémoire que l'original.
+    """
+    embeddings = _random_embeddings()
+    matrix = QuantizedEmbeddingMatrix(embeddings, reduced_dimension=256, precision="int8", keep_full=False)
+    usage = matrix.memory_usage()
+
+    assert usage["full"] == 0
+    assert usage["reduced"] + usage["scales"] < embeddings.nbytes / 20
+
+
+if __name__ == "__main__":
+    test_reduce_dimension_normalizes()
+    test_int8_round_trip()
+    test_rescoring_recovers_exact_results()
+    test_memory_usage_without_full_copy()
+    print("Tous les tests de quantification ont réussi")
@@ -0,0 +1,110 @@
+# tests/test_embedding_snapshot.py
+import os
+import sys
+import struct
+import tempfile
+import numpy as np
+
+# Ajouter le répertoire parent au chemin Python
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.embeddings.embedding_snapshot import write_snapshot, read_snapshot, read_snapshot_header, SNAPSHOT_VERSION
+from src.search.vector_index import InMemoryVectorIndex
+
+
+def _random_embeddings(count: int = 50, dimension: int = 32, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((count, dimension)).astype(np.float32)
+
+
+def test_snapshot_round_trip():
+    """
+    Vérifie que le snapshot restitue les IDs et les embeddings normalisés.
+    """
+    embeddings = _random_embeddings()
+    page_ids = np.arange(100, 150)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "page_embeddings.snap")
+        write_snapshot(path, page_ids, embeddings, course_ids=page_ids % 3)
+
+        ids, matrix, header = read_snapshot(path)
+
+        assert header["version"] == SNAPSHOT_VERSION
+        assert header["course_ids"].tolist() == (page_ids % 3).tolist()
+        assert header["count"] == 50 and header["dimension"] == 32
+        assert isinstance(matrix, np.memmap) and not matrix.flags.writeable
+        assert ids.tolist() == page_ids.tolist()
+        assert np.allclose(matrix, embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True), atol=1e-6)
+        del ids, matrix
+
+
+def test_invalid_snapshot_rejected():
+    """
+    Vérifie qu'un fichier qui n'est pas un snapshot est refusé.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "invalid.snap")
+        with open(path, "wb") as invalid_file:
+            invalid_file.write(b"\0" * 128)
+
+        try:
+            read_snapshot_header(path)
+            assert False, "Un snapshot invalide aurait dû être refusé"
+        except ValueError:
+            pass
+
+
+def test_index_loads_snapshot():
+    """
+    Vérifie que l'index vectoriel utilise le snapshot et accepte les ajouts de l'ingestion.
+    """
+    embeddings = _random_embeddings()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "page_embeddings.snap")
+        page_ids = np.arange(len(embeddings))
+        write_snapshot(path, page_ids, embeddings, course_ids=page_ids % 2)
+
+        index = InMemoryVectorIndex(refresh_interval=0, snapshot_path=path)
+        index.ensure_fresh()
+
+        assert len(index) == 50
+        # Les recherches lisent le memmap partagé, sans copie propre au worker
+        assert isinstance(index.matrix, np.memmap)
+        assert index.search(embeddings[5], top_k=1, threshold=0.0)[0]["page_id"] == 5
+        assert all(result["page_id"] % 2 == 0 for result in index.search(embeddings[5], top_k=5, threshold=-1.0, course_ids=[0]))
+
+        index.add([999], _random_embeddings(1, seed=3))
+        index.refresh()
+        assert len(index) == 51
+        del index
+
+
+def test_index_rejects_float16_snapshot():
+    """
+    Vérifie qu'un ancien snapshot float16 est refusé au lieu d'être copié en float32 dans chaque worker.
+    """
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "page_embeddings.snap")
+        write_snapshot(path, np.arange(50), _random_embeddings())
+        # Code de type de la matrice dans l'en-tête (après magic, version, dimension et nombre de lignes)
+        with open(path, "r+b") as snapshot_file:
+            snapshot_file.seek(24)
+            snapshot_file.write(struct.pack("<I", 1))
+
+        index = InMemoryVectorIndex(refresh_interval=0, snapshot_path=path)
+        try:
+            index.load_snapshot(path)
+            assert False, "Un snapshot float16 aurait dû être refusé"
+        except ValueError:
+            pass
+        assert not index.is_loaded
+
+
+if __name__ == "__main__":
+    test_snapshot_round_trip()
+    test_invalid_snapshot_rejected()
+    test_index_loads_snapshot()
+    test_index_rejects_float16_snapshot()
+    print("Tous les tests de snapshot ont réussi")
@@ -0,0 +1,155 @@
+# tests/test_embedding_storage.py
+import os
+import sys
+from unittest.mock import patch
+import numpy as np
+
+# Ajouter le répertoire parent au chemin Python
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.fake_supabase import FakeSupabase
+from src.embeddings.embedding_storage import EmbeddingStorage, BULK_CHUNK_SIZE, FETCH_CHUNK_SIZE
+
+
+def _storage(fake: FakeSupabase) -> EmbeddingStorage:
+    with patch("src.embeddings.embedding_storage.get_supabase_client", return_value=fake):
+        return EmbeddingStorage()
+
+
+def _vector(value: float):
+    return [value, 0.0, 0.0]
+
+
+def test_bulk_store_deduplicates_pages_keeping_last_embedding():
+    """
+    Vérifie qu'une page fournie plusieurs fois n'est écrite qu'une fois, avec le dernier embedding.
+    """
+    fake = FakeSupabase()
+    storage = _storage(fake)
+
+    with patch("src.embeddings.embedding_storage.get_active_index", return_value=None):
+        stored_ids, failures = storage.store_page_embeddings_bulk([(1, _vector(0.1)), (2, _vector(0.2)), (1, _vector(0.9))])
+
+    assert stored_ids == [1, 2]
+    assert failures == {}
+    rows = fake.tables["page_embeddings"]
+    assert len(rows) == 2
+    assert next(row for row in rows if row["page_id"] == 1)["embedding"] == _vector(0.9)
+
+
+def test_bulk_store_upserts_in_chunks():
+    """
+    Vérifie que les lignes sont envoyées par lots de BULK_CHUNK_SIZE avec un upsert sur page_id.
+    """
+    fake = FakeSupabase()
+    storage = _storage(fake)
+    pairs = [(page_id, _vector(float(page_id))) for page_id in range(450)]
+
+    with patch("src.embeddings.embedding_storage.get_active_index", return_value=None):
+        stored_ids, failures = storage.store_page_embeddings_bulk(pairs)
+
+    upserts = fake.queries_on("page_embeddings", "upsert")
+    assert BULK_CHUNK_SIZE == 200
+    assert [len(query.rows) for query in upserts] == [200, 200, 50]
+    assert all(query.options["on_conflict"] == "page_id" for query in upserts)
+    assert stored_ids == list(range(450))
+    assert failures == {}
+
+
+def test_bulk_store_replays_failed_chunk_row_by_row():
+    """
+    Vérifie qu'un lot en échec est rejoué ligne par ligne et que seules les lignes fautives sont en erreur.
+    """
+    fake = FakeSupabase()
+    storage = _storage(fake)
+    # Le lot complet échoue, ainsi que la ligne de la page 7 seule
+    fake.fail_on = lambda query: query.operation == "upsert" and (
+        len(query.rows) > 1 or query.rows[0]["page_id"] == 7
+    )
+    pairs = [(page_id, _vector(float(page_id))) for page_id in range(5, 10)]
+
+    with patch("src.embeddings.embedding_storage.get_active_index", return_value=None):
+        stored_ids, failures = storage.store_page_embeddings_bulk(pairs)
+
+    assert [len(query.rows) for query in fake.queries_on("page_embeddings", "upsert")] == [5, 1, 1, 1, 1, 1]
+    assert stored_ids == [5, 6, 8, 9]
+    assert list(failures) == [7]
+    assert sorted(row["page_id"] for row in fake.tables["page_embeddings"]) == [5, 6, 8, 9]
+
+
+def test_bulk_store_reports_invalid_embeddings():
+    """
+    Vérifie qu'un embedding invalide est signalé en échec sans bloquer les autres pages.
+    """
+    fake = FakeSupabase()
+    storage = _storage(fake)
+
+    with patch("src.embeddings.embedding_storage.get_active_index", return_value=None):
+        stored_ids, failures = storage.store_page_embeddings_bulk([(1, _vector(0.1)), (2, ["pas un nombre"])])
+
+    assert stored_ids == [1]
+    assert list(failures) == [2]
+
+
+def test_single_store_reingests_page_without_duplicate():
+    """
+    Vérifie que réingérer une page remplace son embedding au lieu de créer une seconde ligne.
+    """
+    fake = FakeSupabase()
+    storage = _storage(fake)
+
+    with patch("src.embeddings.embedding_storage.get_active_index", return_value=None):
+        assert storage.store_page_embedding(3, _vector(0.1))
+        assert storage.store_page_embedding(3, _vector(0.5))
+
+    assert [query.options["on_conflict"] for query in fake.queries_on("page_embeddings", "upsert")] == ["page_id", "page_id"]
+    assert len(fake.tables["page_embeddings"]) == 1
+    assert fake.tables["page_embeddings"][0]["embedding"] == _vector(0.5)
+
+
+def test_get_page_embeddings_fetches_in_chunks():
+    """
+    Vérifie que les IDs sont lus par filtres `in` de FETCH_CHUNK_SIZE, sans relire les doublons.
+    """
+    fake = FakeSupabase({"page_embeddings": [
+        {"id": page_id + 1, "page_id": page_id, "embedding": str(_vector(float(page_id)))} for page_id in range(250)
+    ]})
+    storage = _storage(fake)
+
+    matrix, found = storage.get_page_embeddings(list(range(250)) + [0, 1])
+
+    assert FETCH_CHUNK_SIZE == 100
+    assert [size for query in fake.queries_on("page_embeddings") for size in query.in_sizes] == [100, 100, 50]
+    assert matrix.shape == (252, 3) and matrix.dtype == np.float32
+    assert found.all()
+
+
+def test_get_page_embeddings_aligns_rows_and_found_mask():
+    """
+    Vérifie que les lignes suivent l'ordre des IDs demandés (doublons compris) et que les pages absentes sont nulles.
+    """
+    fake = FakeSupabase({"page_embeddings": [
+        {"id": 1, "page_id": 10, "embedding": "[1.0,0.0,0.0]"},
+        {"id": 2, "page_id": 20, "embedding": [0.0, 1.0, 0.0]},
+        {"id": 3, "page_id": 30, "embedding": None}
+    ]})
+    storage = _storage(fake)
+
+    matrix, found = storage.get_page_embeddings([20, 99, 10, 20, 30])
+
+    assert found.tolist() == [True, False, True, True, False]
+    assert matrix[0].tolist() == [0.0, 1.0, 0.0]
+    assert matrix[2].tolist() == [1.0, 0.0, 0.0]
+    assert matrix[3].tolist() == matrix[0].tolist()
+    assert not matrix[1].any() and not matrix[4].any()
+
+
+if __name__ == "__main__":
+    test_bulk_store_deduplicates_pages_keeping_last_embedding()
+    test_bulk_store_upserts_in_chunks()
+    test_bulk_store_replays_failed_chunk_row_by_row()
+    test_bulk_store_reports_invalid_embeddings()
+    test_single_store_reingests_page_without_duplicate()
+    test_get_page_embeddings_fetches_in_chunks()
+    test_get_page_embeddings_aligns_rows_and_found_mask()
+    print("Tous les tests du stockage des embeddings ont réussi")
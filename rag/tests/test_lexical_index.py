@@ -0,0 +1,85 @@
+# tests/test_lexical_index.py
+import os
+import sys
+
+# Ajouter le répertoire parent au chemin Python
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.search.lexical_index import BM25Index, tokenize
+from src.search.fusion import reciprocal_rank_fusion, max_fusion_score
+
+
+def _build_index() -> BM25Index:
+    index = BM25Index(refresh_interval=0)
+    index.build(
+        [1, 2, 3, 4],
+        [
+            "Le transistor bipolaire en régime linéaire.",
+            "Le transistor 2N2222 en commutation : V_CE sat vaut 0,2 V.",
+            "Loi d'Ohm et résistances en série.",
+            "Amplificateur opérationnel LM741 monté en inverseur."
+        ],
+        course_ids=[1, 2, 1, 2]
+    )
+    return index
+
+
+def test_tokenize_keeps_component_names_and_symbols():
+    """
+    Vérifie la normalisation (accents, casse, mots vides) et la conservation des symboles.
+    """
+    assert tokenize("Le Régime du 2N2222 et V_CE") == ["regime", "2n2222", "v_ce"]
+
+
+def test_exact_component_name_ranks_first():
+    """
+    Vérifie qu'un nom exact de composant remonte la page qui le contient.
+    """
+    results = _build_index().search("transistor 2N2222", top_k=3)
+
+    assert results[0]["page_id"] == 2
+    assert [result["page_id"] for result in results] == [2, 1]
+    assert all(result["score"] > 0 for result in results)
+
+
+def test_unknown_terms_return_nothing():
+    """
+    Vérifie qu'une requête sans terme connu ne renvoie aucun résultat.
+    """
+    assert _build_index().search("thermodynamique", top_k=3) == []
+
+
+def test_course_filter():
+    """
+    Vérifie que seules les pages des cours demandés sont renvoyées.
+    """
+    results = _build_index().search("transistor", top_k=3, course_ids=[1])
+
+    assert [result["page_id"] for result in results] == [1]
+
+
+def test_reciprocal_rank_fusion_weights():
+    """
+    Vérifie la fusion par rang réciproque et l'effet des poids.
+    """
+    vector = [10, 20, 30]
+    lexical = [30, 40]
+
+    fused = [item for item, _ in reciprocal_rank_fusion([vector, lexical])]
+    assert fused[0] == 30
+    assert set(fused) == {10, 20, 30, 40}
+
+    vector_only = [item for item, _ in reciprocal_rank_fusion([vector, lexical], weights=[1.0, 0.0])]
+    assert vector_only == vector
+
+    top_score = reciprocal_rank_fusion([[1], [1]])[0][1]
+    assert abs(top_score / max_fusion_score([1.0, 1.0]) - 1.0) < 1e-9
+
+
+if __name__ == "__main__":
+    test_tokenize_keeps_component_names_and_symbols()
+    test_exact_component_name_ranks_first()
+    test_unknown_terms_return_nothing()
+    test_course_filter()
+    test_reciprocal_rank_fusion_weights()
+    print("Tous les tests de l'index lexical ont réussi")
@@ -0,0 +1,123 @@
+# tests/test_merge_pages.py
+import os
+import sys
+
+# Ajouter le répertoire parent au chemin Python
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.search.rag_engine import RAGEngine, CONTEXT_PAGE_FACTOR, RELATED_PAGE_FACTOR
+
+ELECTRONIQUE = {"id": 1, "name": "Électronique", "year": "ING1"}
+SIGNAL = {"id": 2, "name": "Signal", "year": "ING2"}
+
+
+def _page(page_id: int, page_number: int, course_id: int = 1, **fields):
+    return {"id": page_id, "page_number": page_number, "course_id": course_id, "content_text": f"Page {page_number}", **fields}
+
+
+def _engine() -> RAGEngine:
+    # merge_pages n'utilise aucun service : pas besoin de Supabase ni d'API
+    return RAGEngine.__new__(RAGEngine)
+
+
+def test_overlapping_windows_keep_each_page_once_with_best_score():
+    """
+    Vérifie qu'une page présente dans plusieurs fenêtres n'apparaît qu'une fois, avec son meilleur score.
+    """
+    results = [
+        _page(12, 12, similarity=0.9, courses=ELECTRONIQUE),
+        _page(14, 14, similarity=0.5, courses=ELECTRONIQUE)
+    ]
+    context_pages = {
+        12: [_page(11, 11), _page(12, 12), _page(13, 13)],
+        14: [_page(13, 13), _page(14, 14), _page(15, 15)]
+    }
+
+    merged = _engine().merge_pages(results, context_pages)
+
+    assert [page["id"] for page in merged] == [12, 11, 13, 14, 15]
+    by_id = {page["id"]: page for page in merged}
+    assert by_id[13]["similarity"] == 0.9 * CONTEXT_PAGE_FACTOR
+    assert by_id[15]["similarity"] == 0.5 * CONTEXT_PAGE_FACTOR
+    assert by_id[13]["course"] == ELECTRONIQUE and by_id[13]["is_context"]
+
+
+def test_result_page_stays_a_result_when_also_context():
+    """
+    Vérifie qu'un résultat apporté aussi comme contexte garde le meilleur score et reste un résultat.
+    """
+    results = [
+        _page(20, 20, similarity=0.8, courses=ELECTRONIQUE),
+        _page(21, 21, similarity=0.4, courses=ELECTRONIQUE)
+    ]
+    context_pages = {20: [_page(21, 21)], 21: [_page(20, 20)]}
+
+    merged = _engine().merge_pages(results, context_pages)
+
+    assert [(page["id"], page["is_context"]) for page in merged] == [(20, False), (21, False)]
+    assert merged[1]["similarity"] == 0.8 * CONTEXT_PAGE_FACTOR
+
+
+def test_related_pages_rank_after_physical_neighbours():
+    """
+    Vérifie le score réduit des pages apparentées, leur propre cours et l'ordre à score égal.
+    """
+    results = [_page(30, 5, similarity=1.0, courses=ELECTRONIQUE), _page(40, 2, course_id=2, similarity=0.6, courses=SIGNAL)]
+    context_pages = {30: [_page(31, 6)]}
+    related_pages = {30: [_page(50, 9, course_id=2, course=SIGNAL), _page(41, 3, course_id=2, course=SIGNAL)]}
+
+    merged = _engine().merge_pages(results, context_pages, related_pages)
+
+    assert [page["id"] for page in merged] == [30, 31, 40, 41, 50]
+    assert merged[3]["similarity"] == merged[4]["similarity"] == RELATED_PAGE_FACTOR
+    assert merged[4]["course"] == SIGNAL
+    assert merged[2]["similarity"] == 0.6
+
+
+class _StubSearchService:
+    def __init__(self, results_by_query):
+        self.results_by_query = results_by_query
+
+    def search(self, query, **kwargs):
+        return self.results_by_query[query]
+
+    def search_many(self, queries, **kwargs):
+        return [self.results_by_query[query] for query in queries]
+
+
+class _StubExpander:
+    def expand(self, query):
+        return [query, "variante A", "variante B"]
+
+
+class _StubRetriever:
+    def prefetch_courses(self):
+        return 0
+
+
+def test_pages_found_by_several_variants_are_merged_once():
+    """
+    Vérifie qu'une page trouvée par plusieurs variantes n'apparaît qu'une fois, classée par score fusionné.
+    """
+    engine = _engine()
+    engine.search_service = _StubSearchService({
+        "transistor en commutation": [_page(1, 1, similarity=0.9), _page(2, 2, similarity=0.7)],
+        "variante A": [_page(3, 3, similarity=0.8), _page(2, 2, similarity=0.75)],
+        "variante B": [_page(2, 2, similarity=0.6)]
+    })
+    engine.query_expander = _StubExpander()
+    engine.content_retriever = _StubRetriever()
+
+    results = engine._expanded_search("transistor en commutation", top_k=5, timings={})
+
+    assert [result["id"] for result in results] == [2, 1, 3]
+    assert [result["matched_queries"] for result in results] == [3, 1, 1]
+    assert all(0.0 < result["similarity"] <= 1.0 for result in results)
+
+
+if __name__ == "__main__":
+    test_overlapping_windows_keep_each_page_once_with_best_score()
+    test_result_page_stays_a_result_when_also_context()
+    test_related_pages_rank_after_physical_neighbours()
+    test_pages_found_by_several_variants_are_merged_once()
+    print("Tous les tests de fusion des pages de contexte ont réussi")
@@ -0,0 +1,101 @@
+# tests/test_neighbour_graph.py
+import os
+import sys
+import tempfile
+import numpy as np
+
+# Ajouter le répertoire parent au chemin Python
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.search.neighbour_graph import NeighbourGraph, SEMANTIC_EXCLUDE_WINDOW
+
+
+def _graph(k: int = 3) -> NeighbourGraph:
+    """
+    Deux cours de 10 pages ; la page 3 du cours 1 et la page 8 du cours 2 traitent du même sujet.
+    """
+    rng = np.random.default_rng(0)
+    embeddings = rng.standard_normal((20, 32)).astype(np.float32)
+    embeddings[17] = embeddings[2] + 0.01
+    page_ids = np.arange(100, 120)
+    course_ids = np.repeat([1, 2], 10)
+    page_numbers = np.tile(np.arange(1, 11), 2)
+
+    # Ordre d'entrée mélangé : le graphe range lui-même les pages par cours et numéro
+    order = rng.permutation(20)
+    graph = NeighbourGraph()
+    graph.build(page_ids[order], course_ids[order], page_numbers[order], embeddings[order], k=k)
+    return graph
+
+
+def test_physical_neighbours_stay_in_course():
+    """
+    Vérifie les fenêtres physiques, y compris en bord de cours.
+    """
+    graph = _graph()
+
+    assert graph.physical_neighbours(104, 1) == [103, 104, 105]
+    assert graph.physical_neighbours(109, 2) == [107, 108, 109]
+    assert graph.physical_neighbours(110, 1) == [110, 111]
+    assert graph.physical_neighbours(999, 1) == []
+
+
+def test_physical_neighbours_with_repeated_numbers_and_pages_without_embedding():
+    """
+    Vérifie que la fenêtre porte sur les numéros de page (numéros répétés compris)
+    et que les pages sans embedding restent des voisines physiques.
+    """
+    page_ids = np.array([200, 201, 202, 203, 204, 205])
+    course_ids = np.array([1, 1, 1, 1, 1, 1])
+    # Deux diapositives numérotées 2 et deux numérotées 3
+    page_numbers = np.array([1, 2, 2, 3, 3, 4])
+    embedded = np.array([True, True, False, True, False, True])
+    embeddings = np.random.default_rng(1).standard_normal((6, 8)).astype(np.float32)
+    embeddings[~embedded] = 0.0
+
+    graph = NeighbourGraph()
+    graph.build(page_ids, course_ids, page_numbers, embeddings, k=2, embedded=embedded)
+
+    assert graph.physical_neighbours(203, 1) == [201, 202, 203, 204, 205]
+    assert graph.physical_neighbours(202, 0) == [201, 202]
+    assert graph.semantic_neighbours(202) == []
+    assert all(page_id not in (202, 204) for page_id, _ in graph.semantic_neighbours(200))
+
+
+def test_semantic_neighbours_skip_physical_neighbours():
+    """
+    Vérifie que la page la plus proche d'un autre cours est trouvée et que les voisines physiques sont exclues.
+    """
+    graph = _graph()
+    neighbours = graph.semantic_neighbours(102)
+
+    assert neighbours[0][0] == 117
+    assert neighbours[0][1] > 0.99
+    assert len(neighbours) == 3
+    assert all(abs(page_id - 102) > SEMANTIC_EXCLUDE_WINDOW or page_id >= 110 for page_id, _ in neighbours)
+    assert [page_id for page_id, _ in graph.semantic_neighbours(102, min_similarity=0.5)] == [117]
+
+
+def test_save_and_load():
+    """
+    Vérifie qu'un graphe rechargé donne les mêmes voisinages.
+    """
+    graph = _graph()
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "graph.npz")
+        graph.save(path)
+
+        loaded = NeighbourGraph(path=path)
+        loaded.ensure_fresh()
+
+    assert len(loaded) == 20 and 117 in loaded
+    assert loaded.physical_neighbours(104, 1) == graph.physical_neighbours(104, 1)
+    assert loaded.semantic_neighbours(102) == graph.semantic_neighbours(102)
+
+
+if __name__ == "__main__":
+    test_physical_neighbours_stay_in_course()
+    test_physical_neighbours_with_repeated_numbers_and_pages_without_embedding()
+    test_semantic_neighbours_skip_physical_neighbours()
+    test_save_and_load()
+    print("Tous les tests du graphe de voisinage ont réussi")
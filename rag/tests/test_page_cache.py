@@ -0,0 +1,86 @@
+# tests/test_page_cache.py
+import os
+import sys
+
+# Ajouter le répertoire parent au chemin Python
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.search.page_cache import PageCache, page_size
+
+
+def _page(page_id: int, page_number: int, course_id: int = 1, text_size: int = 100) -> dict:
+    return {
+        "id": page_id,
+        "page_number": page_number,
+        "course_id": course_id,
+        "image_path": f"page_{page_id}.png",
+        "content_text": "x" * text_size
+    }
+
+
+def test_eviction_is_bounded_by_text_size():
+    """
+    Vérifie que le cache évince les pages les moins récemment utilisées au-delà de la taille maximale.
+    """
+    cache = PageCache(max_bytes=3 * page_size(_page(0, 0)))
+    cache.put([_page(1, 1), _page(2, 2), _page(3, 3)])
+
+    # Page 1 utilisée récemment : c'est la page 2 qui doit être évincée
+    cache.get_many([1])
+    cache.put([_page(4, 4)])
+
+    found, missing = cache.get_many([1, 2, 3, 4])
+    assert sorted(found) == [1, 3, 4]
+    assert missing == [2]
+    assert cache.current_bytes <= cache.max_bytes
+    assert cache.stats()["evictions"] == 1
+
+
+def test_oversized_page_is_not_cached():
+    """
+    Vérifie qu'une page plus grande que le cache entier n'évince pas tout le reste.
+    """
+    cache = PageCache(max_bytes=1000)
+    cache.put([_page(1, 1), _page(2, 2, text_size=5000)])
+
+    assert len(cache) == 1
+    assert cache.get_many([2])[1] == [2]
+
+
+def test_positions_and_course_invalidation():
+    """
+    Vérifie la recherche par (cours, numéro de page) et l'invalidation d'un cours.
+    """
+    cache = PageCache()
+    cache.put([_page(11, 1), _page(12, 2), _page(21, 1, course_id=2)])
+
+    found, missing = cache.get_positions(1, [1, 2, 3])
+    assert [page["id"] for page in found.values()] == [11, 12]
+    assert missing == [3]
+
+    cache.invalidate_course(1)
+    assert cache.get_positions(1, [1])[1] == [1]
+    assert cache.get_positions(2, [1])[0][1]["id"] == 21
+
+
+def test_stats_count_hits_and_misses():
+    """
+    Vérifie les compteurs exposés par stats().
+    """
+    cache = PageCache()
+    cache.put([_page(1, 1)])
+    cache.get_many([1, 2])
+    cache.get_many([1])
+
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+
+
+if __name__ == "__main__":
+    test_eviction_is_bounded_by_text_size()
+    test_oversized_page_is_not_cached()
+    test_positions_and_course_invalidation()
+    test_stats_count_hits_and_misses()
+    print("Tous les tests du cache des pages ont réussi")
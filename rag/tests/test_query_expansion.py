@@ -0,0 +1,63 @@
+# tests/test_query_expansion.py
+import os
+import sys
+
+# Ajouter le répertoire parent au chemin Python
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.search.query_expansion import QueryExpander, parse_variants
+
+
+class StaticClient:
+    """
+    Client minimal qui répond toujours le même contenu et compte les appels.
+    """
+
+    def __init__(self, content: str):
+        self.content = content
+        self.calls = 0
+
+    def generate_response(self, messages, model=None, temperature=0.7, max_tokens=1000):
+        self.calls += 1
+        return {"choices": [{"message": {"content": self.content}}]}
+
+
+def test_parse_variants():
+    """
+    Vérifie l'extraction des variantes depuis une liste JSON ou une liste en texte libre.
+    """
+    assert parse_variants('Voici : ["loi d\'Ohm", "tension et courant"]') == ["loi d'Ohm", "tension et courant"]
+    assert parse_variants("1. loi d'Ohm\n- tension et courant\n") == ["loi d'Ohm", "tension et courant"]
+
+
+def test_expand_deduplicates_limits_and_caches():
+    """
+    Vérifie que l'original reste en tête, que les doublons sont retirés et que l'expansion est en cache.
+    """
+    client = StaticClient('["Comment marche un transistor ?", "rôle de la base", "gain en courant", "saturation"]')
+    expander = QueryExpander(client=client, max_variants=2)
+
+    expanded = expander.expand("Comment marche un transistor ?")
+    assert expanded == ["Comment marche un transistor ?", "rôle de la base", "gain en courant"]
+    assert expander.expand("  comment marche un TRANSISTOR ? ") == expanded
+    assert client.calls == 1
+
+
+def test_expand_failure_returns_original():
+    """
+    Vérifie qu'une réponse invalide du modèle laisse la requête seule, sans mise en cache.
+    """
+    class FailingClient:
+        def generate_response(self, *args, **kwargs):
+            raise RuntimeError("indisponible")
+
+    expander = QueryExpander(client=FailingClient())
+    assert expander.expand("diode Zener") == ["diode Zener"]
+    assert len(expander._cache) == 0
+
+
+if __name__ == "__main__":
+    test_parse_variants()
+    test_expand_deduplicates_limits_and_caches()
+    test_expand_failure_returns_original()
+    print("Tous les tests de l'expansion de requête ont réussi")
@@ -0,0 +1,100 @@
+# tests/test_query_grouping.py
+import os
+import sys
+
+# Ajouter le répertoire parent au chemin Python
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.search.search_optimizations import group_similar_queries, process_queries_in_batch, GROUPING_BLOCK_SIZE
+
+QUERIES = [
+    "Qu'est-ce qu'un condensateur ?",
+    "qu est ce qu un condensateur",
+    "Comment fonctionne un transistor ?",
+    "Expliquez les circuits RC",
+    "Comment fonctionne un transistor?",
+    "Expliquez les circuits RL"
+]
+
+
+def test_groups_near_identical_queries():
+    """
+    Vérifie le regroupement des variantes de casse et de ponctuation, sans confondre RC et RL.
+    """
+    assert group_similar_queries(QUERIES) == [[0, 1], [2, 4], [3], [5]]
+    assert group_similar_queries(QUERIES, threshold=0.95) == [[0, 1], [2, 4], [3], [5]]
+    assert group_similar_queries([]) == []
+
+
+def test_queries_differing_by_a_number_are_not_grouped():
+    """
+    Vérifie que deux requêtes qui ne diffèrent que par un nombre restent séparées, même en regroupement approché.
+    """
+    queries = ["Résumé du chapitre 2 sur les diodes", "Résumé du chapitre 3 sur les diodes"]
+
+    assert group_similar_queries(queries) == [[0], [1]]
+    assert group_similar_queries(queries, threshold=0.5) == [[0], [1]]
+
+
+def test_fuzzy_grouping_is_opt_in():
+    """
+    Vérifie qu'une faute de frappe n'est regroupée que si le regroupement approché est demandé.
+    """
+    queries = ["Comment fonctionne un transistor bipolaire", "Comment fonctionne un transistor bipolair"]
+
+    assert group_similar_queries(queries) == [[0], [1]]
+    assert group_similar_queries(queries, threshold=0.9) == [[0, 1]]
+
+
+def test_groups_across_blocks():
+    """
+    Vérifie que des doublons approchés séparés par plus d'un bloc de calcul sont regroupés.
+    """
+    queries = [f"question numero {k} sur le chapitre {k * 7}" for k in range(GROUPING_BLOCK_SIZE + 10)]
+    queries.append("Questions numéro 3 sur le chapitre 21 !")
+
+    groups = group_similar_queries(queries, threshold=0.9)
+
+    assert [3, len(queries) - 1] in groups
+    assert len(groups) == len(queries) - 1
+
+
+def test_batch_processes_one_query_per_group():
+    """
+    Vérifie que seules les représentantes sont traitées et que les résultats sont recopiés dans l'ordre.
+    """
+    processed = []
+
+    def processor(batch):
+        processed.extend(batch)
+        return [f"résultat: {query}" for query in batch]
+
+    results = process_queries_in_batch(QUERIES, batch_size=10, processor_func=processor)
+
+    assert processed == [QUERIES[0], QUERIES[2], QUERIES[3], QUERIES[5]]
+    assert results[1] == results[0] == f"résultat: {QUERIES[0]}"
+    assert results[4] == f"résultat: {QUERIES[2]}"
+    assert len(process_queries_in_batch(QUERIES, processor_func=processor, group_similar=False)) == len(QUERIES)
+
+
+def test_grouped_queries_get_their_own_result():
+    """
+    Vérifie que chaque requête d'un groupe reçoit sa propre copie du résultat de la représentante.
+    """
+    def processor(batch):
+        return [{"query": query, "results": [{"page_id": 1}]} for query in batch]
+
+    results = process_queries_in_batch(QUERIES[:2], processor_func=processor)
+    results[1]["results"][0]["page_id"] = 2
+
+    assert results[0] == {"query": QUERIES[0], "results": [{"page_id": 1}]}
+
+
+if __name__ == "__main__":
+    test_groups_near_identical_queries()
+    test_queries_differing_by_a_number_are_not_grouped()
+    test_fuzzy_grouping_is_opt_in()
+    test_groups_across_blocks()
+    test_batch_processes_one_query_per_group()
+    test_grouped_queries_get_their_own_result()
+    print("Tous les tests de regroupement des requêtes ont réussi")
@@ -0,0 +1,68 @@
+# tests/test_reranker.py
+import os
+import sys
+import numpy as np
+
+# Ajouter le répertoire parent au chemin Python
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.search.lexical_index import BM25Index
+from src.search.reranker import LexicalOverlapReranker, Reranker, get_reranker, register_reranker
+
+
+def _index() -> BM25Index:
+    index = BM25Index(refresh_interval=0)
+    index.build(
+        [30, 10, 20],
+        [
+            "Le transistor 2N2222 en commutation",
+            "Polarisation du transistor bipolaire",
+            "Loi d'Ohm et résistances"
+        ]
+    )
+    return index
+
+
+def test_term_coverage():
+    """
+    Vérifie la part des termes de la requête présents dans chaque page (NaN pour une page non indexée).
+    """
+    coverage = _index().term_coverage("transistor 2N2222", [10, 30, 20, 99])
+
+    assert coverage[:3].tolist() == [0.5, 1.0, 0.0]
+    assert np.isnan(coverage[3])
+
+
+def test_lexical_reranker_scores_candidates():
+    """
+    Vérifie que le reranker lexical favorise la page contenant le nom exact du composant.
+    """
+    reranker = LexicalOverlapReranker(lexical_index=_index())
+    scores = reranker.score("transistor 2N2222", None, [{"page_id": 10}, {"page_id": 30}])
+
+    assert scores[1] > scores[0]
+    assert np.isnan(reranker.score(None, [0.1], [{"page_id": 10}])).all()
+
+
+def test_registry():
+    """
+    Vérifie l'enregistrement d'un reranker personnalisé et le refus d'un nom inconnu.
+    """
+    class ConstantReranker(Reranker):
+        name = "constant"
+
+        def score(self, query, query_embedding, candidates):
+            return np.ones(len(candidates), dtype=np.float32)
+
+    register_reranker("constant", ConstantReranker)
+
+    assert isinstance(get_reranker("constant"), ConstantReranker)
+    assert get_reranker("inconnu") is None
+    assert get_reranker("") is None
+
+
+if __name__ == "__main__":
+    test_term_coverage()
+    test_lexical_reranker_scores_candidates()
+    test_registry()
+    print("Tous les tests du reranker ont réussi")
@@ -0,0 +1,68 @@
+# tests/test_result_cache.py
+import os
+import sys
+import threading
+
+# Ajouter le répertoire parent au chemin Python
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.search.result_cache import SearchResultCache, normalize_query
+
+
+def test_key_uses_normalized_query():
+    """
+    Vérifie que la casse et les espaces n'influent pas sur la clé, contrairement aux paramètres.
+    """
+    assert normalize_query("  Loi   d'OHM ") == "loi d'ohm"
+    key = SearchResultCache.make_key("Loi d'Ohm", top_k=5, threshold=0.5)
+    assert key == SearchResultCache.make_key("loi  d'ohm", threshold=0.5, top_k=5)
+    assert key != SearchResultCache.make_key("loi d'ohm", top_k=3, threshold=0.5)
+
+
+def test_version_bump_invalidates_entries():
+    """
+    Vérifie qu'une écriture dans le corpus périme les résultats, y compris ceux d'une recherche en cours.
+    """
+    cache = SearchResultCache(max_entries=10, ttl=0)
+    key = cache.make_key("condensateur", top_k=5)
+
+    cache.put(key, [{"id": 1, "similarity": 0.9}], cache.version)
+    results = cache.get(key)
+    assert results == [{"id": 1, "similarity": 0.9}]
+    results[0]["similarity"] = 0.0
+    assert cache.get(key)[0]["similarity"] == 0.9
+
+    started_version = cache.version
+    cache.bump_version()
+    assert cache.get(key) is None
+    cache.put(key, [{"id": 2}], started_version)
+    assert cache.get(key) is None
+
+
+def test_lru_eviction_and_concurrency():
+    """
+    Vérifie la borne du nombre d'entrées sous accès concurrents.
+    """
+    cache = SearchResultCache(max_entries=50, ttl=0)
+
+    def worker(offset: int):
+        for k in range(200):
+            key = cache.make_key(f"requête {offset + k}")
+            cache.put(key, [{"id": k}], cache.version)
+            cache.get(key)
+
+    threads = [threading.Thread(target=worker, args=(n * 1000,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(cache) == 50
+    assert cache.stats()["hits"] + cache.stats()["misses"] == 800
+
+
+if __name__ == "__main__":
+    test_key_uses_normalized_query()
+    test_version_bump_invalidates_entries()
+    test_lru_eviction_and_concurrency()
+    print("Tous les tests du cache des résultats ont réussi")
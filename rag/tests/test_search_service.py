@@ -0,0 +1,230 @@
+# tests/test_search_service.py
+import os
+import sys
+import time
+import threading
+import numpy as np
+
+# Ajouter le répertoire parent au chemin Python
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from tests.fake_supabase import FakeSupabase
+from src.search.search_service import SearchService, FETCH_CHUNK_SIZE, RERANK_WORKERS
+from src.search.fusion import max_fusion_score, RRF_K
+from src.search.reranker import Reranker
+
+VECTOR_MATCHES = [{"page_id": 1, "similarity": 0.82}, {"page_id": 2, "similarity": 0.74}]
+
+
+def _service(hybrid: bool = True, supabase: FakeSupabase = None) -> SearchService:
+    # Sans passer par __init__ : ni API d'embedding ni index à charger
+    service = SearchService.__new__(SearchService)
+    service.supabase = supabase
+    service.vector_weight = 1.0
+    service.lexical_weight = 1.0 if hybrid else 0.0
+    service.lexical_index = object() if hybrid else None
+    service.reranker = None
+    service.mmr_lambda = 1.0
+    return service
+
+
+def test_fusion_score_does_not_depend_on_lexical_hits():
+    """
+    Vérifie qu'en mode hybride, similarity est le score fusionné même si la branche lexicale est vide.
+    """
+    service = _service()
+    without_lexical = service._fuse(VECTOR_MATCHES, [], top_k=5)
+    with_lexical = service._fuse(VECTOR_MATCHES, [{"page_id": 3, "score": 7.5}], top_k=5)
+
+    expected_first = (1.0 / (RRF_K + 1)) / max_fusion_score([1.0, 1.0])
+    assert without_lexical[0]["similarity"] == with_lexical[0]["similarity"] == expected_first
+    assert [match["vector_similarity"] for match in without_lexical] == [0.82, 0.74]
+    assert all(match["lexical_score"] is None for match in without_lexical)
+
+
+def test_fusion_keeps_cosine_and_lexical_score_per_branch():
+    """
+    Vérifie que le cosinus et le score BM25 sont conservés séparément du score fusionné.
+    """
+    fused = _service()._fuse(VECTOR_MATCHES, [{"page_id": 2, "score": 9.0}, {"page_id": 3, "score": 4.0}], top_k=5)
+
+    assert [match["page_id"] for match in fused] == [2, 1, 3]
+    assert fused[0]["vector_similarity"] == 0.74 and fused[0]["lexical_score"] == 9.0
+    assert fused[2]["vector_similarity"] is None and fused[2]["lexical_score"] == 4.0
+    assert all(0.0 < match["similarity"] <= 1.0 for match in fused)
+
+
+def test_fusion_without_lexical_branch_keeps_cosine():
+    """
+    Vérifie que sans branche lexicale, similarity reste le cosinus de la recherche vectorielle.
+    """
+    assert _service(hybrid=False)._fuse(VECTOR_MATCHES, [], top_k=1) == VECTOR_MATCHES[:1]
+
+
+def _pages(count: int):
+    return [
+        {
+            "id": page_id,
+            "page_number": page_id,
+            "image_path": f"data/images/page_{page_id}.png",
+            "content_text": f"Contenu de la page {page_id}",
+            "course_id": 1,
+            "courses": {"id": 1, "name": "Électronique", "year": "ING1"}
+        }
+        for page_id in range(1, count + 1)
+    ]
+
+
+def test_page_details_keep_ranking_and_scores():
+    """
+    Vérifie que les détails suivent le classement, recopient les scores et ignorent les pages absentes.
+    """
+    fake = FakeSupabase({"pages": _pages(5)})
+    matches = [
+        {"page_id": 4, "similarity": 0.9, "vector_similarity": 0.8, "lexical_score": 3.0},
+        {"page_id": 99, "similarity": 0.85},
+        {"page_id": 2, "similarity": 0.7, "rerank_score": 0.4},
+        {"page_id": 5, "similarity": 0.7}
+    ]
+
+    details = _service(supabase=fake)._with_page_details(matches, timings={})
+
+    assert [page["id"] for page in details] == [4, 2, 5]
+    assert details[0]["vector_similarity"] == 0.8 and details[0]["lexical_score"] == 3.0
+    assert details[1]["rerank_score"] == 0.4 and "rerank_score" not in details[2]
+    assert details[0]["courses"]["name"] == "Électronique"
+    assert [query.in_sizes for query in fake.queries_on("pages")] == [[4]]
+
+
+def test_page_details_copy_rows_for_repeated_pages():
+    """
+    Vérifie qu'une page présente deux fois reçoit ses propres scores sans modifier la ligne partagée.
+    """
+    pages_by_id = {page["id"]: page for page in _pages(2)}
+    matches = [{"page_id": 1, "similarity": 0.9}, {"page_id": 1, "similarity": 0.6}]
+
+    details = _service()._with_page_details(matches, pages_by_id=pages_by_id)
+
+    assert [page["similarity"] for page in details] == [0.9, 0.6]
+    assert "similarity" not in pages_by_id[1]
+
+
+def test_page_details_reuse_known_pages_without_query():
+    """
+    Vérifie que les détails déjà récupérés pour un lot de recherches ne sont pas relus.
+    """
+    fake = FakeSupabase({"pages": _pages(3)})
+    pages_by_id = {page["id"]: page for page in _pages(3)}
+
+    details = _service(supabase=fake)._with_page_details([{"page_id": 3, "similarity": 0.5}], pages_by_id=pages_by_id)
+
+    assert [page["id"] for page in details] == [3]
+    assert fake.queries == []
+
+
+def test_page_details_fetch_in_chunks():
+    """
+    Vérifie que les détails de nombreuses pages sont lus par filtres `in` de FETCH_CHUNK_SIZE IDs.
+    """
+    fake = FakeSupabase({"pages": _pages(250)})
+
+    pages_by_id = _service(supabase=fake)._get_pages_details(list(range(1, 251)) + [1, 2])
+
+    assert [size for query in fake.queries_on("pages") for size in query.in_sizes] == [FETCH_CHUNK_SIZE, FETCH_CHUNK_SIZE, 50]
+    assert sorted(pages_by_id) == list(range(1, 251))
+
+
+class _StubVectorIndex:
+    def __init__(self, vectors_by_page):
+        self.vectors_by_page = vectors_by_page
+
+    def get_vectors(self, page_ids):
+        vectors = np.asarray([self.vectors_by_page[page_id] for page_id in page_ids], dtype=np.float32)
+        return vectors, np.ones(len(page_ids), dtype=bool)
+
+
+def test_lexical_only_page_survives_mmr():
+    """
+    Vérifie que la MMR classe par score fusionné : une page trouvée par la seule recherche lexicale reste retenue.
+    """
+    service = _service()
+    service.vector_index = _StubVectorIndex({
+        1: [0.95, 0.31, 0.0],
+        2: [0.94, 0.33, 0.0],
+        # Page au faible cosinus, trouvée par BM25 (nom exact de composant)
+        3: [0.10, 0.0, 0.99]
+    })
+    matches = [
+        {"page_id": 1, "similarity": 0.75, "vector_similarity": 0.95},
+        {"page_id": 3, "similarity": 0.70, "vector_similarity": None, "lexical_score": 8.0},
+        {"page_id": 2, "similarity": 0.50, "vector_similarity": 0.94}
+    ]
+
+    selected = service._diversify([1.0, 0.0, 0.0], matches, top_k=2, mmr_lambda=0.7)
+
+    assert [match["page_id"] for match in selected] == [1, 3]
+
+
+def test_page_details_keep_mmr_order():
+    """
+    Vérifie que les détails conservent l'ordre de sélection de la MMR au lieu de retrier par similarité.
+    """
+    pages_by_id = {page["id"]: page for page in _pages(3)}
+    matches = [{"page_id": 1, "similarity": 0.9}, {"page_id": 3, "similarity": 0.6}, {"page_id": 2, "similarity": 0.8}]
+
+    details = _service()._with_page_details(matches, pages_by_id=pages_by_id)
+
+    assert [page["id"] for page in details] == [1, 3, 2]
+
+
+class _BlockingReranker(Reranker):
+    name = "bloquant"
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.calls = 0
+
+    def score(self, query, query_embedding, candidates):
+        self.calls += 1
+        self.release.wait(5)
+        return np.linspace(0.0, 1.0, len(candidates), dtype=np.float32)
+
+
+def test_rerank_skipped_while_workers_busy():
+    """
+    Vérifie qu'aucun reranking n'est soumis tant que les précédents, hors budget, tournent encore.
+    """
+    service = _service(hybrid=False)
+    service.reranker = _BlockingReranker()
+    service.rerank_weight = 1.0
+    service.rerank_budget = 0.01
+
+    for _ in range(RERANK_WORKERS):
+        assert service._rerank(None, [0.1], VECTOR_MATCHES) == VECTOR_MATCHES
+    assert service._rerank(None, [0.1], VECTOR_MATCHES) == VECTOR_MATCHES
+    assert service.reranker.calls == RERANK_WORKERS
+
+    # Les workers libérés, le reranking reprend
+    service.reranker.release.set()
+    service.rerank_budget = 1.0
+    deadline = time.monotonic() + 5
+    reranked = service._rerank(None, [0.1], VECTOR_MATCHES)
+    while service.reranker.calls == RERANK_WORKERS and time.monotonic() < deadline:
+        time.sleep(0.01)
+        reranked = service._rerank(None, [0.1], VECTOR_MATCHES)
+
+    assert [match["page_id"] for match in reranked] == [2, 1]
+
+
+if __name__ == "__main__":
+    test_fusion_score_does_not_depend_on_lexical_hits()
+    test_fusion_keeps_cosine_and_lexical_score_per_branch()
+    test_fusion_without_lexical_branch_keeps_cosine()
+    test_page_details_keep_ranking_and_scores()
+    test_page_details_copy_rows_for_repeated_pages()
+    test_page_details_reuse_known_pages_without_query()
+    test_page_details_fetch_in_chunks()
+    test_lexical_only_page_survives_mmr()
+    test_page_details_keep_mmr_order()
+    test_rerank_skipped_while_workers_busy()
+    print("Tous les tests du service de recherche ont réussi")
@@ -0,0 +1,55 @@
+# tests/test_streaming.py
+import os
+import sys
+import json
+
+# Ajouter le répertoire parent au chemin Python
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.api.openrouter_client import iter_sse_content
+
+
+def _event(payload) -> str:
+    return "data: " + json.dumps(payload)
+
+
+def test_iter_sse_content_yields_deltas_until_done():
+    """
+    Vérifie que les fragments sont extraits dans l'ordre, commentaires et événements vides ignorés.
+    """
+    lines = [
+        ": OPENROUTER PROCESSING",
+        "",
+        _event({"choices": [{"delta": {"role": "assistant"}}]}),
+        _event({"choices": [{"delta": {"content": "Le condensateur "}}]}),
+        "",
+        _event({"choices": [{"delta": {"content": "stocke l'énergie."}}]}),
+        "data: [DONE]",
+        _event({"choices": [{"delta": {"content": "ignoré"}}]})
+    ]
+
+    assert list(iter_sse_content(lines)) == ["Le condensateur ", "stocke l'énergie."]
+
+
+def test_iter_sse_content_raises_on_stream_error():
+    """
+    Vérifie qu'une erreur signalée au milieu du flux interrompt la génération.
+    """
+    lines = [
+        _event({"choices": [{"delta": {"content": "Début"}}]}),
+        _event({"error": {"message": "Fournisseur indisponible"}})
+    ]
+    stream = iter_sse_content(lines)
+
+    assert next(stream) == "Début"
+    try:
+        next(stream)
+        assert False, "RuntimeError attendue"
+    except RuntimeError as e:
+        assert "Fournisseur indisponible" in str(e)
+
+
+if __name__ == "__main__":
+    test_iter_sse_content_yields_deltas_until_done()
+    test_iter_sse_content_raises_on_stream_error()
+    print("Tous les tests du streaming ont réussi")
@@ -0,0 +1,194 @@
+# tests/test_vector_index.py
+import os
+import sys
+import threading
+import numpy as np
+
+# Ajouter le répertoire parent au chemin Python
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.search.vector_index import InMemoryVectorIndex, top_k_indices
+
+
+def _random_embeddings(count: int = 200, dimension: int = 64, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return rng.standard_normal((count, dimension)).astype(np.float32)
+
+
+def test_search_matches_exact_cosine():
+    """
+    Vérifie que le top-k de l'index correspond à un calcul de cosinus exact.
+    """
+    embeddings = _random_embeddings()
+    page_ids = np.arange(1000, 1000 + len(embeddings))
+    index = InMemoryVectorIndex(refresh_interval=0)
+    index.load(page_ids, embeddings)
+
+    query = embeddings[7] + 0.1
+    results = index.search(query, top_k=5, threshold=-1.0)
+
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:5]
+
+    assert [result["page_id"] for result in results] == (page_ids[expected]).tolist()
+    assert results[0]["page_id"] == 1007
+
+
+def test_threshold_filters_results():
+    """
+    Vérifie que les résultats sous le seuil de similarité sont exclus.
+    """
+    embeddings = _random_embeddings()
+    index = InMemoryVectorIndex(refresh_interval=0)
+    index.load(np.arange(len(embeddings)), embeddings)
+
+    results = index.search(embeddings[3], top_k=10, threshold=0.99)
+
+    assert [result["page_id"] for result in results] == [3]
+
+
+def test_add_inserts_and_replaces():
+    """
+    Vérifie que l'ajout depuis l'ingestion insère les nouvelles pages et remplace les existantes.
+    """
+    embeddings = _random_embeddings(10)
+    index = InMemoryVectorIndex(refresh_interval=0)
+    index.load(np.arange(10), embeddings)
+
+    new_vectors = _random_embeddings(2, seed=1)
+    index.add([3, 42], new_vectors)
+
+    assert len(index) == 11
+    assert index.search(new_vectors[0], top_k=1, threshold=0.0)[0]["page_id"] == 3
+    assert index.search(new_vectors[1], top_k=1, threshold=0.0)[0]["page_id"] == 42
+
+
+def test_top_k_indices_sorted():
+    """
+    Vérifie que la sélection par argpartition renvoie les scores triés.
+    """
+    scores = np.array([0.1, 0.9, 0.5, 0.7, 0.3], dtype=np.float32)
+    indices, top_scores = top_k_indices(scores, 3)
+
+    assert indices.tolist() == [1, 3, 2]
+    assert np.allclose(top_scores, [0.9, 0.7, 0.5])
+
+
+def test_course_filter_keeps_top_k_full():
+    """
+    Vérifie que le filtre de cours est appliqué pendant le parcours et que le top-k reste complet.
+    """
+    embeddings = _random_embeddings()
+    page_ids = np.arange(len(embeddings))
+    course_ids = page_ids % 4
+    index = InMemoryVectorIndex(refresh_interval=0)
+    index.load(page_ids, embeddings, course_ids=course_ids)
+
+    results = index.search(embeddings[3], top_k=10, threshold=-1.0, course_ids=[3])
+
+    assert len(results) == 10
+    assert results[0]["page_id"] == 3
+    assert all(result["page_id"] % 4 == 3 for result in results)
+    assert index.search(embeddings[3], top_k=10, threshold=-1.0, course_ids=[42]) == []
+
+
+def test_search_many_matches_single_searches():
+    """
+    Vérifie que la recherche par lot donne les mêmes résultats que des recherches séparées.
+    """
+    embeddings = _random_embeddings()
+    page_ids = np.arange(len(embeddings))
+    index = InMemoryVectorIndex(refresh_interval=0)
+    index.load(page_ids, embeddings, course_ids=page_ids % 4)
+
+    queries = embeddings[[3, 50, 120]] + 0.05
+    batch = index.search_many(queries, top_k=5, threshold=-1.0, course_ids=[0, 3])
+
+    assert len(batch) == 3
+    for query, results in zip(queries, batch):
+        single = index.search(query, top_k=5, threshold=-1.0, course_ids=[0, 3])
+        assert [result["page_id"] for result in results] == [result["page_id"] for result in single]
+        assert np.allclose([result["similarity"] for result in results], [result["similarity"] for result in single], atol=1e-5)
+    assert index.search_many([], top_k=5) == []
+
+
+def test_search_during_concurrent_adds():
+    """
+    Vérifie qu'une recherche pendant des ajouts concurrents voit un état cohérent (IDs et matrice).
+    """
+    embeddings = _random_embeddings(count=50)
+    index = InMemoryVectorIndex(refresh_interval=0)
+    index.load(np.arange(len(embeddings)), embeddings)
+    new_embeddings = _random_embeddings(count=300, seed=1)
+    errors = []
+
+    def add_pages():
+        for offset, embedding in enumerate(new_embeddings):
+            index.add([1000 + offset], embedding[None, :])
+
+    writer = threading.Thread(target=add_pages)
+    writer.start()
+    try:
+        while writer.is_alive():
+            for result in index.search(new_embeddings[-1], top_k=400, threshold=-1.0):
+                if not (result["page_id"] < 50 or 1000 <= result["page_id"] < 1300):
+                    errors.append(result["page_id"])
+    finally:
+        writer.join()
+
+    assert not errors
+    assert len(index) == 350
+    assert index.search(new_embeddings[-1], top_k=1, threshold=0.0)[0]["page_id"] == 1299
+
+
+def test_first_pass_rescores_with_exact_cosine():
+    """
+    Vérifie qu'avec une première passe int8 réduite, le meilleur résultat et les similarités exactes sont conservés.
+    """
+    embeddings = _random_embeddings(count=500, dimension=256)
+    page_ids = np.arange(1000, 1500)
+    exact = InMemoryVectorIndex(refresh_interval=0)
+    exact.load(page_ids, embeddings)
+    reduced = InMemoryVectorIndex(refresh_interval=0, first_pass_dimension=64)
+    reduced.load(page_ids, embeddings)
+
+    assert reduced.first_pass is not None and reduced.first_pass.reduced.dtype == np.int8
+    query = embeddings[42] + 0.05 * np.random.default_rng(1).standard_normal(256).astype(np.float32)
+    exact_scores = {result["page_id"]: result["similarity"] for result in exact.search(query, top_k=50, threshold=-1.0)}
+    results = reduced.search(query, top_k=5, threshold=-1.0)
+
+    assert results[0]["page_id"] == 1042
+    assert all(abs(result["similarity"] - exact_scores[result["page_id"]]) < 1e-5 for result in results)
+    assert [result["similarity"] for result in results] == sorted((result["similarity"] for result in results), reverse=True)
+
+
+def test_first_pass_follows_adds_and_course_filter():
+    """
+    Vérifie que la première passe suit les ajouts et remplacements, et respecte le filtre de cours.
+    """
+    embeddings = _random_embeddings(count=100, dimension=128)
+    index = InMemoryVectorIndex(refresh_interval=0, first_pass_dimension=32)
+    index.load(np.arange(100), embeddings, course_ids=np.arange(100) % 2)
+
+    new_embeddings = _random_embeddings(count=2, dimension=128, seed=5)
+    index.add([7, 500], new_embeddings, [1, 0])
+
+    assert len(index.first_pass) == len(index) == 101
+    assert index.search(new_embeddings[0], top_k=1, threshold=0.0)[0]["page_id"] == 7
+    assert index.search(new_embeddings[1], top_k=1, threshold=0.0)[0]["page_id"] == 500
+    assert index.search(embeddings[7], top_k=1, threshold=-1.0)[0]["page_id"] != 7
+    filtered = index.search(embeddings[10], top_k=5, threshold=-1.0, course_ids=[1])
+    assert len(filtered) == 5 and all(result["page_id"] % 2 == 1 for result in filtered)
+
+
+if __name__ == "__main__":
+    test_search_matches_exact_cosine()
+    test_threshold_filters_results()
+    test_add_inserts_and_replaces()
+    test_top_k_indices_sorted()
+    test_course_filter_keeps_top_k_full()
+    test_search_many_matches_single_searches()
+    test_search_during_concurrent_adds()
+    test_first_pass_rescores_with_exact_cosine()
+    test_first_pass_follows_adds_and_course_filter()
+    print("Tous les tests de l'index vectoriel ont réussi")